@@ -0,0 +1,220 @@
+"""Daily / weekly / monthly label counts, materialized from the label files.
+
+`update` reads each `labels_*` file once, counts reviews per (day, label) and
+stores the counts in `outputs/rollups/` (labels outside LABEL_ORDER, e.g. a
+label followed by an explanation, are counted as "(off-schema)"):
+
+    daily.parquet     file, model, period, label, count   (one row per file/day/label)
+    weekly.parquet    model, period, label, count         (weeks start on Monday)
+    monthly.parquet   model, period, label, count
+    _manifest.json    sha256 of every file already counted
+
+Re-running `update` only reads files that are new or whose content changed
+(their old daily rows are replaced), so refresh batches from
+`data/processed/queue/` are cheap to add. Weekly and monthly tables are
+re-derived from the daily counts, never from the reviews.
+
+The tables hold at most (models x days x labels) rows, so trend queries are
+a filter and a pivot on a few thousand rows regardless of how many reviews
+were counted:
+
+    from analytics.rollups import RollupStore
+    store = RollupStore()
+    store.trend("month", model="google_gemini-2.0-flash", share=True)
+
+Usage (from `src/`):
+    python -m analytics.rollups update
+    python -m analytics.rollups update --inputs ../outputs/15k/labels_*.parquet
+    python -m analytics.rollups query --grain week --labels "Delivery Issue" "Price / Cost Complaint"
+"""
+import argparse
+import json
+import os
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import pandas as pd
+
+from benchmark.compute_metrics import file_digest, find_pred_col, normalize_label_column
+from config import LABEL_ORDER, OUTPUT_DIR
+from storage import glob_tables, read_table, to_label_category, write_table
+
+ROLLUP_DIR = OUTPUT_DIR / "rollups"
+MANIFEST = "_manifest.json"
+GRAINS = {"day": None, "week": "W-SUN", "month": "M"}
+TABLES = {"day": "daily", "week": "weekly", "month": "monthly"}
+DATE_FORMAT = "%m/%d/%y %H:%M"   # how the scraped CSVs store `date`
+OFF_SCHEMA = "(off-schema)"      # every label outside LABEL_ORDER is counted under this one
+
+
+def parse_dates(s: pd.Series) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s
+    out = pd.to_datetime(s, format=DATE_FORMAT, errors="coerce")
+    if out.isna().any():
+        # Parquet converts / other exports use ISO dates; fill what the fixed format missed
+        out = out.fillna(pd.to_datetime(s[out.isna()], errors="coerce", format="mixed"))
+    return out
+
+
+def daily_counts(path: Path) -> pd.DataFrame:
+    """(model, period, label, count) per day for one labels file."""
+    df = read_table(path)
+    pred_col = find_pred_col(df)
+    model = pred_col[: -len("_labels")] if pred_col.endswith("_labels") else path.stem
+    labels = pd.Series(normalize_label_column(df[pred_col]))
+    out = pd.DataFrame({
+        "period": parse_dates(df["date"]).dt.normalize(),
+        "label": labels.where(labels.isin(LABEL_ORDER), OFF_SCHEMA),
+    }).dropna(subset=["period"])
+    counts = out.groupby(["period", "label"], observed=True).size().rename("count").reset_index()
+    counts.insert(0, "model", model)
+    return counts
+
+
+def rollup(daily: pd.DataFrame, grain: str) -> pd.DataFrame:
+    """Sum daily counts over files into the requested grain."""
+    freq = GRAINS[grain]
+    period = daily["period"] if freq is None else daily["period"].dt.to_period(freq).dt.start_time
+    out = (
+        daily.assign(period=period)
+        .groupby(["model", "period", "label"], observed=True)["count"].sum()
+        .reset_index()
+    )
+    out["label"] = to_label_category(out["label"].astype(str))
+    return out
+
+
+class RollupStore:
+    def __init__(self, directory: Path = ROLLUP_DIR):
+        self.directory = Path(directory)
+        self._tables = {}
+
+    # ---------- build ----------
+    def _manifest(self) -> dict:
+        path = self.directory / MANIFEST
+        if not path.exists():
+            return {}
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+
+    def update(self, paths: Iterable[Path]) -> List[Path]:
+        """Count new or changed files into the store; returns the files that were read."""
+        manifest = self._manifest()
+        daily_path = self.directory / "daily.parquet"
+        daily = read_table(daily_path) if daily_path.exists() else None
+
+        changed, fresh = [], []
+        for path in paths:
+            key = str(Path(path).resolve())
+            digest = file_digest(path)
+            if manifest.get(key) == digest:
+                continue
+            counts = daily_counts(path)
+            counts.insert(0, "file", key)
+            fresh.append(counts)
+            manifest[key] = digest
+            changed.append(Path(path))
+
+        if not changed:
+            return []
+        if daily is not None:
+            daily["label"] = daily["label"].astype(str)
+            daily = daily[~daily["file"].isin([str(p.resolve()) for p in changed])]
+            fresh.insert(0, daily)
+        daily = pd.concat(fresh, ignore_index=True)
+        daily["label"] = to_label_category(daily["label"].astype(str))
+
+        write_table(daily, daily_path)
+        for grain in ("week", "month"):
+            write_table(rollup(daily, grain), self.directory / f"{TABLES[grain]}.parquet")
+        tmp = self.directory / (MANIFEST + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(manifest, fh, indent=2)
+        os.replace(tmp, self.directory / MANIFEST)
+        self._tables.clear()
+        return changed
+
+    # ---------- query ----------
+    def table(self, grain: str) -> pd.DataFrame:
+        """The (model, period, label, count) table for a grain, loaded once per store."""
+        if grain not in self._tables:
+            path = self.directory / f"{TABLES[grain]}.parquet"
+            if not path.exists():
+                raise FileNotFoundError(f"No rollups at {path}; run `python -m analytics.rollups update` first")
+            t = read_table(path)
+            self._tables[grain] = rollup(t, "day") if grain == "day" else t
+        return self._tables[grain]
+
+    def models(self) -> List[str]:
+        return sorted(self.table("month")["model"].unique())
+
+    def trend(
+        self,
+        grain: str = "month",
+        model: Optional[str] = None,
+        labels: Optional[List[str]] = None,
+        start=None,
+        end=None,
+        share: bool = False,
+    ) -> pd.DataFrame:
+        """Period x label counts (or shares of each period's reviews) for one model.
+
+        `model` defaults to the only model in the store and is required when
+        there are several. `start` / `end` are inclusive and accept anything
+        pd.Timestamp does.
+        """
+        t = self.table(grain)
+        if model is None:
+            models = t["model"].unique()
+            if len(models) != 1:
+                raise ValueError(f"Several models in the store, pick one: {sorted(models)}")
+            model = models[0]
+        t = t[t["model"] == model]
+        if start is not None:
+            t = t[t["period"] >= pd.Timestamp(start)]
+        if end is not None:
+            t = t[t["period"] <= pd.Timestamp(end)]
+        out = t.pivot_table(index="period", columns="label", values="count", aggfunc="sum",
+                            fill_value=0, observed=False)
+        if share:
+            out = out.div(out.sum(axis=1).where(lambda x: x > 0), axis=0).fillna(0.0)
+        if labels:
+            out = out.reindex(columns=labels, fill_value=0)
+        out.columns = list(out.columns)
+        return out
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--store", type=Path, default=ROLLUP_DIR)
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    u = sub.add_parser("update", help="Count new or changed label files into the store")
+    u.add_argument("--inputs", type=Path, nargs="+", default=None,
+                   help="Label files (default: outputs/labels_*)")
+
+    q = sub.add_parser("query", help="Print a label trend")
+    q.add_argument("--grain", choices=list(GRAINS), default="month")
+    q.add_argument("--model", default=None)
+    q.add_argument("--labels", nargs="+", default=None)
+    q.add_argument("--start", default=None)
+    q.add_argument("--end", default=None)
+    q.add_argument("--share", action="store_true", help="Shares of each period instead of counts")
+    args = p.parse_args()
+
+    store = RollupStore(args.store)
+    if args.cmd == "update":
+        inputs = args.inputs or glob_tables(OUTPUT_DIR, "labels_*")
+        changed = store.update(inputs)
+        print(f"Counted {len(changed)} new/changed file(s) of {len(inputs)}; store at {args.store}")
+        for path in changed:
+            print(f"  {path}")
+    else:
+        out = store.trend(args.grain, args.model, args.labels, args.start, args.end, args.share)
+        with pd.option_context("display.width", 200, "display.max_columns", 20):
+            print(out.round(4) if args.share else out)
+
+
+if __name__ == "__main__":
+    main()
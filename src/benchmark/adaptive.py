@@ -0,0 +1,265 @@
+"""Adaptive (sequential early-stopping) benchmark of models on the gold set.
+
+Instead of labeling all gold rows with every model before compute_metrics
+runs, the gold rows are shuffled into stratified batches (each batch has
+roughly the gold label mix) and every model labels the same batches in the
+same order. After each batch, macro-F1 and MCC get bootstrap confidence
+bounds (benchmark.bootstrap, paired resamples), and a model stops as soon as
+
+- it is separated from the current leader: the paired-bootstrap CI of
+  leader minus model on `--metric` lies above 0 (the leader stops once
+  every other model is separated from it), or
+- its own `--metric` CI is narrower than `--tol`, or
+- the gold set runs out.
+
+No model stops before `--min-rows`. The data is checked after every batch,
+so each check uses a CI at level 1 - (1 - ci) / L, where L is the number
+of batches (Bonferroni over the looks). Without that, checking after every
+batch would inflate the chance of stopping a model that is not worse.
+
+The report lists each model's stop reason, rows labeled, the metrics with
+their bounds, and the calls saved against labeling the full gold set.
+Live labels are cached per model, prompt variant and prompt version
+(prompts.prompt_version) under `outputs/adaptive/`, so an interrupted run
+resumes without paying twice and a prompt edit starts a fresh cache instead
+of mixing old and new labels. `--replay` runs the same
+procedure on existing `labels_*` files (no API calls). Use it to tune
+`--batch-size`, `--tol` and `--min-rows`, or to see what an earlier full run
+could have saved.
+
+Usage (from `src/`):
+    python -m benchmark.adaptive --models openai:gpt-4.1-mini google:gemini-2.0-flash
+    python -m benchmark.adaptive --replay --batch-size 50 --tol 0.04
+"""
+import argparse
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from benchmark.bootstrap import METRICS, batched_confusion, bootstrap_metrics, metrics_from_confusion, percentile_ci
+from benchmark.compute_metrics import (
+    ALLOWED_LABELS,
+    GOLD_COL,
+    GOLD_PATH,
+    MODEL_DIR,
+    OUT_DIR,
+    clean_label,
+    find_pred_col,
+    normalize_label_column,
+)
+from benchmark.prompt_ab import parse_model
+from config import MODELS, OUTPUT_DIR, TEXT_COL
+from prompts import DEFAULT_VARIANT, PROMPT_VARIANTS, prompt_version
+from storage import glob_tables, read_table, resolve_table, review_ids, write_table
+
+ADAPTIVE_DIR = OUTPUT_DIR / "adaptive"
+REPORTED = ("macro_f1", "mcc")
+
+
+def stratified_order(y_true: List[str], seed: int = 0) -> np.ndarray:
+    """Row order whose every prefix has roughly the label mix of the whole gold set.
+
+    Rows are shuffled within each label and spread evenly over [0, 1) by
+    their rank in the label (plus jitter), then sorted on that position.
+    """
+    rng = np.random.default_rng(seed)
+    y = np.asarray(y_true, dtype=object)
+    pos = np.empty(len(y))
+    for lbl in pd.unique(y):
+        idx = rng.permutation(np.flatnonzero(y == lbl))
+        pos[idx] = (np.arange(len(idx)) + rng.random(len(idx))) / len(idx)
+    return np.argsort(pos, kind="stable")
+
+
+class CodeSpace:
+    """Label -> code over ALLOWED_LABELS, with off-schema labels appended as they appear."""
+
+    def __init__(self):
+        self.codes = {lbl: i for i, lbl in enumerate(ALLOWED_LABELS)}
+
+    def encode(self, labels) -> np.ndarray:
+        return np.array([self.codes.setdefault(v, len(self.codes)) for v in labels], dtype=np.int32)
+
+    @property
+    def k(self) -> int:
+        return len(self.codes)
+
+
+def replay_labelers(model_dir: Path, n_gold: int) -> Dict[str, Callable]:
+    """Existing labels_* files as labelers: rows -> labels, no API calls."""
+    out = {}
+    for path in glob_tables(model_dir, "labels_*"):
+        df = read_table(path)
+        if len(df) != n_gold:
+            print(f"Skipping {path.name}: {len(df)} rows, gold has {n_gold}")
+            continue
+        preds = normalize_label_column(df[find_pred_col(df)])
+        out[path.stem.replace("labels_", "")] = lambda rows, preds=preds: list(preds[rows])
+    return out
+
+
+def live_labeler(gold: pd.DataFrame, vendor: str, model: str, cache_dir: Path, variant: str = DEFAULT_VARIANT):
+    """A labeler that calls the model for rows it has not labeled before (cached on disk).
+
+    The cache file is keyed by prompt variant and version, and a cached row
+    is reused only while the gold review at that row is unchanged.
+    """
+    from clients.registry import get_client_and_fn, skip_without_client
+    from labeling.runner import label_dataframe_with_model
+
+    client, call_fn = get_client_and_fn(vendor)
+    if client is None and skip_without_client(vendor):
+        print(f"Client for {vendor} not initialized, skipping {model}.")
+        return None
+    if variant != DEFAULT_VARIANT:
+        call_fn = partial(call_fn, variant=variant)
+    path = cache_dir / f"labels_{vendor}_{model}.{variant}-{prompt_version(variant, vendor)}.parquet"
+    labels_col = f"{vendor}_{model}_labels"
+    ids = review_ids(gold[TEXT_COL])
+    cache = {}
+    if path.exists():
+        cached = read_table(path)
+        same = [ids[r] == rid for r, rid in zip(cached["row"], cached["review_id"])]
+        cache = cached[same].set_index("row")[labels_col].astype(object).to_dict()
+
+    def label(rows: np.ndarray) -> List[str]:
+        todo = [int(r) for r in rows if int(r) not in cache]
+        if todo:
+            labeled = label_dataframe_with_model(
+                df=gold.loc[todo, [TEXT_COL]].reset_index(drop=True),
+                text_col=TEXT_COL,
+                vendor=vendor,
+                model_name=model,
+                call_fn=call_fn,
+                client=client,
+            )
+            cache.update(zip(todo, labeled[labels_col].astype(object)))
+            write_table(pd.DataFrame({"row": list(cache), "review_id": [ids[r] for r in cache],
+                                      labels_col: list(cache.values())}), path)
+        return list(normalize_label_column(pd.Series([cache[int(r)] for r in rows], dtype=object)))
+
+    return label
+
+
+def point_metrics(true_codes: np.ndarray, pred_codes: np.ndarray, k: int) -> Dict[str, float]:
+    C = batched_confusion(true_codes[None, :], pred_codes[None, :], k)
+    return {m: float(v[0]) for m, v in metrics_from_confusion(C, len(ALLOWED_LABELS)).items()}
+
+
+def run_adaptive(y_true: List[str], labelers: Dict[str, Callable], batch_size: int = 100,
+                 min_rows: int = 200, metric: str = "macro_f1", tol: float = 0.03,
+                 ci: float = 0.95, n_boot: int = 2000, seed: int = 42) -> pd.DataFrame:
+    n = len(y_true)
+    order = stratified_order(y_true, seed)
+    batches = [order[i:i + batch_size] for i in range(0, n, batch_size)]
+    level = 1 - (1 - ci) / len(batches)   # Bonferroni over the looks
+    space = CodeSpace()
+    true_codes = space.encode([y_true[r] for r in order])
+
+    preds = {name: [] for name in labelers}   # labels in `order`, one list per model
+    state = {name: {"status": "active"} for name in labelers}
+
+    for b, rows in enumerate(batches):
+        active = [m for m in labelers if state[m]["status"] == "active"]
+        if not active:
+            break
+        for m in active:
+            preds[m].extend(labelers[m](rows))
+
+        codes = {m: space.encode(p) for m, p in preds.items()}
+        points = {m: point_metrics(true_codes[:len(c)], c, space.k) for m, c in codes.items()}
+        leader = max(points, key=lambda m: points[m][metric])
+        for m in labelers:
+            st = state[m]
+            c = codes[m]
+            if st["status"] != "active" and st["rows"] == len(c):
+                continue   # stopped earlier, nothing new to score
+            boots = bootstrap_metrics(true_codes[:len(c)], c, space.k, len(ALLOWED_LABELS), n_boot, seed)
+            st.update(rows=len(c), **points[m])
+            for met in REPORTED:
+                st[f"{met}_ci_low"], st[f"{met}_ci_high"] = percentile_ci(boots[met], level)
+            if st["status"] != "active" or len(c) < min_rows:
+                continue
+            others = [o for o in labelers if o != m]
+            if m == leader and others and all(state[o].get("reason", "").startswith("worse") for o in others):
+                st.update(status="stopped", reason="leader; every other model is separated from it")
+                continue
+            if m != leader:
+                # paired on the rows both have labeled (same prefix of `order`)
+                common = min(len(c), len(codes[leader]))
+                lead = bootstrap_metrics(true_codes[:common], codes[leader][:common], space.k,
+                                         len(ALLOWED_LABELS), n_boot, seed)[metric]
+                mine = boots[metric] if common == len(c) else bootstrap_metrics(
+                    true_codes[:common], c[:common], space.k, len(ALLOWED_LABELS), n_boot, seed)[metric]
+                lo, hi = percentile_ci(lead - mine, level)
+                if lo > 0:
+                    st.update(status="stopped", reason=f"worse than {leader} (diff CI [{lo:.3f}, {hi:.3f}])")
+                    continue
+            width = st[f"{metric}_ci_high"] - st[f"{metric}_ci_low"]
+            if width < tol:
+                st.update(status="stopped", reason=f"{metric} CI width {width:.3f} < {tol}")
+
+        print(f"batch {b + 1}/{len(batches)}: leader {leader} ({metric} {points[leader][metric]:.3f}); "
+              f"active: {', '.join(m for m in labelers if state[m]['status'] == 'active') or '-'}")
+
+    for st in state.values():
+        if st["status"] == "active":
+            st.update(status="done", reason="gold set exhausted")
+    report = pd.DataFrame([
+        {"model": m, "reason": st["reason"], "rows_labeled": st["rows"], "calls_saved": n - st["rows"],
+         **{k: round(st[k], 4) for k in REPORTED},
+         **{f"{k}_ci_{s}": round(st[f"{k}_ci_{s}"], 4) for k in REPORTED for s in ("low", "high")}}
+        for m, st in state.items()
+    ])
+    return report.sort_values(metric, ascending=False).reset_index(drop=True)
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--gold", type=Path, default=GOLD_PATH)
+    p.add_argument("--models", nargs="+", type=parse_model, default=None,
+                   help="vendor:model pairs to label live (default: MODELS in config.py)")
+    p.add_argument("--replay", action="store_true", help="Use existing labels_* files instead of API calls")
+    p.add_argument("--model-dir", type=Path, default=MODEL_DIR, help="labels_* files for --replay")
+    p.add_argument("--prompt-variant", choices=sorted(PROMPT_VARIANTS), default=DEFAULT_VARIANT,
+                   help="Instruction variant for live labeling (see prompts.py)")
+    p.add_argument("--batch-size", type=int, default=100)
+    p.add_argument("--min-rows", type=int, default=200, help="Never stop a model before this many rows")
+    p.add_argument("--metric", choices=list(METRICS[:2]), default="macro_f1", help="Metric the stopping rule uses")
+    p.add_argument("--tol", type=float, default=0.03, help="Stop once the metric's CI is narrower than this")
+    p.add_argument("--ci", type=float, default=0.95, help="Overall confidence level (split over the looks)")
+    p.add_argument("--n-boot", type=int, default=2000)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--out", type=Path, default=OUT_DIR / "benchmark_adaptive.csv")
+    args = p.parse_args()
+
+    gold = read_table(resolve_table(args.gold)).reset_index(drop=True)
+    y_true = gold[GOLD_COL].apply(clean_label).tolist()
+
+    if args.replay:
+        labelers = replay_labelers(args.model_dir, len(gold))
+    else:
+        labelers = {}
+        for cfg in args.models or MODELS:
+            fn = live_labeler(gold, cfg["vendor"], cfg["name"], ADAPTIVE_DIR, args.prompt_variant)
+            if fn is not None:
+                labelers[f"{cfg['vendor']}_{cfg['name']}"] = fn
+    if not labelers:
+        raise SystemExit("No models to benchmark.")
+
+    report = run_adaptive(y_true, labelers, args.batch_size, args.min_rows, args.metric, args.tol,
+                          args.ci, args.n_boot, args.seed)
+    full = len(gold) * len(labelers)
+    saved = int(report["calls_saved"].sum())
+    with pd.option_context("display.width", 250, "display.max_columns", 20, "display.max_colwidth", 60):
+        print("\n" + report.to_string(index=False))
+    print(f"\nLabeled {full - saved} of {full} rows; saved {saved} calls ({saved / full:.0%}).")
+    write_table(report, args.out)
+    print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
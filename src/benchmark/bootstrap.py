@@ -0,0 +1,144 @@
+"""Bootstrap confidence intervals and paired significance for benchmark metrics.
+
+All models are scored on the same gold rows, so every model is resampled with
+the SAME index matrix (regenerated from a shared seed). That makes the
+resamples paired: the difference between two models on resample b is the
+difference on identical rows, which is what the pairwise tests use.
+
+Metrics are computed over integer label codes. For each block of resamples a
+single bincount builds one confusion matrix per resample, and macro-F1, MCC
+and Krippendorff's alpha are then array ops over the (B, k, k) stack.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from typing import Dict, List, Optional
+
+import numpy as np
+
+METRICS = ("macro_f1", "mcc", "alpha")
+
+
+def resample_indices(n: int, n_boot: int, seed: int = 0, block: int = 1000):
+    """Yield (block, n) index matrices; same seed -> same resamples in every process."""
+    rng = np.random.default_rng(seed)
+    done = 0
+    while done < n_boot:
+        b = min(block, n_boot - done)
+        yield rng.integers(0, n, size=(b, n), dtype=np.int32)
+        done += b
+
+
+def batched_confusion(true_codes: np.ndarray, pred_codes: np.ndarray, k: int) -> np.ndarray:
+    """(B, n) code matrices -> (B, k, k) confusion matrices (rows = true)."""
+    b = true_codes.shape[0]
+    flat = (np.arange(b, dtype=np.int64)[:, None] * k + true_codes) * k + pred_codes
+    return np.bincount(flat.ravel(), minlength=b * k * k).reshape(b, k, k)
+
+
+def metrics_from_confusion(C: np.ndarray, n_scored: int) -> Dict[str, np.ndarray]:
+    """Macro-F1 over the first `n_scored` classes, MCC and alpha for a (B, k, k) stack.
+
+    Classes past `n_scored` are off-schema predictions: they count as errors
+    (like sklearn's classification_report with labels=ALLOWED_LABELS) but are
+    not averaged into macro-F1.
+    """
+    C = C.astype(float)
+    tp = np.diagonal(C, axis1=1, axis2=2)
+    true_k = C.sum(axis=2)
+    pred_k = C.sum(axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prec = np.where(pred_k > 0, tp / pred_k, 0.0)
+        rec = np.where(true_k > 0, tp / true_k, 0.0)
+        f1 = np.where(prec + rec > 0, 2 * prec * rec / (prec + rec), 0.0)
+    macro_f1 = f1[:, :n_scored].mean(axis=1)
+
+    s = C.sum(axis=(1, 2))
+    c = tp.sum(axis=1)
+    num = c * s - (pred_k * true_k).sum(axis=1)
+    den = np.sqrt((s * s - (pred_k ** 2).sum(axis=1)) * (s * s - (true_k ** 2).sum(axis=1)))
+    mcc = np.divide(num, den, out=np.zeros_like(num), where=den > 0)
+
+    # Krippendorff's alpha (nominal, 2 coders, no missing): coincidences are C + C^T
+    n_c = true_k + pred_k
+    n_tot = 2.0 * s
+    d_o = n_tot - 2.0 * c
+    d_e = n_tot ** 2 - (n_c ** 2).sum(axis=1)
+    alpha = np.where(d_e > 0, 1.0 - (n_tot - 1.0) * d_o / np.where(d_e > 0, d_e, 1.0), 1.0)
+
+    return {"macro_f1": macro_f1, "mcc": mcc, "alpha": alpha}
+
+
+def bootstrap_metrics(
+    true_codes: np.ndarray,
+    pred_codes: np.ndarray,
+    k: int,
+    n_scored: int,
+    n_boot: int = 10000,
+    seed: int = 0,
+) -> Dict[str, np.ndarray]:
+    """Metric values on each of `n_boot` resamples for one model."""
+    true_codes = np.asarray(true_codes)
+    pred_codes = np.asarray(pred_codes)
+    out = {m: [] for m in METRICS}
+    for idx in resample_indices(len(true_codes), n_boot, seed):
+        C = batched_confusion(true_codes[idx], pred_codes[idx], k)
+        for m, v in metrics_from_confusion(C, n_scored).items():
+            out[m].append(v)
+    return {m: np.concatenate(v) for m, v in out.items()}
+
+
+def _bootstrap_worker(args):
+    return bootstrap_metrics(*args)
+
+
+def bootstrap_models(
+    true_codes: np.ndarray,
+    pred_codes: Dict[str, np.ndarray],
+    k: int,
+    n_scored: int,
+    n_boot: int = 10000,
+    seed: int = 0,
+    workers: Optional[int] = None,
+) -> Dict[str, Dict[str, np.ndarray]]:
+    """Bootstrap every model, one model per process, all on the same resamples."""
+    names = list(pred_codes)
+    jobs = [(true_codes, pred_codes[n], k, n_scored, n_boot, seed) for n in names]
+    if workers == 1 or len(names) == 1:
+        results = [_bootstrap_worker(j) for j in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            results = list(ex.map(_bootstrap_worker, jobs))
+    return dict(zip(names, results))
+
+
+def percentile_ci(samples: np.ndarray, level: float = 0.95):
+    lo, hi = np.percentile(samples, [100 * (1 - level) / 2, 100 * (1 + level) / 2])
+    return float(lo), float(hi)
+
+
+def pairwise_tests(
+    boots: Dict[str, Dict[str, np.ndarray]],
+    point: Dict[str, Dict[str, float]],
+    level: float = 0.95,
+    metrics=METRICS,
+) -> List[dict]:
+    """Paired-bootstrap difference (a - b) with CI and two-sided p-value for every model pair."""
+    rows = []
+    for a, b in combinations(sorted(boots), 2):
+        for m in metrics:
+            diff = boots[a][m] - boots[b][m]
+            lo, hi = percentile_ci(diff, level)
+            # two-sided: how often the resampled difference lands on the other side of 0
+            p = 2 * min((diff <= 0).mean(), (diff >= 0).mean())
+            rows.append({
+                "model_a": a,
+                "model_b": b,
+                "metric": m,
+                "diff": round(point[a][m] - point[b][m], 4),
+                "ci_low": round(lo, 4),
+                "ci_high": round(hi, 4),
+                "p_value": round(min(float(p), 1.0), 4),
+                "significant": bool(lo > 0 or hi < 0),
+            })
+    return rows
@@ -1,4 +1,33 @@
+"""Benchmark every `outputs/labels_*` file against the gold holdout.
+
+Label files may be Parquet, Arrow or CSV; when a stem exists in several
+formats the Parquet copy is used.
+
+Usage (from `src/`):
+    python -m benchmark.compute_metrics
+    python -m benchmark.compute_metrics --format parquet
+    python -m benchmark.compute_metrics --n-boot 10000 --workers 4
+    python -m benchmark.compute_metrics --store ../outputs/labels.sqlite
+
+Besides the point estimates, the summary gets bootstrap confidence intervals
+for macro-F1, MCC and alpha, and `benchmark_pairwise_significance` holds the
+paired-bootstrap difference between every pair of models.
+
+Per-model results are cached in `outputs/.metrics_cache.json`, keyed by the
+label file's name (which gives the model tag) and content hash and by the
+gold file's content hash, so a rerun only evaluates new, renamed or changed
+label files (in parallel). `--no-cache` forces a full recompute.
+
+With `--store`, labels come from the label store (label_store.py) instead
+of the `labels_*` files: the gold file is stored and every model is joined
+to it on review_id (`LabelStore.aligned()`), so reordered, sharded or
+partial label files are scored on the right rows. Only reviews labeled by
+every model are scored, so all models see the same sample.
+"""
+import argparse
+import hashlib
 import json
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 import numpy as np
@@ -6,6 +35,9 @@ import pandas as pd
 from sklearn.metrics import classification_report, matthews_corrcoef
 import krippendorff
 
+from benchmark.bootstrap import METRICS, bootstrap_models, pairwise_tests, percentile_ci
+from storage import glob_tables, read_table, resolve_table, write_table
+
 
 # ---------------------------
 # CONFIG
@@ -20,6 +52,10 @@ OUT_DIR.mkdir(parents=True, exist_ok=True)
 
 GOLD_COL = "gold_label"
 
+CACHE_FILE = ".metrics_cache.json"
+# bump when the metric definitions change so stale cache entries are ignored
+CACHE_VERSION = 1
+
 ALLOWED_LABELS = [
     "Delivery Issue",
     "Order Accuracy",
@@ -64,96 +100,253 @@ def parse_model_labels_cell(cell):
     return clean_label(s)
 
 
-def find_pred_col(df):
-    label_cols = [c for c in df.columns if c.endswith("_labels")]
-    if label_cols:
-        return label_cols[0]
+def normalize_label_column(s: pd.Series) -> np.ndarray:
+    """Vectorized parse_model_labels_cell over a whole column.
 
-    raise ValueError(f"Prediction column not found in {list(df.columns)}")
+    Model outputs repeat a handful of distinct strings, so the column is
+    factorized and only the unique values are parsed.
+    """
+    codes, uniques = pd.factorize(s.astype(object), use_na_sentinel=True)
+    parsed = np.array([parse_model_labels_cell(u) for u in uniques] + ["Others"], dtype=object)
+    return parsed[codes]  # code -1 (missing) picks the trailing "Others"
 
 
-# ---------------------------
-# MAIN
-# ---------------------------
-def main():
+def file_digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
 
-    print("Loading gold file...")
-    gold = pd.read_csv(GOLD_PATH)
 
-    if GOLD_COL not in gold.columns:
-        raise ValueError(f"Gold file must contain column '{GOLD_COL}'")
+def load_cache(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
 
-    gold["gold_clean"] = gold[GOLD_COL].apply(clean_label)
 
-    model_files = sorted(MODEL_DIR.glob("labels_*.csv"))
+def save_cache(path: Path, cache: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(cache, fh)
+    tmp.replace(path)
 
-    if not model_files:
-        raise FileNotFoundError("No model output files found.")
 
-    summary_rows = []
-    per_class_rows = []
+def evaluate_model_file(mf: Path, y_true: list) -> dict:
+    """Score one label file against the gold labels; returns a JSON-able cache entry."""
+    model_df = read_table(mf)
 
-    for mf in model_files:
+    if len(y_true) != len(model_df):
+        raise ValueError(
+            f"Row mismatch in {mf.name}: gold={len(y_true)} vs model={len(model_df)}"
+        )
 
-        print(f"\nEvaluating {mf.name}")
-        model_df = pd.read_csv(mf)
+    pred_col = find_pred_col(model_df)
+    return evaluate_labels(mf.stem.replace("labels_", ""), y_true, model_df[pred_col])
+
+
+def evaluate_labels(model_tag: str, y_true: list, labels: pd.Series) -> dict:
+    """Score one model's label column (aligned with y_true) against the gold labels."""
+    y_pred = normalize_label_column(labels).tolist()
+
+    report = classification_report(
+        y_true,
+        y_pred,
+        labels=ALLOWED_LABELS,
+        output_dict=True,
+        zero_division=0
+    )
+
+    macro_f1 = report["macro avg"]["f1-score"]
+    weighted_f1 = report["weighted avg"]["f1-score"]
+    mcc = matthews_corrcoef(y_true, y_pred)
+
+    alpha = krippendorff.alpha(
+        reliability_data=[y_true, y_pred],
+        level_of_measurement="nominal"
+    )
+
+    summary = {
+        "model": model_tag,
+        "n_samples": len(y_true),
+        "alpha_vs_gold": round(alpha, 4),
+        "macro_f1": round(macro_f1, 4),
+        "weighted_f1": round(weighted_f1, 4),
+        "mcc": round(mcc, 4),
+    }
+
+    per_class = []
+    for lbl in ALLOWED_LABELS:
+        per_class.append({
+            "model": model_tag,
+            "label": lbl,
+            "precision": round(report.get(lbl, {}).get("precision", 0.0), 4),
+            "recall": round(report.get(lbl, {}).get("recall", 0.0), 4),
+            "f1": round(report.get(lbl, {}).get("f1-score", 0.0), 4),
+            "support": report.get(lbl, {}).get("support", 0),
+        })
 
-        if len(gold) != len(model_df):
-            raise ValueError(
-                f"Row mismatch: gold={len(gold)} vs model={len(model_df)}"
-            )
+    return {
+        "summary": summary,
+        "per_class": per_class,
+        "point": {"macro_f1": float(macro_f1), "mcc": float(mcc), "alpha": float(alpha)},
+        "preds": y_pred,
+    }
 
-        pred_col = find_pred_col(model_df)
-        model_df["pred_clean"] = model_df[pred_col].apply(parse_model_labels_cell)
 
-        y_true = gold["gold_clean"]
-        y_pred = model_df["pred_clean"]
+def _evaluate_worker(args):
+    return evaluate_model_file(*args)
 
-        report = classification_report(
-            y_true,
-            y_pred,
-            labels=ALLOWED_LABELS,
-            output_dict=True,
-            zero_division=0
-        )
 
-        macro_f1 = report["macro avg"]["f1-score"]
-        weighted_f1 = report["weighted avg"]["f1-score"]
-        mcc = matthews_corrcoef(y_true, y_pred)
+def evaluate_store(store_path: Path, gold_path: Path):
+    """(y_true, entries) for every model in the label store, joined to the gold labels on review_id."""
+    from label_store import LabelStore
 
-        alpha = krippendorff.alpha(
-            reliability_data=[y_true.tolist(), y_pred.tolist()],
-            level_of_measurement="nominal"
-        )
+    store = LabelStore(store_path)
+    try:
+        store.ingest_gold(gold_path)
+        aligned = store.aligned()
+    finally:
+        store.close()
+    label_cols = [c for c in aligned.columns if c.endswith("_labels")]
+    if not label_cols or aligned.empty:
+        raise ValueError(f"No model labels in {store_path} overlap the gold reviews")
+    print(f"{len(aligned)} gold reviews labeled by all {len(label_cols)} models in {store_path}")
 
-        model_tag = mf.stem.replace("labels_", "")
+    y_true = aligned[GOLD_COL].apply(clean_label).tolist()
+    entries = [evaluate_labels(c[: -len("_labels")], y_true, aligned[c]) for c in label_cols]
+    return y_true, entries
 
-        summary_rows.append({
-            "model": model_tag,
-            "n_samples": len(y_true),
-            "alpha_vs_gold": round(alpha, 4),
-            "macro_f1": round(macro_f1, 4),
-            "weighted_f1": round(weighted_f1, 4),
-            "mcc": round(mcc, 4),
-        })
 
-        for lbl in ALLOWED_LABELS:
-            per_class_rows.append({
-                "model": model_tag,
-                "label": lbl,
-                "precision": round(report.get(lbl, {}).get("precision", 0.0), 4),
-                "recall": round(report.get(lbl, {}).get("recall", 0.0), 4),
-                "f1": round(report.get(lbl, {}).get("f1-score", 0.0), 4),
-                "support": report.get(lbl, {}).get("support", 0),
-            })
+def find_pred_col(df):
+    label_cols = [c for c in df.columns if c.endswith("_labels")]
+    if label_cols:
+        return label_cols[0]
+
+    raise ValueError(f"Prediction column not found in {list(df.columns)}")
+
+
+def evaluate_files(args, gold_path: Path, y_true: list) -> list:
+    """Cache entries for every labels_* file in --model-dir (cached ones are not re-evaluated)."""
+    model_files = glob_tables(args.model_dir, "labels_*")
+
+    if not model_files:
+        raise FileNotFoundError("No model output files found.")
+
+    cache_path = args.out_dir / CACHE_FILE
+    cache = {} if args.no_cache else load_cache(cache_path)
+    gold_key = f"v{CACHE_VERSION}:{file_digest(gold_path)}"
+    # the name is part of the key: the cached entry carries the model tag taken from it
+    keys = {mf: f"{gold_key}:{mf.name}:{file_digest(mf)}" for mf in model_files}
+
+    results = {}
+    todo = []
+    for mf in model_files:
+        if keys[mf] in cache:
+            print(f"Cached: {mf.name}")
+            results[mf] = cache[keys[mf]]
+        else:
+            todo.append(mf)
+
+    if todo:
+        print(f"\nEvaluating {len(todo)} new or changed file(s): {', '.join(m.name for m in todo)}")
+        jobs = [(mf, y_true) for mf in todo]
+        if len(todo) == 1 or args.workers == 1:
+            fresh = [_evaluate_worker(j) for j in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=args.workers) as ex:
+                fresh = list(ex.map(_evaluate_worker, jobs))
+        for mf, entry in zip(todo, fresh):
+            results[mf] = entry
+            cache[keys[mf]] = entry
+
+        # keep only entries for files that still exist with their current content
+        live = set(keys.values())
+        save_cache(cache_path, {k: v for k, v in cache.items() if k in live})
+    return [results[mf] for mf in model_files]
+
 
-        print(f"{model_tag} → Macro F1: {macro_f1:.3f} | MCC: {mcc:.3f} | Alpha: {alpha:.3f}")
+# ---------------------------
+# MAIN
+# ---------------------------
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--gold", type=Path, default=GOLD_PATH, help="Gold table (csv/parquet/arrow)")
+    p.add_argument("--model-dir", type=Path, default=MODEL_DIR, help="Directory with labels_* files")
+    p.add_argument("--out-dir", type=Path, default=OUT_DIR, help="Where to write the benchmark reports")
+    p.add_argument("--format", choices=["csv", "parquet", "arrow"], default="csv",
+                   help="Format of the benchmark_results_* reports")
+    p.add_argument("--n-boot", type=int, default=10000, help="Bootstrap resamples (0 disables CIs)")
+    p.add_argument("--ci", type=float, default=0.95, help="Confidence level for the intervals")
+    p.add_argument("--workers", type=int, default=None,
+                   help="Processes for evaluation and the bootstrap (default: all cores)")
+    p.add_argument("--no-cache", action="store_true", help="Ignore cached per-model results")
+    p.add_argument("--store", type=Path, default=None,
+                   help="Score the models in this label store, joined to gold on review_id")
+    p.add_argument("--seed", type=int, default=42)
+    args = p.parse_args()
+
+    gold_path = resolve_table(args.gold)
+    print("Loading gold file...")
+    gold = read_table(gold_path)
+
+    if GOLD_COL not in gold.columns:
+        raise ValueError(f"Gold file must contain column '{GOLD_COL}'")
+
+    if args.store:
+        y_true, entries = evaluate_store(args.store, gold_path)
+    else:
+        gold["gold_clean"] = gold[GOLD_COL].apply(clean_label)
+        y_true = gold["gold_clean"].tolist()
+        entries = evaluate_files(args, gold_path, y_true)
+
+    summary_rows = []
+    per_class_rows = []
+    point = {}
+    preds = {}
+    for entry in entries:
+        model_tag = entry["summary"]["model"]
+        summary_rows.append(dict(entry["summary"]))
+        per_class_rows.extend(entry["per_class"])
+        point[model_tag] = entry["point"]
+        preds[model_tag] = entry["preds"]
+        p_ = entry["point"]
+        print(f"{model_tag} → Macro F1: {p_['macro_f1']:.3f} | MCC: {p_['mcc']:.3f} | Alpha: {p_['alpha']:.3f}")
+
+    pairwise_df = None
+    if args.n_boot > 0:
+        # code space: allowed labels first, then any off-schema predictions
+        extras = sorted(set(y_true).union(*preds.values()) - set(ALLOWED_LABELS))
+        labels = ALLOWED_LABELS + extras
+        codes = {lbl: i for i, lbl in enumerate(labels)}
+        true_codes = np.array([codes[v] for v in y_true], dtype=np.int32)
+        pred_codes = {m: np.array([codes[v] for v in ys], dtype=np.int32) for m, ys in preds.items()}
+
+        print(f"\nBootstrapping {args.n_boot} resamples for {len(preds)} models...")
+        boots = bootstrap_models(
+            true_codes, pred_codes, len(labels), len(ALLOWED_LABELS),
+            n_boot=args.n_boot, seed=args.seed, workers=args.workers,
+        )
+        for row in summary_rows:
+            for metric in METRICS:
+                lo, hi = percentile_ci(boots[row["model"]][metric], args.ci)
+                col = "alpha_vs_gold" if metric == "alpha" else metric
+                row[f"{col}_ci_low"] = round(lo, 4)
+                row[f"{col}_ci_high"] = round(hi, 4)
+        pairwise_df = pd.DataFrame(pairwise_tests(boots, point, args.ci))
 
     summary_df = pd.DataFrame(summary_rows).sort_values("macro_f1", ascending=False)
     per_class_df = pd.DataFrame(per_class_rows)
 
-    summary_df.to_csv(OUT_DIR / "benchmark_results_summary.csv", index=False)
-    per_class_df.to_csv(OUT_DIR / "benchmark_results_per_class.csv", index=False)
+    write_table(summary_df, args.out_dir / f"benchmark_results_summary.{args.format}")
+    write_table(per_class_df, args.out_dir / f"benchmark_results_per_class.{args.format}")
+    if pairwise_df is not None and not pairwise_df.empty:
+        write_table(pairwise_df, args.out_dir / f"benchmark_pairwise_significance.{args.format}")
 
     print("\nBenchmark complete.")
     print(summary_df)
@@ -0,0 +1,188 @@
+"""Ensemble labels from the model outputs we already have (no new API calls).
+
+Aligns any number of `labels_*` files, reports how often each pair of models
+agrees, and combines them by majority, weighted or per-class-weighted vote.
+Weights are learned against the gold holdout:
+
+- weighted:   one weight per model, log-odds of its gold accuracy
+- per_class:  one weight per (model, predicted label), log-odds of the
+              model's precision for that label
+
+Everything runs on integer label codes, so votes are a one-hot sum.
+
+Labels for the gold rows are produced out-of-fold (`--folds`), so the
+`labels_ensemble-<method>` file can be benchmarked by compute_metrics
+without leaking the gold labels. `--apply` writes ensemble labels for other
+datasets (e.g. the 15k set) with weights fit on the full gold set.
+
+Usage (from `src/`):
+    python -m benchmark.ensemble --method per_class
+    python -m benchmark.ensemble --method weighted \
+        --apply ../outputs/15k/labels_*.parquet --apply-out ../outputs/15k
+"""
+import argparse
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from benchmark.compute_metrics import (
+    ALLOWED_LABELS,
+    GOLD_COL,
+    GOLD_PATH,
+    MODEL_DIR,
+    clean_label,
+    find_pred_col,
+    normalize_label_column,
+)
+from evaluate_predictions import evaluate_many
+from storage import glob_tables, read_table, resolve_table, write_table
+
+METHODS = ("majority", "weighted", "per_class")
+ENSEMBLE_PREFIX = "labels_ensemble"
+
+K = len(ALLOWED_LABELS)
+CODES = {lbl: i for i, lbl in enumerate(ALLOWED_LABELS)}
+
+
+def encode(labels) -> np.ndarray:
+    """Labels -> codes over ALLOWED_LABELS; off-schema labels become -1 (abstain)."""
+    return np.array([CODES.get(v, -1) for v in labels], dtype=np.int64)
+
+
+def load_label_sets(paths: List[Path]):
+    """Read label files into an (n_models, n_rows) code matrix plus the shared text columns."""
+    names, codes, base = [], [], None
+    for path in paths:
+        df = read_table(path)
+        if base is None:
+            base = df[[c for c in ("date", "content") if c in df.columns]]
+        elif len(df) != len(base):
+            raise ValueError(f"Row mismatch: {path.name} has {len(df)} rows, expected {len(base)}")
+        names.append(path.stem.replace("labels_", ""))
+        codes.append(encode(normalize_label_column(df[find_pred_col(df)])))
+    return names, np.stack(codes), base
+
+
+def agreement_matrix(codes: np.ndarray) -> np.ndarray:
+    """Fraction of rows on which each pair of models gives the same label."""
+    return (codes[:, None, :] == codes[None, :, :]).mean(axis=2)
+
+
+def _log_odds(p: np.ndarray) -> np.ndarray:
+    # weight of a voter with accuracy p among K classes (Nitzan & Paroush)
+    p = np.clip(p, 1e-3, 1 - 1e-3)
+    return np.maximum(np.log(p * (K - 1) / (1 - p)), 0.0)
+
+
+def fit_weights(codes: np.ndarray, gold: np.ndarray, method: str) -> np.ndarray:
+    """(n_models, K) vote weights learned on gold rows."""
+    m = codes.shape[0]
+    if method == "majority":
+        return np.ones((m, K))
+    if method == "weighted":
+        acc = (codes == gold[None, :]).mean(axis=1)
+        return np.repeat(_log_odds(acc)[:, None], K, axis=1)
+    if method == "per_class":
+        onehot = codes[:, :, None] == np.arange(K)
+        predicted = onehot.sum(axis=1)
+        correct = (onehot & (gold[None, :, None] == np.arange(K))).sum(axis=1)
+        # Laplace-smoothed precision of each model for each predicted label
+        return _log_odds((correct + 1) / (predicted + 2))
+    raise ValueError(f"Unknown method: {method}")
+
+
+def vote(codes: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Weighted vote over an (n_models, n_rows) code matrix -> (n_rows,) codes.
+
+    Ties go to the label of the model with the largest total weight; rows
+    where every model abstained fall back to "Others".
+    """
+    onehot = (codes[:, :, None] == np.arange(K)).astype(float)
+    scores = (onehot * weights[:, None, :]).sum(axis=0)
+    best = int(np.argmax(weights.sum(axis=1)))
+    scores += 1e-9 * onehot[best]
+    out = scores.argmax(axis=1)
+    out[scores.max(axis=1) <= 0] = CODES["Others"]
+    return out
+
+
+def out_of_fold_vote(codes: np.ndarray, gold: np.ndarray, method: str, folds: int, seed: int = 42) -> np.ndarray:
+    """Ensemble codes for the gold rows, each fold voted with weights fit on the others."""
+    n = codes.shape[1]
+    if method == "majority" or folds < 2:
+        return vote(codes, fit_weights(codes, gold, method))
+    fold_of = np.random.default_rng(seed).permutation(n) % folds
+    out = np.empty(n, dtype=np.int64)
+    for f in range(folds):
+        test = fold_of == f
+        w = fit_weights(codes[:, ~test], gold[~test], method)
+        out[test] = vote(codes[:, test], w)
+    return out
+
+
+def decode(codes: np.ndarray) -> List[str]:
+    # -1 (off-schema) decodes to '' so it still scores as a wrong prediction
+    return [ALLOWED_LABELS[c] if c >= 0 else "" for c in codes]
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--gold", type=Path, default=GOLD_PATH)
+    p.add_argument("--inputs", type=Path, nargs="+", default=None,
+                   help="Label files aligned with the gold rows (default: outputs/labels_*)")
+    p.add_argument("--method", choices=METHODS, default="per_class")
+    p.add_argument("--folds", type=int, default=5, help="Folds for out-of-fold gold labels")
+    p.add_argument("--out-dir", type=Path, default=MODEL_DIR)
+    p.add_argument("--format", choices=["parquet", "arrow", "csv"], default="csv")
+    p.add_argument("--apply", type=Path, nargs="+", default=None,
+                   help="Label files for another dataset, same models as --inputs, same order")
+    p.add_argument("--apply-out", type=Path, default=None, help="Output directory for --apply")
+    args = p.parse_args()
+
+    inputs = args.inputs or [
+        f for f in glob_tables(MODEL_DIR, "labels_*") if not f.stem.startswith(ENSEMBLE_PREFIX)
+    ]
+    names, codes, base = load_label_sets(inputs)
+    gold_df = read_table(resolve_table(args.gold))
+    if len(gold_df) != codes.shape[1]:
+        raise ValueError(f"Row mismatch: gold={len(gold_df)} vs labels={codes.shape[1]}")
+    gold_labels = gold_df[GOLD_COL].apply(clean_label).tolist()
+    gold = encode(gold_labels)
+
+    agree = pd.DataFrame(agreement_matrix(codes).round(4), index=names, columns=names)
+    print("Pairwise model agreement:")
+    print(agree.to_string())
+    write_table(agree.reset_index(names="model"), args.out_dir / f"ensemble_agreement.{args.format}")
+
+    preds: Dict[str, List[str]] = {n: decode(c) for n, c in zip(names, codes)}
+    for method in METHODS:
+        preds[f"ensemble-{method}"] = decode(out_of_fold_vote(codes, gold, method, args.folds))
+    results = evaluate_many(gold_labels, preds)
+    # macro-F1 over the allowed labels only, as in compute_metrics
+    macro = {n: float(np.mean([r["f1"].get(lbl, 0.0) for lbl in ALLOWED_LABELS])) for n, r in results.items()}
+    print("\nMacro F1 / MCC on gold (ensembles out-of-fold):")
+    for name in sorted(results, key=lambda n: -macro[n]):
+        print(f"  {name:40s} {macro[name]:.4f}  {results[name]['mcc']:.4f}")
+
+    tag = f"ensemble-{args.method}"
+    out = base.copy()
+    out[f"{tag}_labels"] = preds[tag]
+    out_path = write_table(out, args.out_dir / f"labels_{tag}.{args.format}")
+    print(f"\nWrote {out_path}")
+
+    if args.apply:
+        if len(args.apply) != len(names):
+            raise SystemExit(f"--apply needs {len(names)} files (one per model in {names})")
+        weights = fit_weights(codes, gold, args.method)
+        _, apply_codes, apply_base = load_label_sets(args.apply)
+        out = apply_base.copy()
+        out[f"{tag}_labels"] = decode(vote(apply_codes, weights))
+        out_dir = args.apply_out or args.apply[0].parent
+        out_path = write_table(out, out_dir / f"labels_{tag}.{args.format}")
+        print(f"Wrote {len(out)} ensemble labels to {out_path}")
+
+
+if __name__ == "__main__":
+    main()
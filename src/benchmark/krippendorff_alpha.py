@@ -5,13 +5,17 @@ Usage:
         --csv data/raw/reviews_manual_1000_labeled.csv \
         --cols "Label 1 (Kenneth)" "Label 2 (Ben)" "Label 3 (Sahil)"
 
-The script is dependency-free and implements the nominal disagreement.
+Alpha is computed from a units x categories count matrix with NumPy, so
+it scales to many coders and 15k+ units; AlphaAccumulator merges partial
+coincidence matrices for sharded or streaming data.
 """
-from collections import Counter, defaultdict
 import csv
 import math
 import argparse
-from typing import List, Iterable, Tuple, Dict
+from typing import List, Iterable, Optional
+
+import numpy as np
+import pandas as pd
 
 
 def read_ratings(csv_path: str, columns: List[str]) -> List[List[str]]:
@@ -24,78 +28,153 @@ def read_ratings(csv_path: str, columns: List[str]) -> List[List[str]]:
     return rows
 
 
-def krippendorff_alpha_nominal(data: Iterable[Iterable[str]]) -> float:
+def _is_missing(v) -> bool:
+    return v is None or v == '' or (isinstance(v, float) and math.isnan(v))
+
+
+def value_counts_matrix(data: Iterable[Iterable[str]], categories: Optional[List[str]] = None):
+    """Build the units x categories count matrix N[u, c] = #coders giving unit u value c.
+
+    Returns (N, categories). Missing values (None / '' / NaN) are ignored.
+    Passing `categories` fixes the column order (values outside it are dropped).
+    """
+    frame = pd.DataFrame(list(data) if not isinstance(data, pd.DataFrame) else data)
+    if frame.empty:
+        return np.zeros((0, len(categories or [])), dtype=np.int64), list(categories or [])
+    values = frame.to_numpy(dtype=object)
+    n_units, n_coders = values.shape
+    flat = values.ravel()
+    keep = np.array([not _is_missing(v) for v in flat], dtype=bool)
+    unit_idx = np.repeat(np.arange(n_units), n_coders)[keep]
+    if categories is None:
+        codes, uniques = pd.factorize(pd.Series(flat[keep]), sort=True)
+        categories = [str(u) if not isinstance(u, str) else u for u in uniques]
+    else:
+        codes = pd.Categorical(flat[keep], categories=categories).codes
+        unit_idx = unit_idx[codes >= 0]
+        codes = codes[codes >= 0]
+    k = len(categories)
+    N = np.bincount(unit_idx * k + codes, minlength=n_units * k).reshape(n_units, k)
+    return N, list(categories)
+
+
+def coincidence_matrix(N: np.ndarray, method: str = 'legacy') -> np.ndarray:
+    """Coincidence matrix O[c, k] from a units x categories count matrix.
+
+    Units with fewer than two values are not pairable and drop out. With
+    method='standard' each unit's pairs are weighted by 1/(m_u - 1) as in
+    Krippendorff (2011) and the `krippendorff` package; method='legacy'
+    counts every ordered pair once (the original behavior of this module).
+    """
+    N = np.asarray(N, dtype=float)
+    m = N.sum(axis=1)
+    N = N[m >= 2]
+    m = m[m >= 2]
+    w = 1.0 / (m - 1.0) if method == 'standard' else np.ones_like(m)
+    O = (N * w[:, None]).T @ N
+    O[np.diag_indices_from(O)] -= (N * w[:, None]).sum(axis=0)
+    return O
+
+
+def alpha_from_coincidence(O: np.ndarray, method: str = 'legacy') -> float:
+    """Nominal alpha from a coincidence matrix (see coincidence_matrix for `method`)."""
+    O = np.asarray(O, dtype=float)
+    total = O.sum()
+    if total == 0:
+        return float('nan')
+    n_c = O.sum(axis=1)
+    disagree = total - np.trace(O)
+    expected = total * total - (n_c * n_c).sum()
+    if expected == 0.0:
+        # Perfect agreement or no variability
+        return 1.0
+    if method == 'standard':
+        return float(1.0 - (total - 1.0) * disagree / expected)
+    # Do = disagree / total, De = expected / total^2
+    return float(1.0 - total * disagree / expected)
+
+
+def krippendorff_alpha_nominal(data: Iterable[Iterable[str]], method: str = 'legacy') -> float:
     """Compute Krippendorff's alpha for nominal data.
 
     data: iterable of units, each unit is an iterable of category labels
           (use None or empty for missing).
 
-    Implementation follows the coincidence-matrix approach.
+    Implementation follows the coincidence-matrix approach, built from a
+    units x categories count matrix. method='standard' reproduces the
+    `krippendorff` package; the default keeps this module's original
+    estimator (identical whenever every unit has exactly two coders, up to
+    the small-sample n/(n-1) factor).
     """
-    # Build coincidence counts over ordered pairs r != s
-    O: Dict[Tuple[str, str], float] = Counter()
-    categories = set()
-    total_pairs = 0.0
-
-    for unit in data:
-        # collect non-missing labels for this unit
-        labels = [v for v in unit if v is not None and v != '']
-        m = len(labels)
-        if m < 2:
-            continue
-        for i in range(m):
-            a = labels[i]
-            categories.add(a)
-            for j in range(m):
-                if i == j:
-                    continue
-                b = labels[j]
-                categories.add(b)
-                O[(a, b)] += 1.0
-                total_pairs += 1.0
-
-    if total_pairs == 0:
-        return float('nan')
+    N, _ = value_counts_matrix(data)
+    return alpha_from_coincidence(coincidence_matrix(N, method), method)
 
-    # Marginals
-    o_dot = defaultdict(float)
-    for (a, b), cnt in O.items():
-        o_dot[a] += cnt
-
-    # Observed disagreement Do (proportion)
-    Do = 0.0
-    for (a, b), cnt in O.items():
-        d = 0.0 if a == b else 1.0
-        Do += cnt * d
-    Do = Do / total_pairs
-
-    # Expected disagreement De
-    # Expected coincidence E_ab = o_dot[a] * o_dot[b] / total_pairs
-    # De = sum_{a,b} E_ab * delta(a,b) / total_pairs
-    De_num = 0.0
-    for a in o_dot.keys():
-        for b in o_dot.keys():
-            if a == b:
-                continue
-            De_num += (o_dot[a] * o_dot[b])
-    De = De_num / (total_pairs * total_pairs)
-
-    if De == 0.0:
-        # Perfect agreement or no variability
-        return 1.0
 
-    alpha = 1.0 - (Do / De)
-    return alpha
+class AlphaAccumulator:
+    """Mergeable coincidence-matrix accumulator for sharded or streaming data.
+
+    Feed chunks of units with `update()` (or precomputed count matrices with
+    `update_counts()`), combine partial results from other shards/processes
+    with `merge()`, and call `alpha()` at the end. Coincidences are additive
+    over units, so the result equals computing alpha over all units at once.
+    """
+
+    def __init__(self, method: str = 'legacy', categories: Optional[List[str]] = None):
+        self.method = method
+        self.categories: List[str] = list(categories or [])
+        self.O = np.zeros((len(self.categories), len(self.categories)))
+
+    def _align(self, categories: List[str]) -> np.ndarray:
+        """Grow self.O to cover `categories`; return their indices in self.categories."""
+        new = [c for c in categories if c not in self.categories]
+        if new:
+            self.categories.extend(new)
+            k = len(self.categories)
+            grown = np.zeros((k, k))
+            grown[: self.O.shape[0], : self.O.shape[1]] = self.O
+            self.O = grown
+        pos = {c: i for i, c in enumerate(self.categories)}
+        return np.array([pos[c] for c in categories], dtype=np.intp)
+
+    def update_counts(self, N: np.ndarray, categories: List[str]):
+        idx = self._align(categories)
+        self.O[np.ix_(idx, idx)] += coincidence_matrix(N, self.method)
+        return self
+
+    def update(self, data: Iterable[Iterable[str]]):
+        N, categories = value_counts_matrix(data)
+        return self.update_counts(N, categories)
+
+    def merge(self, other: 'AlphaAccumulator'):
+        if other.method != self.method:
+            raise ValueError(f'Cannot merge {other.method!r} accumulator into {self.method!r}')
+        idx = self._align(other.categories)
+        self.O[np.ix_(idx, idx)] += other.O
+        return self
+
+    def alpha(self) -> float:
+        return alpha_from_coincidence(self.O, self.method)
+
+    def to_dict(self) -> dict:
+        return {'method': self.method, 'categories': self.categories, 'O': self.O.tolist()}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> 'AlphaAccumulator':
+        acc = cls(d['method'], d['categories'])
+        acc.O = np.asarray(d['O'], dtype=float).reshape(len(acc.categories), len(acc.categories))
+        return acc
 
 
 def main():
     p = argparse.ArgumentParser()
     p.add_argument('--csv', required=True, help='Path to input CSV')
     p.add_argument('--cols', nargs='+', required=True, help='Label columns (in order)')
+    p.add_argument('--method', choices=['legacy', 'standard'], default='legacy',
+                   help="'standard' matches the krippendorff package")
     args = p.parse_args()
 
     rows = read_ratings(args.csv, args.cols)
-    alpha = krippendorff_alpha_nominal(rows)
+    alpha = krippendorff_alpha_nominal(rows, method=args.method)
     print(f"Krippendorff's alpha (nominal) for columns {args.cols}: {alpha:.6f}")
 
 
@@ -0,0 +1,146 @@
+"""A/B test instruction variants on token cost vs macro-F1 on the gold set.
+
+For every prompt variant (prompts.PROMPT_VARIANTS) and model, the gold
+reviews are rendered exactly as the vendor client sends them and counted
+with the vendor's offline tokenizer (token_counts.py), giving input tokens
+per review and the cost of 1k reviews at MODEL_PRICES. Unless `--dry-run`
+is given, the gold reviews are then labeled with that variant and scored
+with evaluate_one, so each row of the report reads "this much cheaper, this
+much F1 lost" relative to the `full` prompt.
+
+Labels are cached per (model, variant, prompt version, gold rows) under
+`outputs/prompt_ab/`, so re-running only pays for new variants, edited
+prompt text or a different row subset. `--limit` labels a fixed random
+subset of the gold set (`--seed` picks which).
+
+Usage (from `src/`):
+    python -m benchmark.prompt_ab --dry-run                       # tokens and cost only
+    python -m benchmark.prompt_ab --models openai:gpt-4.1-mini --limit 300
+    python -m benchmark.prompt_ab --variants full compact --models google:gemini-2.0-flash
+"""
+import argparse
+import hashlib
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmark.compute_metrics import GOLD_COL, GOLD_PATH, clean_label, normalize_label_column
+from config import MODEL_PRICES, MODELS, OUTPUT_DIR, TEXT_COL
+from evaluate_predictions import evaluate_one
+from labeling.scheduler import EST_OUTPUT_TOKENS
+from prompts import DEFAULT_VARIANT, PROMPT_VARIANTS, prompt_version
+from storage import read_table, resolve_table, review_ids, write_table
+from token_counts import count_many
+
+AB_DIR = OUTPUT_DIR / "prompt_ab"
+
+
+def parse_model(spec: str) -> dict:
+    vendor, _, name = spec.partition(":")
+    if not name:
+        raise argparse.ArgumentTypeError(f"expected vendor:model, got {spec!r}")
+    return {"vendor": vendor, "name": name}
+
+
+def token_cost(vendor: str, model: str, reviews, variant: str) -> dict:
+    counts = count_many(vendor, model, reviews, variant)
+    tokens = np.array([c.tokens for c in counts], dtype=float)
+    price = MODEL_PRICES.get(model)
+    usd = None
+    if price is not None:
+        usd = (tokens.mean() * price["price_in"] + EST_OUTPUT_TOKENS * price["price_out"]) / 1e6 * 1000
+    return {
+        "tokens_in_mean": float(tokens.mean()),
+        "tokens_in_total": int(tokens.sum()),
+        "exact_tokens": all(c.exact for c in counts),
+        "usd_per_1k": usd,
+    }
+
+
+def rows_digest(gold: pd.DataFrame) -> str:
+    """Digest of the gold rows (review IDs in order), so caches of different subsets never mix."""
+    return hashlib.sha1("".join(review_ids(gold[TEXT_COL])).encode("ascii")).hexdigest()[:8]
+
+
+def label_variant(gold: pd.DataFrame, vendor: str, model: str, variant: str, out_dir: Path):
+    """Labels for the gold rows with one variant (cached), or None if the vendor has no client."""
+    from clients.registry import get_client_and_fn, skip_without_client
+    from labeling.runner import label_dataframe_with_model
+
+    version = prompt_version(variant, vendor)
+    path = out_dir / f"labels_{vendor}_{model}.{variant}-{version}.rows-{rows_digest(gold)}.parquet"
+    labels_col = f"{vendor}_{model}_labels"
+    if path.exists():
+        cached = read_table(path)
+        if review_ids(cached[TEXT_COL]) == review_ids(gold[TEXT_COL]):
+            print(f"Cached: {path.name}")
+            return normalize_label_column(cached[labels_col])
+
+    client, call_fn = get_client_and_fn(vendor)
+    if client is None and skip_without_client(vendor):
+        print(f"Client for {vendor} not initialized, skipping {model}.")
+        return None
+    labeled = label_dataframe_with_model(
+        df=gold[[TEXT_COL]].reset_index(drop=True),
+        text_col=TEXT_COL,
+        vendor=vendor,
+        model_name=model,
+        call_fn=call_fn if variant == DEFAULT_VARIANT else partial(call_fn, variant=variant),
+        client=client,
+    )
+    write_table(labeled, path)
+    return normalize_label_column(labeled[labels_col])
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--gold", type=Path, default=GOLD_PATH)
+    p.add_argument("--variants", nargs="+", choices=sorted(PROMPT_VARIANTS), default=list(PROMPT_VARIANTS))
+    p.add_argument("--models", nargs="+", type=parse_model, default=None,
+                   help="vendor:model pairs (default: MODELS in config.py)")
+    p.add_argument("--limit", type=int, default=None, help="Label a random subset of this many gold rows")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--dry-run", action="store_true", help="Token counts and cost only, no API calls")
+    p.add_argument("--out-dir", type=Path, default=AB_DIR)
+    args = p.parse_args()
+
+    gold = read_table(resolve_table(args.gold))
+    if args.limit and args.limit < len(gold):
+        gold = gold.sample(n=args.limit, random_state=args.seed).sort_index()
+    gold = gold.reset_index(drop=True)
+    reviews = gold[TEXT_COL].astype(str).tolist()
+    y_true = gold[GOLD_COL].apply(clean_label).tolist()
+    print(f"{len(gold)} gold reviews, variants: {', '.join(args.variants)}")
+
+    rows = []
+    for cfg in args.models or MODELS:
+        vendor, model = cfg["vendor"], cfg["name"]
+        for variant in args.variants:
+            row = {"vendor": vendor, "model": model, "variant": variant,
+                   "prompt_version": prompt_version(variant, vendor), **token_cost(vendor, model, reviews, variant)}
+            if not args.dry_run:
+                pred = label_variant(gold, vendor, model, variant, args.out_dir)
+                row["f1_macro"] = evaluate_one(y_true, list(pred))["f1_macro"] if pred is not None else None
+            rows.append(row)
+
+    report = pd.DataFrame(rows)
+    base = report[report["variant"] == DEFAULT_VARIANT].set_index(["vendor", "model"])
+    if not base.empty:
+        ref = report.join(base[["tokens_in_mean"] + (["f1_macro"] if "f1_macro" in base else [])],
+                          on=["vendor", "model"], rsuffix="_full")
+        report["token_saving"] = 1 - ref["tokens_in_mean"] / ref["tokens_in_mean_full"]
+        if "f1_macro" in report:
+            report["f1_delta"] = ref["f1_macro"].astype(float) - ref["f1_macro_full"].astype(float)
+
+    with pd.option_context("display.width", 200, "display.max_columns", 20):
+        print("\n" + report.round(4).to_string(index=False))
+    if not report["exact_tokens"].all():
+        print("\n(exact_tokens=False: no offline tokenizer available, counts are ~4 chars/token estimates)")
+    out = write_table(report, args.out_dir / "prompt_ab_summary.csv")
+    print(f"\nWrote {out}")
+
+
+if __name__ == "__main__":
+    main()
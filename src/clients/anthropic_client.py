@@ -3,7 +3,9 @@ from typing import Optional
 import anthropic
 
 from config import ANTHROPIC_API_KEY
-from prompts import build_prompt
+from prompts import DEFAULT_VARIANT, render
+from clients.streaming import stream_label
+from tracing import span
 
 
 def init_anthropic_client() -> Optional[anthropic.Anthropic]:
@@ -13,18 +15,23 @@ def init_anthropic_client() -> Optional[anthropic.Anthropic]:
     return anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
 
 
-def call_anthropic(model_name: str, review: str, client=None) -> str:
+def call_anthropic(model_name: str, review: str, client=None, stream: bool = False,
+                   variant: str = DEFAULT_VARIANT) -> str:
     if client is None:
         raise RuntimeError("Anthropic client is not initialized.")
 
-    prompt = build_prompt(review)
-
-    resp = client.messages.create(
+    request = dict(
         model=model_name,
         max_tokens=64,
         temperature=0.0,
-        system="You are a text classification assistant.",
-        messages=[{"role": "user", "content": prompt}],
+        **render("anthropic", review, variant),   # system + messages
     )
+    if stream:
+        # leaving the context manager closes the stream early
+        with span("anthropic.stream"), client.messages.stream(**request) as s:
+            return stream_label("anthropic", s.text_stream)
+
+    with span("anthropic.request"):
+        resp = client.messages.create(**request)
     # content is a list of blocks
     return resp.content[0].text
\ No newline at end of file
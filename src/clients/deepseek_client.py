@@ -1,11 +1,15 @@
-import os
+import json
+
 import requests
 from typing import Optional
 
-from prompts import SYSTEM_PROMPT
+from config import FIREWORKS_API_KEY
+from prompts import DEFAULT_VARIANT, render
+from clients.streaming import stream_label
+from tracing import span
 
 # Expect your DeepSeek API key here:
-DEEPSEEK_API_KEY = os.getenv("FIREWORKS_API_KEY")
+DEEPSEEK_API_KEY = FIREWORKS_API_KEY
 
 # Official DeepSeek base URL for chat completions
 DEEPSEEK_BASE = "https://api.deepseek.com/v1"
@@ -21,7 +25,22 @@ def init_deepseek_client() -> Optional[str]:
     return DEEPSEEK_API_KEY
 
 
-def call_deepseek(model_name: str, review: str, client: Optional[str] = None) -> str:
+def _sse_deltas(resp):
+    """Yield the content deltas of an OpenAI-compatible server-sent event stream."""
+    for line in resp.iter_lines(decode_unicode=True):
+        if not line or not line.startswith("data:"):
+            continue
+        payload = line[len("data:"):].strip()
+        if payload == "[DONE]":
+            return
+        try:
+            yield json.loads(payload)["choices"][0]["delta"].get("content") or ""
+        except (ValueError, KeyError, IndexError):
+            continue
+
+
+def call_deepseek(model_name: str, review: str, client: Optional[str] = None, stream: bool = False,
+                  variant: str = DEFAULT_VARIANT) -> str:
     """
     Sends `review` to a DeepSeek chat model (e.g., deepseek-v3) using the
     official DeepSeek API.
@@ -34,6 +53,11 @@ def call_deepseek(model_name: str, review: str, client: Optional[str] = None) ->
         The text to classify / analyze.
     client : Optional[str]
         The API key. If None, this function will raise.
+    stream : bool
+        Read the response as server-sent events and close the connection as
+        soon as the label is decoded.
+    variant : str
+        Instruction variant from prompts.PROMPT_VARIANTS.
 
     Returns
     -------
@@ -51,17 +75,23 @@ def call_deepseek(model_name: str, review: str, client: Optional[str] = None) ->
 
     data = {
         "model": model_name,
-        "messages": [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": review},
-        ],
+        **render("fireworks", review, variant),   # system + user messages
         "temperature": 0.0,
         "max_tokens": 64,
     }
 
-    resp = requests.post(url, json=data, headers=headers, timeout=30)
-    resp.raise_for_status()
-    out = resp.json()
+    if stream:
+        data["stream"] = True
+        with span("fireworks.stream"):
+            resp = requests.post(url, json=data, headers=headers, timeout=30, stream=True)
+            resp.raise_for_status()
+            with resp:
+                return stream_label("fireworks", _sse_deltas(resp), close=resp.close)
+
+    with span("fireworks.request"):
+        resp = requests.post(url, json=data, headers=headers, timeout=30)
+        resp.raise_for_status()
+        out = resp.json()
 
     # DeepSeek uses an OpenAI-compatible response format:
     # { "choices": [ { "message": { "content": "..." } } ] }
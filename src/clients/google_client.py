@@ -12,7 +12,10 @@ from google.api_core.exceptions import (
 )
 
 from config import GOOGLE_API_KEY
-from prompts import build_prompt
+from monitoring import record_retry
+from clients.streaming import stream_label
+from prompts import DEFAULT_VARIANT, render
+from tracing import span
 
 
 def init_google_client() -> Optional[object]:
@@ -55,6 +58,28 @@ def _extract_gemini_text(resp) -> str:
     return str(resp)
 
 
+def _chunk_text(chunk) -> str:
+    """Text of one streamed chunk ('' for chunks without parts, e.g. the final one)."""
+    for cand in getattr(chunk, "candidates", None) or []:
+        parts = getattr(getattr(cand, "content", None), "parts", None) or []
+        return "".join(t for t in (getattr(p, "text", None) for p in parts) if isinstance(t, str))
+    return ""
+
+
+def _cancel_stream(resp):
+    """Stop a streamed response early: cancel the gRPC call, or close the REST iterator.
+
+    The SDK keeps the stream on `resp._iterator` and has no public cancel;
+    `resp.resolve()` would read the rest of the stream instead.
+    """
+    it = getattr(resp, "_iterator", None)
+    for name in ("cancel", "close"):
+        fn = getattr(it, name, None)
+        if callable(fn):
+            fn()
+            return
+
+
 # Relax safety as much as the API allows (Gemini still has core safety you can't turn off)
 DEFAULT_SAFETY_SETTINGS = [
     {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
@@ -70,37 +95,49 @@ def call_google(
     client=None,
     max_retries: int = 5,
     base_backoff: float = 1.0,
+    stream: bool = False,
+    variant: str = DEFAULT_VARIANT,
 ) -> str:
     """
     Call a Gemini model (e.g. 'gemini-2.0-flash' or 'gemini-2.5-pro') with
     retry + backoff to handle 429 (Resource exhausted) and transient server errors.
 
     Returns a string label (or raw model output) and NEVER crashes on SDK's
-    `response.text` accessor.
+    `response.text` accessor. With `stream=True` the response is read
+    incrementally and abandoned as soon as the label is decoded.
     """
     if client is None:
         raise RuntimeError("Google generative AI client is not initialized.")
 
-    prompt = build_prompt(review)
+    prompt = render("google", review, variant)
 
-    model = client.GenerativeModel(
-        model_name,
-        safety_settings=DEFAULT_SAFETY_SETTINGS,
-    )
+    with span("google.sdk_setup"):
+        model = client.GenerativeModel(
+            model_name,
+            safety_settings=DEFAULT_SAFETY_SETTINGS,
+            system_instruction=prompt["system_instruction"],
+        )
 
     last_error = None
 
     for attempt in range(max_retries):
         try:
-            resp = model.generate_content(
-                prompt,
-                generation_config={
-                    "temperature": 0.0,
-                    "max_output_tokens": 64,
-                },
-            )
-
-            out = _extract_gemini_text(resp)
+            with span("google.request", attempt=attempt):
+                resp = model.generate_content(
+                    prompt["contents"],
+                    generation_config={
+                        "temperature": 0.0,
+                        "max_output_tokens": 64,
+                    },
+                    stream=stream,
+                )
+
+                if stream:
+                    chunks = (_chunk_text(c) for c in resp)
+                    out = (stream_label("google", chunks, close=lambda: _cancel_stream(resp))
+                           or _extract_gemini_text(resp))
+                else:
+                    out = _extract_gemini_text(resp)
 
             # If safety-blocked, treat as OTHER so the pipeline keeps going
             if out.startswith("[SAFETY_BLOCK"):
@@ -138,12 +175,14 @@ def call_google(
             if attempt == max_retries - 1:
                 raise RuntimeError(f"Google API transient error after retries: {e}") from e
 
+            record_retry("google", model_name, type(e).__name__)
             sleep_for = base_backoff * (2 ** attempt) + random.uniform(0, 0.5)
             print(
                 f"[Google/Gemini] Transient error ({type(e).__name__}): {e}. "
                 f"Retrying in {sleep_for:.1f}s (attempt {attempt + 1}/{max_retries})"
             )
-            time.sleep(sleep_for)
+            with span("google.backoff", attempt=attempt):
+                time.sleep(sleep_for)
 
         except Exception as e:
             # This bubbles up to your runner, which stops after 3 consecutive failures
@@ -1,9 +1,10 @@
-import os
 import requests
 
 from typing import Optional
 
-XAI_API_KEY = os.getenv("XAI_API_KEY")
+from config import XAI_API_KEY
+from prompts import DEFAULT_VARIANT, render
+from tracing import span
 XAI_BASE_URL = "https://api.x.ai/v1"  # your endpoint may vary
 
 def init_grok_client() -> Optional[str]:
@@ -12,9 +13,13 @@ def init_grok_client() -> Optional[str]:
         return None
     return XAI_API_KEY
 
-def call_grok(model_name: str, review: str, client=None) -> str:
+def call_grok(model_name: str, review: str, client=None, stream: bool = False,
+              variant: str = DEFAULT_VARIANT) -> str:
     """
     Sends `review` to the xAI Grok model.
+
+    The generate endpoint used here does not stream, so `stream` is accepted
+    for a uniform client signature and ignored.
     """
     if not client:
         raise RuntimeError("Grok client not initialized or missing API key.")
@@ -26,16 +31,17 @@ def call_grok(model_name: str, review: str, client=None) -> str:
     }
 
     payload = {
-        "input": review,
+        **render("xai", review, variant),   # instructions + review as one input string
         "parameters": {
             "max_completion_tokens": 64,
             "temperature": 0.0,
         },
     }
 
-    response = requests.post(url, json=payload, headers=headers, timeout=30)
-    response.raise_for_status()
-    out = response.json()
+    with span("xai.request"):
+        response = requests.post(url, json=payload, headers=headers, timeout=30)
+        response.raise_for_status()
+        out = response.json()
 
     # Most xAI endpoints put text here:
     if "text" in out:
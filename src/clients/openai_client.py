@@ -1,6 +1,9 @@
 from openai import OpenAI
 from config import OPENAI_API_KEY
-from prompts import SYSTEM_PROMPT, build_prompt
+from monitoring import record_retry
+from prompts import DEFAULT_VARIANT, render
+from clients.streaming import stream_label
+from tracing import span
 
 def init_openai_client():
     if not OPENAI_API_KEY:
@@ -9,16 +12,13 @@ def init_openai_client():
     client = OpenAI(api_key=OPENAI_API_KEY)
     return client
 
-def call_openai(model_name: str, review: str, client=None) -> str:
+def call_openai(model_name: str, review: str, client=None, stream: bool = False,
+                variant: str = DEFAULT_VARIANT) -> str:
     if client is None:
         raise RuntimeError("OpenAI client not initialized.")
 
-    prompt = build_prompt(review)
-
-    messages = [
-        {"role": "system", "content": SYSTEM_PROMPT},
-        {"role": "user", "content": prompt},
-    ]
+    # instructions go in the system message only, the review in the user message
+    messages = render("openai", review, variant)["messages"]
 
     # Choose token parameter based on model name (gpt-5.x uses `max_completion_tokens`)
     token_kwargs = {}
@@ -28,30 +28,41 @@ def call_openai(model_name: str, review: str, client=None) -> str:
         token_kwargs["max_tokens"] = 64
 
     try:
-        response = client.chat.completions.create(
-            model=model_name,
-            messages=messages,
-            temperature=0.0,
-            **token_kwargs,
-        )
+        with span("openai.request"):
+            response = client.chat.completions.create(
+                model=model_name,
+                messages=messages,
+                temperature=0.0,
+                stream=stream,
+                **token_kwargs,
+            )
     except Exception as e:
         # If the model rejected the chosen token parameter, try the other one.
         err = str(e)
         if "max_tokens" in err and "not supported" in err or "Unsupported parameter" in err:
             # swap to the other parameter and retry
+            record_retry("openai", model_name, "token_param")
             alt_kwargs = {}
             if "max_tokens" in token_kwargs:
                 alt_kwargs["max_completion_tokens"] = token_kwargs.get("max_tokens", 64)
             else:
                 alt_kwargs["max_tokens"] = token_kwargs.get("max_completion_tokens", 64)
 
-            response = client.chat.completions.create(
-                model=model_name,
-                messages=messages,
-                temperature=0.0,
-                **alt_kwargs,
-            )
+            with span("openai.request", retry="token_param"):
+                response = client.chat.completions.create(
+                    model=model_name,
+                    messages=messages,
+                    temperature=0.0,
+                    stream=stream,
+                    **alt_kwargs,
+                )
         else:
             raise
 
+    if stream:
+        # stop reading (and close the connection) once the label is decoded
+        chunks = (c.choices[0].delta.content for c in response if c.choices)
+        with span("openai.stream"):
+            return stream_label("openai", chunks, close=response.close)
+
     return response.choices[0].message.content.strip()
@@ -0,0 +1,97 @@
+"""Lazy registry of vendor client plugins.
+
+Each vendor maps to the module that implements it plus the names of its
+`init` and `call` functions. Nothing is imported until a vendor is first
+used, so running only Gemini never imports `openai`, `anthropic` or
+`requests`.
+
+Extra vendors can be registered in code with `register_vendor()` or shipped
+by another installed package through the `review_labeler.vendors` entry
+point group. The entry point name is the vendor; it must load an object
+(usually a module) exposing `init_client()` and
+`call(model_name, review, client=None)` (plus `stream=` / `variant=` keywords
+if it supports `--stream` / `--prompt-variant`):
+
+    [project.entry-points."review_labeler.vendors"]
+    mistral = "my_pkg.mistral_client"
+"""
+import importlib
+from dataclasses import dataclass
+from typing import Callable, Dict, Tuple
+
+ENTRY_POINT_GROUP = "review_labeler.vendors"
+
+
+@dataclass(frozen=True)
+class VendorSpec:
+    module: str
+    init: str = "init_client"
+    call: str = "call"
+    # skip the model (instead of failing on the first call) when init returns None
+    skip_without_client: bool = True
+
+
+_VENDORS: Dict[str, VendorSpec] = {
+    "openai": VendorSpec("clients.openai_client", "init_openai_client", "call_openai"),
+    "anthropic": VendorSpec("clients.anthropic_client", "init_anthropic_client", "call_anthropic"),
+    "google": VendorSpec("clients.google_client", "init_google_client", "call_google"),
+    "fireworks": VendorSpec("clients.deepseek_client", "init_deepseek_client", "call_deepseek", False),  # deepseek
+    "xai": VendorSpec("clients.grok_client", "init_grok_client", "call_grok", False),  # grok
+}
+
+_entry_points: Dict[str, object] = {}
+_loaded: Dict[str, Tuple[Callable, Callable]] = {}
+_entry_points_scanned = False
+
+
+def register_vendor(name: str, module: str, init: str = "init_client", call: str = "call",
+                    skip_without_client: bool = True):
+    _VENDORS[name] = VendorSpec(module, init, call, skip_without_client)
+    _loaded.pop(name, None)
+
+
+def _scan_entry_points():
+    global _entry_points_scanned
+    if _entry_points_scanned:
+        return
+    _entry_points_scanned = True
+    from importlib.metadata import entry_points
+
+    # built-in vendors win over plugins with the same name
+    for ep in entry_points(group=ENTRY_POINT_GROUP):
+        if ep.name not in _VENDORS:
+            _entry_points[ep.name] = ep
+
+
+def available_vendors():
+    _scan_entry_points()
+    return sorted(set(_VENDORS) | set(_entry_points))
+
+
+def skip_without_client(vendor: str) -> bool:
+    spec = _VENDORS.get(vendor)
+    return spec.skip_without_client if spec else True
+
+
+def load_vendor(vendor: str) -> Tuple[Callable, Callable]:
+    """Import the vendor's module on first use; return its (init, call) functions."""
+    if vendor in _loaded:
+        return _loaded[vendor]
+    if vendor not in _VENDORS:
+        _scan_entry_points()
+    if vendor in _VENDORS:
+        spec = _VENDORS[vendor]
+        mod = importlib.import_module(spec.module)
+        fns = (getattr(mod, spec.init), getattr(mod, spec.call))
+    elif vendor in _entry_points:
+        plugin = _entry_points[vendor].load()
+        fns = (plugin.init_client, plugin.call)
+    else:
+        raise ValueError(f"Unknown vendor: {vendor}")
+    _loaded[vendor] = fns
+    return fns
+
+
+def get_client_and_fn(vendor: str):
+    init_fn, call_fn = load_vendor(vendor)
+    return init_fn(), call_fn
@@ -0,0 +1,91 @@
+"""Early termination for streamed completions.
+
+A streamed completion is fed chunk by chunk into a prefix trie of
+ALLOWED_LABELS. As soon as the text decoded so far can only be one label,
+the caller closes the stream and the canonical label is returned, so we
+neither wait for nor pay for trailing explanation tokens.
+
+Matching ignores case, runs of whitespace, and leading quotes, brackets and
+markdown (`"`, `[`, `*`, ...), so `["Delivery Issue"]` and `**delivery
+issue**` both resolve. A label is only accepted once its first word has been
+read in full (e.g. "Delivery", not just "D"), which keeps a stray leading
+token from deciding the label. If the text leaves the trie, or the stream
+ends first, the full text is returned as before and parsed downstream.
+"""
+from typing import Dict, Iterable, Optional, Tuple
+
+from config import ALLOWED_LABELS
+from monitoring import REGISTRY
+
+LEADING_JUNK = " \t\r\n\"'`[*#:-"
+
+STREAM_CANCELLED = REGISTRY.counter(
+    "labeler_stream_cancelled_total", "Streams closed early once the label was decoded", ("vendor",)
+)
+
+
+def _norm(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+class LabelTrie:
+    def __init__(self, labels=ALLOWED_LABELS):
+        self.root: Dict = {}
+        for label in labels:
+            node = self.root
+            for ch in _norm(label):
+                node = node.setdefault(ch, {})
+                node.setdefault("$labels", set()).add(label)
+        # characters that must be read before a unique label is trusted
+        self.min_chars = {label: len(_norm(label).split(" ")[0]) for label in labels}
+
+    def match(self, text: str) -> Tuple[bool, Optional[str]]:
+        """(still_possible, label) for the text decoded so far.
+
+        The label is reported as soon as some prefix of the text pins it
+        down, so trailing text arriving in the same chunk does not matter.
+        """
+        s = _norm(text.lstrip(LEADING_JUNK))
+        node = self.root
+        for i, ch in enumerate(s, 1):
+            if ch not in node:
+                return False, None
+            node = node[ch]
+            candidates = node["$labels"]
+            if len(candidates) == 1:
+                (label,) = candidates
+                if i >= self.min_chars[label]:
+                    return True, label
+        return True, None
+
+
+DEFAULT_TRIE = LabelTrie()
+
+
+def read_until_label(chunks: Iterable[str], trie: LabelTrie = DEFAULT_TRIE) -> Tuple[str, bool]:
+    """Consume text chunks until the label is unambiguous.
+
+    Returns (text, cancelled): the canonical label with cancelled=True when
+    the stream can be closed early, else the full text with cancelled=False.
+    """
+    text = ""
+    possible = True
+    for chunk in chunks:
+        if not chunk:
+            continue
+        text += chunk
+        if possible:
+            possible, label = trie.match(text)
+            if label:
+                return label, True
+    return text.strip(), False
+
+
+def stream_label(vendor: str, chunks: Iterable[str], close=None) -> str:
+    """read_until_label + close the underlying stream and count the early stop."""
+    text, cancelled = read_until_label(chunks)
+    if cancelled:
+        STREAM_CANCELLED.inc(vendor=vendor)
+        if close is not None:
+            close()
+    return text
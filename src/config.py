@@ -1,27 +1,21 @@
 import os
 import pathlib
-from dotenv import load_dotenv
 
 # Base directory for repo
 BASE_DIR = pathlib.Path(__file__).resolve().parent.parent
 
-# Load environment from a local .env (if present)
-load_dotenv()
-
-# Also attempt to load secrets from `resources/api_keys.env` when available
-alt_dotenv = BASE_DIR / "resources" / "api_keys.env"
-if alt_dotenv.exists():
-    load_dotenv(dotenv_path=str(alt_dotenv))
-
 DATA_DIR = BASE_DIR / "data/processed"
-OUTPUT_DIR = BASE_DIR / "outputs"
-OUTPUT_DIR.mkdir(exist_ok=True, parents=True)
+OUTPUT_DIR = BASE_DIR / "outputs"   # created by the writers on first save
 
 DATA_PATH = DATA_DIR / "reviews_manual_1000.csv"
 # DATA_PATH = DATA_DIR / "reviews_llm_15000.csv"
 
 TEXT_COL = "content"  # change this if your CSV uses a different name
 
+# On-disk format for datasets and label outputs: "parquet" (default), "arrow" or "csv".
+# Readers accept any of them; CSV copies can always be exported via `python src/storage.py`.
+STORAGE_FORMAT = os.getenv("STORAGE_FORMAT", "parquet")
+
 # ---------------------------------------------
 # UPDATED LABEL SET (8 LABELS)
 # ---------------------------------------------
@@ -60,11 +54,65 @@ MODELS = [
 
 ]
 
+# ---------------------------------------------
+# PRICES (USD per 1M tokens) -- verify before large runs
+# ---------------------------------------------
+MODEL_PRICES = {
+    "gpt-5.1":           {"price_in": 1.25, "price_out": 10.00},
+    "gpt-4.1-mini":      {"price_in": 0.40, "price_out": 1.60},
+    "claude-sonnet-4-5": {"price_in": 3.00, "price_out": 15.00},
+    "claude-haiku-4-5":  {"price_in": 1.00, "price_out": 5.00},
+    "deepseek-chat":     {"price_in": 0.56, "price_out": 1.68},
+    "gemini-2.0-flash":  {"price_in": 0.10, "price_out": 0.40},
+}
+
+# ---------------------------------------------
+# PER-VENDOR QUOTAS (used by labeling/scheduler.py)
+# rpm = requests per minute, concurrency = parallel workers
+# ---------------------------------------------
+VENDOR_QUOTAS = {
+    "openai":    {"rpm": 500, "concurrency": 4},
+    "anthropic": {"rpm": 50,  "concurrency": 2},
+    "google":    {"rpm": 60,  "concurrency": 2},
+    "fireworks": {"rpm": 60,  "concurrency": 2},
+    "xai":       {"rpm": 60,  "concurrency": 2},
+}
+
 # ---------------------------------------------
 # API KEYS
+# Resolved on first access (`from config import OPENAI_API_KEY`), so the
+# .env files are only read when a vendor client is actually initialized.
 # ---------------------------------------------
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-XAI_API_KEY = os.getenv("XAI_API_KEY")
-FIREWORKS_API_KEY = os.getenv("FIREWORKS_API_KEY")
\ No newline at end of file
+API_KEY_NAMES = (
+    "OPENAI_API_KEY",
+    "ANTHROPIC_API_KEY",
+    "GOOGLE_API_KEY",
+    "XAI_API_KEY",
+    "FIREWORKS_API_KEY",
+)
+
+_env_loaded = False
+
+
+def load_env():
+    """Load a local .env and `resources/api_keys.env` (if present), once."""
+    global _env_loaded
+    if _env_loaded:
+        return
+    from dotenv import load_dotenv
+
+    # Load environment from a local .env (if present)
+    load_dotenv()
+
+    # Also attempt to load secrets from `resources/api_keys.env` when available
+    alt_dotenv = BASE_DIR / "resources" / "api_keys.env"
+    if alt_dotenv.exists():
+        load_dotenv(dotenv_path=str(alt_dotenv))
+    _env_loaded = True
+
+
+def __getattr__(name):
+    if name in API_KEY_NAMES:
+        load_env()
+        return os.getenv(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
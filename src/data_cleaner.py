@@ -1,13 +1,82 @@
-import pandas as pd
+"""Clean the raw food-delivery reviews and build the manual / LLM splits.
+
+The raw Kaggle dump is converted ONCE to Parquet. Every later run streams the
+Parquet file in record batches with the App / Rating / Platform / date filters
+pushed down into the scan, cleans each batch, and feeds the survivors into a
+single-pass reservoir sample that produces both splits. Memory is the
+reservoir plus 8 bytes per distinct userName (SeenUsers keeps 64-bit hashes
+for the one-review-per-user rule), not the size of the source.
+
+Usage:
+    # one-off conversion of the workbook (or a CSV export) to Parquet
+    python src/data_cleaner.py convert \
+        --src data/raw/food_delivery_apps.xlsx \
+        --out data/raw/food_delivery_apps.parquet
+
+    # stream, filter, clean and sample
+    python src/data_cleaner.py clean \
+        --src data/raw/food_delivery_apps.parquet \
+        --app Grubhub --rating 1 --platform "Google Play"
+
+    # after the source has been re-exported: clean only reviews newer than
+    # the stored watermark and queue them for labeling
+    python src/data_cleaner.py refresh --src data/raw/food_delivery_apps.parquet
+
+Refresh never touches the existing manual / LLM splits or their labels. On
+the first refresh (no watermark yet) the watermark is seeded from those
+splits, so reviews up to their newest date are not queued again. New
+clean rows are appended as a part file under `data/processed/store/` and a
+copy is written to `data/processed/queue/`; label just those rows with
+
+    python src/main_label_reviews.py \
+        --data data/processed/queue/reviews_new_<stamp>.parquet \
+        --out-dir outputs/queue/<stamp>
+"""
+import argparse
+import json
 import re
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 from unidecode import unidecode   # pip install unidecode
-from langdetect import detect, LangDetectException   # pip install langdetect
+from langdetect import DetectorFactory, detect, LangDetectException   # pip install langdetect
+
+from storage import glob_tables, read_table, review_ids, shard_of, write_table
+
+# langdetect is randomized by default; pin it so reruns give the same splits
+DetectorFactory.seed = 0
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+RAW_DIR = BASE_DIR / "data" / "raw"
+DATA_DIR = BASE_DIR / "data" / "processed"
+
+DEFAULT_SOURCE = RAW_DIR / "food_delivery_apps.parquet"
+STORE_DIR = DATA_DIR / "store"
+QUEUE_DIR = DATA_DIR / "queue"
+WATERMARK_FILE = "_watermark.json"
+SPLIT_PATTERNS = ("reviews_manual_*", "reviews_llm_*")   # clean splits that seed a new watermark
+USERS_DIR = "_users"      # userNames already in the store, bucketed by hash
+USER_BUCKETS = 64
 
-# 1) Load data
-df = pd.read_excel("food_delivery_apps.xlsx")   # or pd.read_csv("file.csv")
+# Columns read from the source; everything else in the dump is never loaded
+SOURCE_COLUMNS = ["date", "content", "score", "userName", "app", "platform"]
 
-# Drop rows with no review text
-df = df[df["content"].notna()].copy()
+SOURCE_SCHEMA = pa.schema([
+    ("date", pa.timestamp("s")),
+    ("content", pa.string()),
+    ("score", pa.int64()),
+    ("userName", pa.string()),
+    ("app", pa.string()),
+    ("platform", pa.string()),
+])
+
+MIN_CONTENT_LEN = 20
 
 # 2) Text cleaning (in-place on 'content')
 MOJIBAKE_REPLACEMENTS = {
@@ -23,29 +92,25 @@ MOJIBAKE_REPLACEMENTS = {
     "√≤": "<=",
 }
 
+
 def clean_text(s: str) -> str:
     if not isinstance(s, str):
         return s
-    
+
     # 1) fix common mojibake sequences
     for bad, good in MOJIBAKE_REPLACEMENTS.items():
         s = s.replace(bad, good)
-    
+
     # 2) normalize accents / fancy punctuation
     s = unidecode(s)
-    
+
     # 3) normalize whitespace and line breaks
     s = s.replace("\n", " ").replace("\r", " ")
     s = re.sub(r"\s+", " ", s)
-    
+
     # 4) strip outer spaces
     return s.strip()
 
-# overwrite raw content directly
-df["content"] = df["content"].apply(clean_text)
-
-# 3) Filter very short reviews
-df = df[df["content"].str.len() >= 20]
 
 # 4) Language detection and filter to English
 def safe_lang_detect(text):
@@ -54,20 +119,472 @@ def safe_lang_detect(text):
     except LangDetectException:
         return "unknown"
 
-df["lang"] = df["content"].apply(safe_lang_detect)
-df = df[df["lang"] == "en"].copy()
 
-# 5) Drop duplicate users (one review per userName)
-df = df.drop_duplicates(subset=["userName"])
+# ---------------------------
+# Conversion
+# ---------------------------
+def _coerce_batch(df: pd.DataFrame) -> pa.RecordBatch:
+    """Cast one raw chunk to SOURCE_SCHEMA so every Parquet row group agrees."""
+    for col in SOURCE_COLUMNS:
+        if col not in df.columns:
+            df[col] = None
+    df = df[SOURCE_COLUMNS].copy()
+    df["date"] = pd.to_datetime(df["date"], errors="coerce").astype("datetime64[s]")
+    df["score"] = pd.to_numeric(df["score"], errors="coerce").astype("Int64")
+    for col in ("content", "userName", "app", "platform"):
+        df[col] = df[col].astype("string")
+    return pa.RecordBatch.from_pandas(df, schema=SOURCE_SCHEMA, preserve_index=False)
+
+
+def _iter_excel_chunks(path: Path, chunk_size: int) -> Iterator[pd.DataFrame]:
+    # read_only mode streams rows instead of materializing the whole workbook
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = [str(h) if h is not None else "" for h in next(rows)]
+        buf = []
+        for row in rows:
+            buf.append(row)
+            if len(buf) >= chunk_size:
+                yield pd.DataFrame(buf, columns=header)
+                buf = []
+        if buf:
+            yield pd.DataFrame(buf, columns=header)
+    finally:
+        wb.close()
+
+
+def _iter_csv_chunks(path: Path, chunk_size: int) -> Iterator[pd.DataFrame]:
+    yield from pd.read_csv(path, chunksize=chunk_size, usecols=lambda c: c in SOURCE_COLUMNS)
+
+
+def convert_to_parquet(src: Path, out: Path, chunk_size: int = 100_000) -> int:
+    """Convert the raw .xlsx / .csv dump to Parquet chunk by chunk."""
+    if src.suffix.lower() in (".xlsx", ".xlsm"):
+        chunks = _iter_excel_chunks(src, chunk_size)
+    elif src.suffix.lower() == ".csv":
+        chunks = _iter_csv_chunks(src, chunk_size)
+    else:
+        raise ValueError(f"Unsupported source format: {src.suffix}")
+
+    out.parent.mkdir(parents=True, exist_ok=True)
+    n_rows = 0
+    with pq.ParquetWriter(out, SOURCE_SCHEMA, compression="zstd") as writer:
+        for chunk in chunks:
+            writer.write_batch(_coerce_batch(chunk))
+            n_rows += len(chunk)
+    return n_rows
+
+
+# ---------------------------
+# Streaming clean
+# ---------------------------
+def build_filter(
+    app: Optional[str] = None,
+    rating: Optional[int] = None,
+    platform: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+) -> Optional[ds.Expression]:
+    """Build the pushdown filter for the README's App / Rating / Platform subset."""
+    conds = []
+    if app:
+        conds.append(ds.field("app") == app)
+    if rating is not None:
+        conds.append(ds.field("score") == rating)
+    if platform:
+        conds.append(ds.field("platform") == platform)
+    if date_from:
+        conds.append(ds.field("date") >= pa.scalar(pd.Timestamp(date_from).to_pydatetime(), pa.timestamp("s")))
+    if date_to:
+        conds.append(ds.field("date") < pa.scalar(pd.Timestamp(date_to).to_pydatetime(), pa.timestamp("s")))
+    if not conds:
+        return None
+    expr = conds[0]
+    for c in conds[1:]:
+        expr = expr & c
+    return expr
+
+
+def iter_source_batches(src: Path, filter_expr=None, batch_size: int = 50_000) -> Iterator[pd.DataFrame]:
+    dataset = ds.dataset(src, format="parquet")
+    columns = [c for c in SOURCE_COLUMNS if c in dataset.schema.names]
+    for batch in dataset.to_batches(columns=columns, filter=filter_expr, batch_size=batch_size):
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+
+class SeenUsers:
+    """userNames seen so far, kept as a sorted array of 64-bit hashes.
+
+    Eight bytes per user instead of a str in a set; two different names
+    collide with probability ~n^2 / 2^65 (about 3e-6 at 10M users), in which
+    case the later one's review is dropped as a repeat.
+    """
+
+    def __init__(self):
+        self.hashes = np.empty(0, dtype=np.uint64)
+
+    def add_new(self, users: pd.Series) -> np.ndarray:
+        """Mask of the (already unique) `users` not seen before; records them as seen."""
+        h = pd.util.hash_pandas_object(users.astype(object), index=False).to_numpy()
+        pos = np.searchsorted(self.hashes, h)
+        seen = pos < len(self.hashes)
+        seen[seen] = self.hashes[pos[seen]] == h[seen]
+        self.hashes = np.union1d(self.hashes, h[~seen])
+        return ~seen
+
+    def __len__(self):
+        return len(self.hashes)
+
+
+def clean_chunk(df: pd.DataFrame, seen_users: SeenUsers) -> pd.DataFrame:
+    """Apply the cleaning steps to one chunk.
+
+    `seen_users` carries the userName dedupe across chunks so the result is
+    the same as deduplicating the full table.
+    """
+    # Drop rows with no review text
+    df = df[df["content"].notna()].copy()
+
+    # overwrite raw content directly
+    df["content"] = df["content"].apply(clean_text)
+
+    # 3) Filter very short reviews
+    df = df[df["content"].str.len() >= MIN_CONTENT_LEN]
+
+    # 4) Filter to English
+    df = df[df["content"].apply(safe_lang_detect) == "en"]
+
+    # 5) Drop duplicate users (one review per userName, first one wins)
+    if "userName" in df.columns:
+        df = df.drop_duplicates(subset=["userName"])
+        df = df[seen_users.add_new(df["userName"])]
+    return df
+
+
+class ReservoirSampler:
+    """Uniform sample of `k` rows from a stream of DataFrame chunks (Algorithm R)."""
+
+    def __init__(self, k: int, seed: int = 42):
+        self.k = k
+        self.rng = np.random.default_rng(seed)
+        self.seen = 0
+        self.rows: List[dict] = []
+
+    def update(self, df: pd.DataFrame):
+        records = df.to_dict("records")
+        n = len(records)
+        if n == 0:
+            return
+
+        # fill the reservoir first
+        fill = min(max(self.k - self.seen, 0), n)
+        self.rows.extend(records[:fill])
+
+        # then each later row t (0-based stream position) replaces a slot with prob k/(t+1)
+        if fill < n:
+            positions = np.arange(self.seen + fill, self.seen + n)
+            slots = self.rng.integers(0, positions + 1)
+            for i in np.flatnonzero(slots < self.k):
+                self.rows[slots[i]] = records[fill + i]
+
+        self.seen += n
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.rows)
+
+
+def clean_and_sample(
+    src: Path,
+    n_manual: int = 1000,
+    n_llm: int = 15000,
+    filter_expr=None,
+    batch_size: int = 50_000,
+    seed: int = 42,
+    clean_out: Optional[Path] = None,
+):
+    """Stream `src`, clean each chunk, and reservoir-sample the two splits."""
+    sampler = ReservoirSampler(n_manual + n_llm, seed=seed)
+    seen_users = SeenUsers()
+    writer = None
+    n_in = n_clean = 0
+
+    try:
+        for chunk in iter_source_batches(src, filter_expr, batch_size):
+            n_in += len(chunk)
+            cleaned = clean_chunk(chunk, seen_users)
+            n_clean += len(cleaned)
+            sampler.update(cleaned)
+
+            if clean_out is not None and len(cleaned):
+                table = pa.Table.from_pandas(cleaned, preserve_index=False)
+                if writer is None:
+                    clean_out.parent.mkdir(parents=True, exist_ok=True)
+                    writer = pq.ParquetWriter(clean_out, table.schema, compression="zstd")
+                writer.write_table(table.cast(writer.schema))
+
+            print(f"Processed {n_in} rows, {n_clean} kept after cleaning...")
+    finally:
+        if writer is not None:
+            writer.close()
+
+    sample = sampler.to_frame()
+    if len(sample) < n_manual + n_llm:
+        raise ValueError(
+            f"Only {len(sample)} clean reviews available, need {n_manual + n_llm}"
+        )
+
+    # 7) Create manual (1k) and LLM (15k) splits from the shuffled reservoir
+    sample = sample.sample(frac=1.0, random_state=seed).reset_index(drop=True)
+    df_manual = sample.iloc[:n_manual]
+    df_llm = sample.iloc[n_manual:]
+    return df_manual, df_llm, n_in, n_clean
+
+
+# ---------------------------
+# Incremental refresh
+# ---------------------------
+def _empty_watermark() -> dict:
+    return {"max_date": None, "boundary_ids": [], "n_rows": 0, "parts": []}
+
+
+def load_watermark(store_dir: Path) -> dict:
+    path = store_dir / WATERMARK_FILE
+    if not path.exists():
+        return _empty_watermark()
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def save_watermark(store_dir: Path, wm: dict):
+    store_dir.mkdir(parents=True, exist_ok=True)
+    tmp = store_dir / (WATERMARK_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(wm, fh, indent=2)
+    tmp.replace(store_dir / WATERMARK_FILE)  # atomic, so a crash never leaves half a watermark
+
+
+def seed_watermark(processed_dir: Path = DATA_DIR) -> dict:
+    """A first watermark at the newest review of the existing clean splits.
+
+    The splits keep dates to the minute only, so the boundary IDs are every
+    split review in that last minute; the scan starts at the minute and
+    skips them.
+    """
+    wm = _empty_watermark()
+    dates, ids = [], []
+    for pattern in SPLIT_PATTERNS:
+        for path in glob_tables(processed_dir, pattern):
+            df = read_table(path, columns=["date", "content"])
+            dates.append(pd.to_datetime(df["date"], errors="coerce", format="mixed"))
+            ids.append(pd.Series(review_ids(df["content"]), index=df.index))
+    if not dates:
+        return wm
+    date, rid = pd.concat(dates, ignore_index=True), pd.concat(ids, ignore_index=True)
+    if date.notna().any():
+        max_date = date.max()
+        wm["max_date"] = max_date.isoformat()
+        wm["boundary_ids"] = sorted(set(rid[date == max_date]))
+        wm["seeded_from"] = str(processed_dir)
+        print(f"Seeded watermark {wm['max_date']} from the clean splits in {processed_dir}")
+    return wm
+
+
+def _user_bucket_path(store_dir: Path, bucket: int) -> Path:
+    return store_dir / USERS_DIR / f"bucket-{bucket:02d}.parquet"
+
+
+def _by_bucket(users: Iterable[str]) -> Dict[int, List[str]]:
+    out: Dict[int, List[str]] = {}
+    for u in users:
+        out.setdefault(shard_of(u, USER_BUCKETS), []).append(u)
+    return out
+
+
+def _known_users(store_dir: Path, users: Iterable[str]) -> set:
+    """Those of `users` already in the store; reads only the buckets they hash to."""
+    known = set()
+    for bucket, names in _by_bucket(users).items():
+        path = _user_bucket_path(store_dir, bucket)
+        if path.exists():
+            known.update(set(read_table(path, columns=["userName"])["userName"]) & set(names))
+    return known
+
+
+def _add_users(store_dir: Path, users: Iterable[str]):
+    for bucket, names in _by_bucket(users).items():
+        path = _user_bucket_path(store_dir, bucket)
+        old = set(read_table(path, columns=["userName"])["userName"]) if path.exists() else set()
+        write_table(pd.DataFrame({"userName": sorted(old | set(names))}), path)
+
+
+def _bucket_store_users(store_dir: Path, wm: dict):
+    """One-off for stores written before the user buckets existed: bucket the users of every part."""
+    if wm.get("user_buckets") or not wm["parts"]:
+        return
+    users = set()
+    for name in wm["parts"]:
+        users.update(read_table(store_dir / name, columns=["userName"])["userName"].dropna())
+    _add_users(store_dir, sorted(users))
+    wm["user_buckets"] = USER_BUCKETS
+    save_watermark(store_dir, wm)
+
+
+def refresh_store(
+    src: Path,
+    store_dir: Path = STORE_DIR,
+    queue_dir: Path = QUEUE_DIR,
+    filter_expr=None,
+    batch_size: int = 50_000,
+    processed_dir: Path = DATA_DIR,
+) -> Optional[Path]:
+    """Clean only reviews past the watermark and append them to the store.
+
+    The watermark is the max processed `date` plus the review IDs (content
+    hashes) seen AT that date, so reviews sharing the boundary timestamp are
+    neither lost nor double-counted. Without a watermark it is seeded from
+    the clean splits in `processed_dir`. The scan starts at the watermark and
+    the one-review-per-user check reads only the user buckets of the new
+    rows, so a refresh costs time proportional to the new data only.
+    Returns the queue file with the new rows, or None if nothing was new.
+    """
+    wm = load_watermark(store_dir)
+    if wm["max_date"] is None and not wm["parts"]:
+        wm = seed_watermark(processed_dir)
+    _bucket_store_users(store_dir, wm)
+    boundary_ids = set(wm["boundary_ids"])
+
+    since = ds.field("date") >= pa.scalar(pd.Timestamp(wm["max_date"]).to_pydatetime(), pa.timestamp("s")) \
+        if wm["max_date"] else None
+    if since is not None:
+        filter_expr = since if filter_expr is None else filter_expr & since
+
+    seen_users = SeenUsers()   # users in this refresh; store users are checked below
+    new_chunks = []
+    n_in = 0
+    for chunk in iter_source_batches(src, filter_expr, batch_size):
+        n_in += len(chunk)
+        cleaned = clean_chunk(chunk, seen_users)
+        if cleaned.empty:
+            continue
+        cleaned = cleaned.assign(review_id=review_ids(cleaned["content"]))
+        cleaned = cleaned[~cleaned["review_id"].isin(boundary_ids)]
+        new_chunks.append(cleaned)
+
+    print(f"Scanned {n_in} rows since watermark {wm['max_date']}")
+    if not new_chunks or sum(len(c) for c in new_chunks) == 0:
+        print("No new reviews.")
+        return None
+
+    new = pd.concat(new_chunks, ignore_index=True).drop_duplicates(subset=["review_id"])
+    if "userName" in new.columns:
+        # one review per user across the store, as clean_chunk does within a run
+        new = new[~new["userName"].isin(_known_users(store_dir, new["userName"].dropna().unique()))]
+        if new.empty:
+            print("No new reviews (all from users already in the store).")
+            return None
+    stamp = datetime.now().strftime("%Y%m%d%H%M%S%f")   # with microseconds: refreshes in the same second must not share a part
+    part_name = f"part-{stamp}.parquet"
+    write_table(new, store_dir / part_name)
+    if "userName" in new.columns:
+        _add_users(store_dir, new["userName"].dropna().unique().tolist())
+    queue_path = write_table(new[["review_id", "date", "content"]], queue_dir / f"reviews_new_{stamp}.parquet")
+
+    # advance the watermark; keep the boundary IDs when the max date did not move
+    max_date = new["date"].max()
+    at_max = new.loc[new["date"] == max_date, "review_id"].tolist()
+    if wm["max_date"] and pd.Timestamp(wm["max_date"]) == max_date:
+        at_max = sorted(boundary_ids | set(at_max))
+    save_watermark(store_dir, {
+        "max_date": max_date.isoformat(),
+        "boundary_ids": at_max,
+        "n_rows": wm["n_rows"] + len(new),
+        "parts": wm["parts"] + [part_name],
+        "user_buckets": USER_BUCKETS,
+        "refreshed_at": datetime.now().isoformat(timespec="seconds"),
+    })
+
+    print(f"Appended {len(new)} new reviews to {store_dir / part_name}")
+    print(f"Queued them for labeling at {queue_path}")
+    return queue_path
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    pc = sub.add_parser("convert", help="Convert the raw .xlsx/.csv dump to Parquet (run once)")
+    pc.add_argument("--src", type=Path, default=RAW_DIR / "food_delivery_apps.xlsx")
+    pc.add_argument("--out", type=Path, default=DEFAULT_SOURCE)
+    pc.add_argument("--chunk-size", type=int, default=100_000)
+
+    pl = sub.add_parser("clean", help="Stream, filter, clean and sample the Parquet source")
+    pl.add_argument("--src", type=Path, default=DEFAULT_SOURCE)
+    pl.add_argument("--app", default="Grubhub")
+    pl.add_argument("--rating", type=int, default=1)
+    pl.add_argument("--platform", default="Google Play")
+    pl.add_argument("--date-from", default=None, help="Inclusive lower bound on review date")
+    pl.add_argument("--date-to", default=None, help="Exclusive upper bound on review date")
+    pl.add_argument("--n-manual", type=int, default=1000)
+    pl.add_argument("--n-llm", type=int, default=15000)
+    pl.add_argument("--batch-size", type=int, default=50_000)
+    pl.add_argument("--seed", type=int, default=42)
+    pl.add_argument("--out-dir", type=Path, default=DATA_DIR)
+    pl.add_argument("--clean-out", type=Path, default=None, help="Optional Parquet path for the full cleaned set")
+
+    pr = sub.add_parser("refresh", help="Clean only reviews newer than the store watermark")
+    pr.add_argument("--src", type=Path, default=DEFAULT_SOURCE)
+    pr.add_argument("--app", default="Grubhub")
+    pr.add_argument("--rating", type=int, default=1)
+    pr.add_argument("--platform", default="Google Play")
+    pr.add_argument("--batch-size", type=int, default=50_000)
+    pr.add_argument("--store-dir", type=Path, default=STORE_DIR)
+    pr.add_argument("--queue-dir", type=Path, default=QUEUE_DIR)
+    pr.add_argument("--processed-dir", type=Path, default=DATA_DIR,
+                    help="Clean splits that seed the watermark on the first refresh")
+    args = p.parse_args()
+
+    if args.cmd == "refresh":
+        refresh_store(
+            args.src,
+            store_dir=args.store_dir,
+            queue_dir=args.queue_dir,
+            filter_expr=build_filter(args.app, args.rating, args.platform),
+            batch_size=args.batch_size,
+            processed_dir=args.processed_dir,
+        )
+        return
+
+    if args.cmd == "convert":
+        n = convert_to_parquet(args.src, args.out, args.chunk_size)
+        print(f"Wrote {n} rows to {args.out}")
+        return
+
+    filter_expr = build_filter(args.app, args.rating, args.platform, args.date_from, args.date_to)
+    df_manual, df_llm, n_in, n_clean = clean_and_sample(
+        args.src,
+        n_manual=args.n_manual,
+        n_llm=args.n_llm,
+        filter_expr=filter_expr,
+        batch_size=args.batch_size,
+        seed=args.seed,
+        clean_out=args.clean_out,
+    )
+
+    # 8) Save
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    manual_path = args.out_dir / f"reviews_manual_{args.n_manual}.csv"
+    llm_path = args.out_dir / f"reviews_llm_{args.n_llm}.csv"
+    df_manual.to_csv(manual_path, index=False)
+    df_llm.to_csv(llm_path, index=False)
 
-# 6) Drop unimportant columns
-cols_to_drop = ["replyContent", "repliedDate", "appVersion", "content_clean", "lang"]
-df = df.drop(columns=[c for c in cols_to_drop if c in df.columns])
+    print(f"Filtered rows: {n_in}, clean rows: {n_clean}")
+    print(f"Wrote {len(df_manual)} rows to {manual_path}")
+    print(f"Wrote {len(df_llm)} rows to {llm_path}")
 
-# 7) Create manual (1k) and LLM (15k) splits
-df_manual = df.sample(n=1000, random_state=42)
-df_llm = df.drop(df_manual.index).sample(n=15000, random_state=42)
 
-# 8) Save
-df_manual.to_csv("reviews_manual_1000.csv", index=False)
-df_llm.to_csv("reviews_llm_15000.csv", index=False)
+if __name__ == "__main__":
+    main()
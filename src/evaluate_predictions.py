@@ -17,16 +17,27 @@ Usage examples:
     --pred model_outputs.csv \
     --gold-col gold_label --pred-col modelA_pred --prob-prefix modelA_prob_
 
+Gold and prediction tables may be CSV, Parquet or Arrow (picked by suffix).
+
+For tables too large to load, `--chunksize` streams both files through
+MetricsAccumulator (rows aligned by position); `--save-state` keeps the
+accumulators so shards evaluated separately can be reported together:
+
+  python src/evaluate_predictions.py --gold shard-0.parquet --pred shard-0.parquet \
+    --pred-col local_labels --chunksize 200000 --save-state shard-0.json
+  python src/evaluate_predictions.py --merge-states shard-*.json
 """
-from collections import Counter, defaultdict
 import argparse
-import csv
+import json
 import math
-from typing import List, Optional, Dict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
 
+import numpy as np
 import pandas as pd
 
-from benchmark.krippendorff_alpha import krippendorff_alpha_nominal
+from benchmark.krippendorff_alpha import alpha_from_coincidence, krippendorff_alpha_nominal
+from storage import iter_table, read_table, write_table
 
 
 def align_data(gold_df: pd.DataFrame, pred_df: pd.DataFrame, id_col: Optional[str]):
@@ -41,152 +52,520 @@ def align_data(gold_df: pd.DataFrame, pred_df: pd.DataFrame, id_col: Optional[st
     return merged
 
 
-def confusion_matrix(true: List[str], pred: List[str], labels: List[str]) -> List[List[int]]:
-    idx = {l: i for i, l in enumerate(labels)}
-    k = len(labels)
-    C = [[0] * k for _ in range(k)]
-    for t, p in zip(true, pred):
-        if t not in idx or p not in idx:
-            continue
-        C[idx[t]][idx[p]] += 1
-    return C
+def _as_str_labels(values) -> List[str]:
+    """Coerce labels to strings; None / NaN become '' so types never mix."""
+    return [str(x) if x is not None and not (isinstance(x, float) and math.isnan(x)) else '' for x in values]
+
+
+def encode_labels(values, labels: List[str]) -> np.ndarray:
+    """Map labels to integer codes over `labels`; anything else becomes -1."""
+    return pd.Categorical(_as_str_labels(values), categories=labels).codes.astype(np.int64)
+
+
+def confusion_from_codes(true_codes: np.ndarray, pred_codes: np.ndarray, k: int) -> np.ndarray:
+    """Confusion matrix (rows = true, cols = pred) from integer codes.
+
+    `pred_codes` may be 2-D (n_models x n_rows) to build one matrix per model
+    in a single bincount; the result is then (n_models, k, k).
+    """
+    pred_codes = np.asarray(pred_codes)
+    if pred_codes.ndim == 1:
+        return confusion_from_codes(true_codes, pred_codes[None, :], k)[0]
+    m = pred_codes.shape[0]
+    true_b = np.broadcast_to(true_codes, pred_codes.shape)
+    valid = (true_b >= 0) & (pred_codes >= 0)
+    model_idx = np.broadcast_to(np.arange(m)[:, None], pred_codes.shape)
+    flat = (model_idx[valid] * k + true_b[valid]) * k + pred_codes[valid]
+    return np.bincount(flat, minlength=m * k * k).reshape(m, k, k)
+
+
+def confusion_matrix(true: List[str], pred: List[str], labels: List[str]) -> np.ndarray:
+    return confusion_from_codes(encode_labels(true, labels), encode_labels(pred, labels), len(labels))
 
 
-def precision_recall_f1_from_confusion(C: List[List[int]], labels: List[str]):
+def _safe_div(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    num = np.asarray(num, dtype=float)
+    den = np.asarray(den, dtype=float)
+    return np.divide(num, den, out=np.zeros(np.broadcast(num, den).shape), where=den > 0)
+
+
+def prf_arrays(C: np.ndarray):
+    """Per-class precision / recall / F1 / support for one or a stack of confusion matrices."""
+    C = np.asarray(C)
+    tp = np.diagonal(C, axis1=-2, axis2=-1)
+    support = C.sum(axis=-1)        # row sums = true counts
+    predicted = C.sum(axis=-2)      # col sums = predicted counts
+    prec = _safe_div(tp, predicted)
+    rec = _safe_div(tp, support)
+    f1 = _safe_div(2 * prec * rec, prec + rec)
+    return prec, rec, f1, support
+
+
+def precision_recall_f1_from_confusion(C, labels: List[str]):
+    prec, rec, f1, support = prf_arrays(C)
     k = len(labels)
-    precisions = {}
-    recalls = {}
-    f1s = {}
-    supports = {}
-    for i, lab in enumerate(labels):
-        tp = C[i][i]
-        fn = sum(C[i][j] for j in range(k) if j != i)
-        fp = sum(C[j][i] for j in range(k) if j != i)
-        support = tp + fn
-        prec = tp / (tp + fp) if (tp + fp) > 0 else 0.0
-        rec = tp / (tp + fn) if (tp + fn) > 0 else 0.0
-        f1 = 2 * prec * rec / (prec + rec) if (prec + rec) > 0 else 0.0
-        precisions[lab] = prec
-        recalls[lab] = rec
-        f1s[lab] = f1
-        supports[lab] = support
+    precisions = dict(zip(labels, prec.tolist()))
+    recalls = dict(zip(labels, rec.tolist()))
+    f1s = dict(zip(labels, f1.tolist()))
+    supports = dict(zip(labels, support.tolist()))
     # macro
-    macro_f1 = sum(f1s.values()) / k if k > 0 else 0.0
+    macro_f1 = float(f1.mean()) if k > 0 else 0.0
     return precisions, recalls, f1s, supports, macro_f1
 
 
-def matthews_corrcoef_multiclass(C: List[List[int]]):
+def mcc_from_confusion(C: np.ndarray) -> np.ndarray:
+    """Multiclass MCC for one (k, k) or a stack of (..., k, k) confusion matrices."""
+    C = np.asarray(C, dtype=float)
+    t_k = C.sum(axis=-2)   # col sums
+    p_k = C.sum(axis=-1)   # row sums
+    c = np.trace(C, axis1=-2, axis2=-1)
+    s = C.sum(axis=(-2, -1))
+    num = c * s - (p_k * t_k).sum(axis=-1)
+    denom = np.sqrt((s * s - (p_k * p_k).sum(axis=-1)) * (s * s - (t_k * t_k).sum(axis=-1)))
+    return _safe_div(num, denom)
+
+
+def matthews_corrcoef_multiclass(C):
     # multiclass MCC formula
-    k = len(C)
-    t_k = [sum(C[i][k_] for i in range(k)) for k_ in range(k)]  # true counts per class (col sums)
-    p_k = [sum(C[k_][j] for j in range(k)) for k_ in range(k)]  # pred counts per class (row sums)
-    c = sum(C[i][i] for i in range(k))
-    s = sum(sum(row) for row in C)
-    sum_pk_tk = sum(p_k[i] * t_k[i] for i in range(k))
-    num = c * s - sum_pk_tk
-    denom_term1 = s * s - sum(p * p for p in p_k)
-    denom_term2 = s * s - sum(t * t for t in t_k)
-    denom = math.sqrt(denom_term1 * denom_term2)
-    if denom == 0:
-        return 0.0
-    return num / denom
-
-
-def compute_auc_binary(scores: List[float], true: List[int]):
+    return float(mcc_from_confusion(C))
+
+
+def _average_ranks(x: np.ndarray) -> np.ndarray:
+    """1-based ranks with ties averaged (same as scipy.stats.rankdata)."""
+    sorter = np.argsort(x, kind='mergesort')
+    inv = np.empty(sorter.size, dtype=np.intp)
+    inv[sorter] = np.arange(sorter.size)
+    xs = x[sorter]
+    obs = np.r_[True, xs[1:] != xs[:-1]]
+    dense = np.cumsum(obs)[inv]
+    count = np.r_[np.flatnonzero(obs), len(obs)]
+    return 0.5 * (count[dense] + count[dense - 1] + 1)
+
+
+def compute_auc_binary(scores, true):
     # ranks-based AUC (equivalent to Mann-Whitney U)
-    paired = sorted(zip(scores, true), key=lambda x: (x[0], x[1]))
-    n_pos = sum(true)
+    scores = np.asarray(scores, dtype=float)
+    true = np.asarray(true).astype(bool)
+    n_pos = int(true.sum())
     n_neg = len(true) - n_pos
     if n_pos == 0 or n_neg == 0:
         return None
-    # assign ranks with average for ties
-    ranks = []
-    i = 0
-    N = len(paired)
-    while i < N:
-        j = i
-        while j + 1 < N and paired[j + 1][0] == paired[i][0]:
-            j += 1
-        # average rank for positions i..j
-        avg_rank = (i + 1 + j + 1) / 2.0
-        for _ in range(i, j + 1):
-            ranks.append(avg_rank)
-        i = j + 1
-    # sum ranks for positive
-    sum_ranks_pos = 0.0
-    for (r, t), rank in zip(paired, ranks):
-        if t == 1:
-            sum_ranks_pos += rank
-    auc = (sum_ranks_pos - n_pos * (n_pos + 1) / 2.0) / (n_pos * n_neg)
-    return auc
+    sum_ranks_pos = _average_ranks(scores)[true].sum()
+    return float((sum_ranks_pos - n_pos * (n_pos + 1) / 2.0) / (n_pos * n_neg))
 
 
-def evaluate_one(true_labels: List[str], pred_labels: List[str], prob_scores: Optional[List[float]] = None):
-    # coerce labels to strings to avoid mixing types (NaN floats etc.)
-    true_s = [str(x) if x is not None and not (isinstance(x, float) and math.isnan(x)) else '' for x in true_labels]
-    pred_s = [str(x) if x is not None and not (isinstance(x, float) and math.isnan(x)) else '' for x in pred_labels]
-    labels = sorted(list(set(true_s) | set(pred_s)))
-    C = confusion_matrix(true_labels, pred_labels, labels)
-    precisions, recalls, f1s, supports, macro_f1 = precision_recall_f1_from_confusion(C, labels)
-    mcc = matthews_corrcoef_multiclass(C)
-    auc = None
-    if prob_scores is not None and len(labels) == 2:
-        # map true labels to {0,1} where positive is labels[1]
-        pos_label = labels[1]
-        true_bin = [1 if (str(t) == pos_label) else 0 for t in true_labels]
-        auc = compute_auc_binary(prob_scores, true_bin)
+def compute_auc_ovr(prob_matrix, true_codes: np.ndarray, labels: List[str]) -> Dict[str, Optional[float]]:
+    """One-vs-rest AUC for every class from an (n_rows, k) score matrix."""
+    prob_matrix = np.asarray(prob_matrix, dtype=float)
     return {
-        'labels': labels,
-        'confusion': C,
-        'precision': precisions,
-        'recall': recalls,
-        'f1': f1s,
-        'support': supports,
-        'f1_macro': macro_f1,
-        'mcc': mcc,
-        'auc': auc,
+        lab: compute_auc_binary(prob_matrix[:, j], true_codes == j)
+        for j, lab in enumerate(labels)
     }
 
 
+def evaluate_many(
+    true_labels,
+    pred_columns: Dict[str, List[str]],
+    prob_scores: Optional[Dict[str, object]] = None,
+) -> Dict[str, dict]:
+    """Evaluate several prediction columns against the same gold labels in one pass.
+
+    Each column is scored over its own labels (gold plus that column's
+    predictions), exactly as evaluate_one would, so adding a column never
+    changes another column's macro-F1; the confusion counts for all columns
+    still come from one bincount.
+
+    prob_scores maps a column name to either a 1-D positive-class score
+    (binary tasks) or an (n_rows, n_labels) matrix ordered like that
+    column's returned 'labels' (one-vs-rest AUC).
+    """
+    true_s = _as_str_labels(true_labels)
+    pred_s = {name: _as_str_labels(p) for name, p in pred_columns.items()}
+    union = sorted(set(true_s).union(*[set(p) for p in pred_s.values()]))
+    pos = {lab: i for i, lab in enumerate(union)}
+    true_set = set(true_s)
+
+    pred_codes = np.stack([encode_labels(p, union) for p in pred_s.values()])
+    C_all = confusion_from_codes(encode_labels(true_s, union), pred_codes, len(union))
+
+    results = {}
+    for m, name in enumerate(pred_s):
+        labels = sorted(true_set | set(pred_s[name]))
+        k = len(labels)
+        idx = np.array([pos[lab] for lab in labels], dtype=np.intp)
+        C = C_all[m][np.ix_(idx, idx)]
+        prec, rec, f1, support = prf_arrays(C)
+
+        auc = None
+        auc_per_class = None
+        scores = (prob_scores or {}).get(name)
+        if scores is not None:
+            scores = np.asarray(scores, dtype=float)
+            true_codes = encode_labels(true_s, labels)
+            if scores.ndim == 1 and k == 2:
+                # positive is labels[1]
+                auc = compute_auc_binary(scores, true_codes == 1)
+            elif scores.ndim == 2:
+                auc_per_class = compute_auc_ovr(scores, true_codes, labels)
+                valid = [a for a in auc_per_class.values() if a is not None]
+                auc = float(np.mean(valid)) if valid else None
+        results[name] = {
+            'labels': labels,
+            'confusion': C,
+            'precision': dict(zip(labels, prec.tolist())),
+            'recall': dict(zip(labels, rec.tolist())),
+            'f1': dict(zip(labels, f1.tolist())),
+            'support': dict(zip(labels, support.tolist())),
+            'f1_macro': float(f1.mean()) if k > 0 else 0.0,
+            'mcc': float(mcc_from_confusion(C)),
+            'auc': auc,
+            'auc_per_class': auc_per_class,
+        }
+    return results
+
+
+def evaluate_one(true_labels: List[str], pred_labels: List[str], prob_scores: Optional[List[float]] = None):
+    scores = {'pred': prob_scores} if prob_scores is not None else None
+    return evaluate_many(true_labels, {'pred': pred_labels}, scores)['pred']
+
+
+class MetricsAccumulator:
+    """Mergeable, constant-memory version of evaluate_one for sharded or chunked data.
+
+    Keeps a confusion matrix and, when scores are given, per-class score
+    histograms (`n_bins` equal bins over [0, 1]); feed chunks with `update()`,
+    combine partial results from other shards/processes with `merge()` (or
+    `to_dict()` / `from_dict()` through JSON), and call `finalize()` for the
+    same report evaluate_one returns. Labels may first appear in any chunk.
+
+    Everything except AUC is exact. AUC is the rank AUC of the binned scores
+    (ties within a bin count half), so it is within one bin width of the
+    exact value. Rows of a chunk passed without scores score 0, which is what
+    evaluate_predictions does for a missing probability column. `alpha()`
+    gives Krippendorff's alpha between gold and predictions from the same
+    confusion counts (two coders per unit, '' treated as missing).
+    """
+
+    def __init__(self, n_bins: int = 1000):
+        self.n_bins = n_bins
+        self.labels: List[str] = []
+        self.C = np.zeros((0, 0), dtype=np.int64)
+        self.binary_hist = None   # (k_true, n_bins) for a 1-D positive-class score
+        self.ovr_hist = None      # (k_score, k_true, n_bins) for per-class scores
+
+    def _align(self, labels: List[str]) -> np.ndarray:
+        """Grow the arrays to cover `labels`; return their indices in self.labels."""
+        new = [lab for lab in dict.fromkeys(labels) if lab not in self.labels]
+        if new:
+            old = len(self.labels)
+            self.labels.extend(new)
+            k = len(self.labels)
+            self.C = np.pad(self.C, ((0, k - old), (0, k - old)))
+            if self.binary_hist is not None:
+                self.binary_hist = np.pad(self.binary_hist, ((0, k - old), (0, 0)))
+            if self.ovr_hist is not None:
+                self.ovr_hist = np.pad(self.ovr_hist, ((0, k - old), (0, k - old), (0, 0)))
+        pos = {lab: i for i, lab in enumerate(self.labels)}
+        return np.array([pos[lab] for lab in labels], dtype=np.intp)
+
+    def _bins(self, scores: np.ndarray) -> np.ndarray:
+        return np.clip((scores * self.n_bins).astype(np.int64), 0, self.n_bins - 1)
+
+    def update(self, true_labels, pred_labels, prob_scores=None, score_labels: Optional[List[str]] = None):
+        """Add a chunk of rows.
+
+        `prob_scores` is a 1-D positive-class score (binary tasks) or an
+        (n_rows, len(score_labels)) matrix whose columns are `score_labels`.
+        """
+        true_codes, uniques = pd.factorize(pd.Series(_as_str_labels(true_labels)))
+        pred_codes, pred_uniques = pd.factorize(pd.Series(_as_str_labels(pred_labels)))
+        if len(true_codes) != len(pred_codes):
+            raise ValueError(f'{len(true_codes)} gold labels but {len(pred_codes)} predictions')
+        t = self._align(list(uniques))[true_codes]
+        p = self._align(list(pred_uniques))[pred_codes]
+        k = len(self.labels)
+        self.C += np.bincount(t * k + p, minlength=k * k).reshape(k, k)
+        if prob_scores is None:
+            return self
+
+        scores = np.asarray(prob_scores, dtype=float)
+        if scores.ndim == 1:
+            if self.binary_hist is None:
+                self.binary_hist = np.zeros((k, self.n_bins), dtype=np.int64)
+            np.add.at(self.binary_hist, (t, self._bins(scores)), 1)
+        else:
+            if score_labels is None or len(score_labels) != scores.shape[1]:
+                raise ValueError('score_labels must name every column of a 2-D prob_scores')
+            cols = self._align(list(score_labels))
+            k = len(self.labels)
+            if self.ovr_hist is None:
+                self.ovr_hist = np.zeros((k, k, self.n_bins), dtype=np.int64)
+            for j, col in enumerate(cols):
+                np.add.at(self.ovr_hist[col], (t, self._bins(scores[:, j])), 1)
+        return self
+
+    def merge(self, other: 'MetricsAccumulator'):
+        if other.n_bins != self.n_bins:
+            raise ValueError(f'Cannot merge {other.n_bins}-bin accumulator into {self.n_bins}-bin one')
+        idx = self._align(other.labels)
+        k = len(self.labels)
+        self.C[np.ix_(idx, idx)] += other.C
+        if other.binary_hist is not None:
+            if self.binary_hist is None:
+                self.binary_hist = np.zeros((k, self.n_bins), dtype=np.int64)
+            self.binary_hist[idx] += other.binary_hist
+        if other.ovr_hist is not None:
+            if self.ovr_hist is None:
+                self.ovr_hist = np.zeros((k, k, self.n_bins), dtype=np.int64)
+            self.ovr_hist[np.ix_(idx, idx)] += other.ovr_hist
+        return self
+
+    @staticmethod
+    def _hist_auc(pos: np.ndarray, neg: np.ndarray) -> Optional[float]:
+        n_pos, n_neg = pos.sum(), neg.sum()
+        if n_pos == 0 or n_neg == 0:
+            return None
+        neg_below = np.cumsum(neg) - neg
+        return float((pos * (neg_below + 0.5 * neg)).sum() / (n_pos * n_neg))
+
+    def _padded(self, hist: np.ndarray) -> np.ndarray:
+        """Count rows that never got a score (per true label) as score 0."""
+        hist = hist.copy()
+        hist[..., 0] += self.C.sum(axis=1) - hist.sum(axis=-1)
+        return hist
+
+    def finalize(self, labels: Optional[List[str]] = None) -> dict:
+        """The evaluate_one report (labels sorted, confusion rows = true).
+
+        By default the report covers the labels seen in gold or predictions,
+        as evaluate_one does; labels that only named a score column are left
+        out. Pass `labels` to report over a fixed label set instead (extra
+        labels get zero rows/columns).
+        """
+        keep = set(labels or ())
+        if keep:
+            self._align(list(labels))
+        seen = (self.C.sum(axis=0) + self.C.sum(axis=1)) > 0
+        order = np.array([i for i in np.argsort(self.labels, kind='stable')
+                          if seen[i] or self.labels[i] in keep], dtype=np.intp)
+        labels = [self.labels[i] for i in order]
+        k = len(labels)
+        C = self.C[np.ix_(order, order)]
+        prec, rec, f1, support = prf_arrays(C)
+
+        auc, auc_per_class = None, None
+        if self.ovr_hist is not None:
+            hist = self._padded(self.ovr_hist)[np.ix_(order, order)]
+            auc_per_class = {}
+            for j, lab in enumerate(labels):
+                pos = hist[j, j]
+                auc_per_class[lab] = self._hist_auc(pos, hist[j].sum(axis=0) - pos)
+            valid = [a for a in auc_per_class.values() if a is not None]
+            auc = float(np.mean(valid)) if valid else None
+        elif self.binary_hist is not None and k == 2:
+            # positive is labels[1]
+            hist = self._padded(self.binary_hist)[order]
+            auc = self._hist_auc(hist[1], hist[0])
+
+        return {
+            'labels': labels,
+            'confusion': C,
+            'precision': dict(zip(labels, prec.tolist())),
+            'recall': dict(zip(labels, rec.tolist())),
+            'f1': dict(zip(labels, f1.tolist())),
+            'support': dict(zip(labels, support.tolist())),
+            'f1_macro': float(f1.mean()) if k > 0 else 0.0,
+            'mcc': float(mcc_from_confusion(C)),
+            'auc': auc,
+            'auc_per_class': auc_per_class,
+        }
+
+    def alpha(self) -> float:
+        """Nominal alpha between gold and predictions; with two coders per unit O = C + C.T."""
+        keep = np.array([lab != '' for lab in self.labels], dtype=bool)
+        C = self.C[np.ix_(keep, keep)]
+        return alpha_from_coincidence(C + C.T)
+
+    def to_dict(self) -> dict:
+        return {
+            'n_bins': self.n_bins,
+            'labels': self.labels,
+            'C': self.C.tolist(),
+            'binary_hist': None if self.binary_hist is None else self.binary_hist.tolist(),
+            'ovr_hist': None if self.ovr_hist is None else self.ovr_hist.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> 'MetricsAccumulator':
+        acc = cls(d['n_bins'])
+        acc.labels = list(d['labels'])
+        k = len(acc.labels)
+        acc.C = np.asarray(d['C'], dtype=np.int64).reshape(k, k)
+        if d.get('binary_hist') is not None:
+            acc.binary_hist = np.asarray(d['binary_hist'], dtype=np.int64).reshape(k, acc.n_bins)
+        if d.get('ovr_hist') is not None:
+            acc.ovr_hist = np.asarray(d['ovr_hist'], dtype=np.int64).reshape(k, k, acc.n_bins)
+        return acc
+
+
+def aligned_chunks(gold_chunks: Iterable[pd.DataFrame], pred_chunks: Iterable[pd.DataFrame]):
+    """Zip two chunked tables row by row (chunk boundaries need not agree)."""
+    gold_it, pred_it = iter(gold_chunks), iter(pred_chunks)
+    g = p = None
+    while True:
+        if g is None or g.empty:
+            g = next(gold_it, None)
+        if p is None or p.empty:
+            p = next(pred_it, None)
+        if g is None or p is None:
+            if (g is not None and not g.empty) or (p is not None and not p.empty):
+                raise SystemExit('gold and predictions have different row counts; use --id-col without --chunksize')
+            return
+        n = min(len(g), len(p))
+        yield g.iloc[:n].reset_index(drop=True), p.iloc[:n].reset_index(drop=True)
+        g, p = g.iloc[n:], p.iloc[n:]
+
+
+def print_report(col: str, metrics: dict, alpha: float, header: bool):
+    if header:
+        print(f'\n=== {col} ===')
+    print('Krippendorff\'s alpha (gold vs pred):', alpha)
+    print('Macro F1:', metrics['f1_macro'])
+    print('MCC:', metrics['mcc'])
+    if metrics['auc'] is not None:
+        print('AUC:', metrics['auc'])
+    print('\nPer-class F1:')
+    for lab, f in metrics['f1'].items():
+        auc_lab = (metrics['auc_per_class'] or {}).get(lab)
+        auc_txt = f', auc={auc_lab:.4f}' if auc_lab is not None else ''
+        print(f'  {lab}: f1={f:.4f} (support={metrics["support"][lab]}){auc_txt}')
+
+
+def stream_evaluate(args) -> Dict[str, MetricsAccumulator]:
+    """Accumulate every --pred-col chunk by chunk (rows aligned by position)."""
+    if args.id_col:
+        raise SystemExit('--chunksize aligns rows by position; --id-col needs the in-memory path')
+    accs = {col: MetricsAccumulator(args.bins) for col in args.pred_col}
+    same_file = Path(args.gold).resolve() == Path(args.pred).resolve()
+    pred_chunks = iter_table(args.pred, chunksize=args.chunksize)
+    gold_chunks = pred_chunks if same_file else iter_table(args.gold, [args.gold_col], chunksize=args.chunksize)
+    pairs = ((c, c) for c in pred_chunks) if same_file else aligned_chunks(gold_chunks, pred_chunks)
+    n = 0
+    for gold, pred in pairs:
+        true = gold[args.gold_col].astype(str).tolist()
+        for i, col in enumerate(args.pred_col):
+            scores, score_labels = None, None
+            if i == 0 and args.prob_col and args.prob_col in pred.columns:
+                scores = pred[args.prob_col].astype(float).to_numpy()
+            elif args.prob_prefix:
+                prefix = args.prob_prefix[i]
+                prob_cols = [c for c in pred.columns if c.startswith(prefix)]
+                score_labels = [c[len(prefix):] for c in prob_cols]
+                scores = pred[prob_cols].astype(float).to_numpy()
+            accs[col].update(true, pred[col].astype(str).tolist(), scores, score_labels)
+        n += len(gold)
+    print(f'Streamed {n} rows in chunks of {args.chunksize}')
+    return accs
+
+
+def report_accumulators(accs: Dict[str, MetricsAccumulator], out: Optional[str]):
+    summary = []
+    for col, acc in accs.items():
+        # each column over its own labels, as evaluate_many does
+        metrics = acc.finalize()
+        alpha = acc.alpha()
+        summary.append({'pred_col': col, 'alpha': alpha, 'f1_macro': metrics['f1_macro'],
+                        'mcc': metrics['mcc'], 'auc': metrics['auc']})
+        print_report(col, metrics, alpha, header=len(accs) > 1)
+    if out:
+        write_table(pd.DataFrame(summary), out)
+        print(f'\nWrote summary to {out}')
+
+
 def main():
     p = argparse.ArgumentParser()
-    p.add_argument('--gold', required=True, help='Gold CSV path')
-    p.add_argument('--pred', required=True, help='Predictions CSV path')
+    p.add_argument('--gold', required=False, help='Gold CSV path')
+    p.add_argument('--pred', required=False, help='Predictions CSV path')
     p.add_argument('--gold-col', default='gold_label', help='Column name for gold labels')
-    p.add_argument('--pred-col', default='predicted_label', help='Column name for predicted labels')
+    p.add_argument('--pred-col', nargs='+', default=['predicted_label'],
+                   help='One or more prediction columns, all evaluated in one pass')
     p.add_argument('--id-col', default=None, help='Optional id column to align on')
     p.add_argument('--prob-col', default=None, help='Optional probability column for positive class (binary)')
+    p.add_argument('--prob-prefix', nargs='+', default=None,
+                   help='Per-class probability column prefix for one-vs-rest AUC '
+                        '(columns <prefix><label>); one prefix per --pred-col')
+    p.add_argument('--out', default=None, help='Optional summary table (csv/parquet) with one row per column')
+    p.add_argument('--chunksize', type=int, default=None,
+                   help='Stream both tables in chunks of this many rows (constant memory, rows aligned by position)')
+    p.add_argument('--bins', type=int, default=1000, help='Score histogram bins for streamed AUC')
+    p.add_argument('--save-state', default=None,
+                   help='With --chunksize: write the accumulators as JSON for a later --merge-states')
+    p.add_argument('--merge-states', nargs='+', default=None,
+                   help='Report on saved accumulator JSON files (e.g. one per shard) instead of reading tables')
     args = p.parse_args()
+    if args.prob_prefix and len(args.prob_prefix) != len(args.pred_col):
+        raise SystemExit('--prob-prefix needs one prefix per --pred-col')
 
-    gold_df = pd.read_csv(args.gold)
-    pred_df = pd.read_csv(args.pred)
+    if args.merge_states:
+        accs = {}
+        for path in args.merge_states:
+            with open(path, encoding='utf-8') as fh:
+                for col, d in json.load(fh).items():
+                    acc = MetricsAccumulator.from_dict(d)
+                    accs[col] = accs[col].merge(acc) if col in accs else acc
+        print(f'Merged {len(args.merge_states)} state file(s)')
+        report_accumulators(accs, args.out)
+        return
+    if not args.gold or not args.pred:
+        raise SystemExit('--gold and --pred are required unless --merge-states is given')
+    if args.chunksize:
+        accs = stream_evaluate(args)
+        if args.save_state:
+            with open(args.save_state, 'w', encoding='utf-8') as fh:
+                json.dump({col: acc.to_dict() for col, acc in accs.items()}, fh)
+            print(f'Wrote accumulator state to {args.save_state}')
+        report_accumulators(accs, args.out)
+        return
+
+    gold_df = read_table(args.gold)
+    pred_df = read_table(args.pred)
     merged = align_data(gold_df, pred_df, args.id_col)
 
     if args.gold_col not in merged.columns:
         raise SystemExit(f'gold column {args.gold_col} not found in merged data')
-    if args.pred_col not in merged.columns:
-        raise SystemExit(f'pred column {args.pred_col} not found in merged data')
+    for col in args.pred_col:
+        if col not in merged.columns:
+            raise SystemExit(f'pred column {col} not found in merged data')
 
     true = merged[args.gold_col].astype(str).tolist()
-    pred = merged[args.pred_col].astype(str).tolist()
-    prob_scores = None
+    preds = {col: merged[col].astype(str).tolist() for col in args.pred_col}
+
+    prob_scores = {}
     if args.prob_col and args.prob_col in merged.columns:
-        prob_scores = merged[args.prob_col].astype(float).tolist()
+        prob_scores[args.pred_col[0]] = merged[args.prob_col].astype(float).to_numpy()
+    for col, prefix in zip(args.pred_col, args.prob_prefix or []):
+        # one score column per label of this column's report (evaluate_many scores each
+        # column over gold + its own predictions); missing per-class columns score 0
+        labels = sorted(set(true) | set(preds[col]))
+        prob_scores[col] = np.column_stack([
+            merged[f'{prefix}{lab}'].astype(float).to_numpy() if f'{prefix}{lab}' in merged.columns
+            else np.zeros(len(merged))
+            for lab in labels
+        ])
 
-    # Krippendorff's alpha between gold and pred per unit
-    paired = [[t, p] for t, p in zip(true, pred)]
-    alpha = krippendorff_alpha_nominal(paired)
+    results = evaluate_many(true, preds, prob_scores)
 
-    metrics = evaluate_one(true, pred, prob_scores)
+    summary = []
+    for col, metrics in results.items():
+        # Krippendorff's alpha between gold and pred per unit
+        alpha = krippendorff_alpha_nominal([[t, p] for t, p in zip(true, preds[col])])
+        summary.append({'pred_col': col, 'alpha': alpha, 'f1_macro': metrics['f1_macro'],
+                        'mcc': metrics['mcc'], 'auc': metrics['auc']})
+        print_report(col, metrics, alpha, header=len(results) > 1)
 
-    print('Krippendorff\'s alpha (gold vs pred):', alpha)
-    print('Macro F1:', metrics['f1_macro'])
-    print('MCC:', metrics['mcc'])
-    if metrics['auc'] is not None:
-        print('AUC:', metrics['auc'])
-    print('\nPer-class F1:')
-    for lab, f in metrics['f1'].items():
-        print(f'  {lab}: f1={f:.4f} (support={metrics["support"][lab]})')
+    if args.out:
+        write_table(pd.DataFrame(summary), args.out)
+        print(f'\nWrote summary to {args.out}')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,246 @@
+"""Normalized label store (SQLite) keyed by stable review IDs.
+
+Every `labels_*` file repeats the full review text next to a single label
+column and carries no ID, so files can only be aligned by row position.
+The store keeps each review once and each label as a small integer:
+
+    reviews      review_id (sha1 of the text, see storage.review_id), date, content
+    label_names  code, label            (LABEL_ORDER first, off-schema strings appended)
+    labels       vendor, model, prompt_version, run, review_id, code, ingested_at
+
+`labels` is keyed by (vendor, model, prompt_version, run, review_id), so one
+model's labels are a single index range, and a second index on review_id
+serves per-review lookups. Gold labels are stored like any other labeler
+(vendor "gold", model "manual"), which makes "model vs gold" a join on
+review_id instead of a positional zip.
+
+Reviews with identical text share one review_id and therefore one label
+per labeler (the gold set has 999 distinct texts in 1000 rows), so
+`add_labels` reports repeats and returns the labels actually stored.
+`python -m benchmark.compute_metrics --store STORE` scores every model
+through `aligned()`, so label files may be reordered or sharded;
+benchmark.ensemble and benchmark.adaptive still align the `labels_*` files
+with gold by row position.
+
+Usage (from `src/`):
+    python label_store.py ingest ../outputs/labels_*.csv --run baseline
+    python label_store.py ingest-gold
+    python label_store.py list
+    python label_store.py export --out ../outputs/aligned_labels.parquet
+"""
+import argparse
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from benchmark.compute_metrics import GOLD_COL, GOLD_PATH, find_pred_col, normalize_label_column
+from config import LABEL_ORDER, OUTPUT_DIR, TEXT_COL
+import prompts
+from storage import read_table, resolve_table, review_ids, write_table
+
+STORE_PATH = OUTPUT_DIR / "labels.sqlite"
+GOLD_VENDOR, GOLD_MODEL = "gold", "manual"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reviews (
+    review_id TEXT PRIMARY KEY,
+    date      TEXT,
+    content   TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS label_names (
+    code  INTEGER PRIMARY KEY,
+    label TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS labels (
+    vendor         TEXT NOT NULL,
+    model          TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    run            TEXT NOT NULL,
+    review_id      TEXT NOT NULL REFERENCES reviews(review_id),
+    code           INTEGER NOT NULL REFERENCES label_names(code),
+    ingested_at    REAL NOT NULL,
+    PRIMARY KEY (vendor, model, prompt_version, run, review_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS labels_by_review ON labels(review_id);
+"""
+
+
+def split_label_column(col: str):
+    """`{vendor}_{model}_labels` -> (vendor, model); vendors never contain '_'."""
+    name = col[: -len("_labels")] if col.endswith("_labels") else col
+    vendor, _, model = name.partition("_")
+    return vendor, model or vendor
+
+
+class LabelStore:
+    def __init__(self, path: Path = STORE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        if not self.conn.execute("SELECT 1 FROM label_names LIMIT 1").fetchone():
+            self.conn.executemany("INSERT INTO label_names VALUES (?, ?)", list(enumerate(LABEL_ORDER)))
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    # ---------- write ----------
+    def label_codes(self, labels) -> Dict[str, int]:
+        """Code for every distinct label string, registering unseen ones."""
+        names = dict(self.conn.execute("SELECT label, code FROM label_names"))
+        new = sorted(set(labels) - set(names))
+        if new:
+            start = max(names.values(), default=-1) + 1
+            rows = list(zip(range(start, start + len(new)), new))
+            self.conn.executemany("INSERT INTO label_names VALUES (?, ?)", rows)
+            names.update({lbl: code for code, lbl in rows})
+        return names
+
+    def add_reviews(self, df: pd.DataFrame, text_col: str = TEXT_COL) -> List[str]:
+        ids = review_ids(df[text_col])
+        dates = df["date"].astype(str).tolist() if "date" in df.columns else [None] * len(df)
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO reviews VALUES (?, ?, ?)",
+            zip(ids, dates, df[text_col].astype(str).tolist()),
+        )
+        return ids
+
+    def add_labels(self, df: pd.DataFrame, label_col: str, vendor: str, model: str,
+                   prompt_version: Optional[str] = None, run: str = "default",
+                   text_col: str = TEXT_COL) -> int:
+        """Store one labels column; re-adding the same (vendor, model, prompt, run) overwrites it.
+
+        `prompt_version` defaults to the vendor's version of the default
+        prompt (prompts.prompt_version). Rows with the same text share a
+        review_id and so a single label: the last one wins, and conflicting
+        duplicates are reported. Returns the number of labels actually
+        stored (unique review IDs).
+        """
+        if prompt_version is None:
+            prompt_version = prompts.prompt_version(prompts.DEFAULT_VARIANT, vendor)
+        ids = self.add_reviews(df, text_col)
+        labels = normalize_label_column(df[label_col])
+        by_id = pd.Series(list(labels), index=ids)
+        dup = by_id.index.duplicated(keep=False)
+        if dup.any():
+            n_conflict = int((by_id[dup].groupby(level=0).nunique() > 1).sum())
+            print(f"[{vendor}/{model}] {len(by_id) - by_id.index.nunique()} of {len(by_id)} rows repeat "
+                  f"another row's text; {n_conflict} review IDs have conflicting labels (kept the last)")
+        by_id = by_id[~by_id.index.duplicated(keep="last")]
+        codes = self.label_codes(by_id)
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO labels VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((vendor, model, prompt_version, run, rid, codes[lbl], now) for rid, lbl in by_id.items()),
+        )
+        self.conn.commit()
+        return len(by_id)
+
+    def ingest_file(self, path: Path, prompt_version: Optional[str] = None, run: str = "default") -> str:
+        df = read_table(path)
+        col = find_pred_col(df)
+        vendor, model = split_label_column(col)
+        if prompt_version is None:
+            prompt_version = prompts.prompt_version(prompts.DEFAULT_VARIANT, vendor)
+        n = self.add_labels(df, col, vendor, model, prompt_version, run)
+        print(f"Stored {n} labels for {vendor}/{model} (prompt {prompt_version}, run {run}) from {path}")
+        return f"{vendor}/{model}"
+
+    def ingest_gold(self, path: Path = GOLD_PATH) -> int:
+        df = read_table(resolve_table(path))
+        return self.add_labels(df, GOLD_COL, GOLD_VENDOR, GOLD_MODEL, prompt_version="-", run="-")
+
+    # ---------- read ----------
+    def runs(self) -> pd.DataFrame:
+        return pd.read_sql_query(
+            "SELECT vendor, model, prompt_version, run, COUNT(*) AS n_labels FROM labels "
+            "GROUP BY vendor, model, prompt_version, run ORDER BY vendor, model, prompt_version, run",
+            self.conn,
+        )
+
+    def labels(self, vendor: str, model: str, prompt_version: Optional[str] = None,
+               run: Optional[str] = None, decode: bool = True) -> pd.Series:
+        """One labeler's labels indexed by review_id (most recently stored prompt_version/run if not given)."""
+        if prompt_version is None or run is None:
+            row = self.conn.execute(
+                "SELECT prompt_version, run FROM labels WHERE vendor = ? AND model = ? "
+                "AND (? IS NULL OR prompt_version = ?) AND (? IS NULL OR run = ?) "
+                "GROUP BY prompt_version, run ORDER BY MAX(ingested_at) DESC LIMIT 1",
+                (vendor, model, prompt_version, prompt_version, run, run),
+            ).fetchone()
+            if row is None:
+                raise KeyError(f"No labels for {vendor}/{model}")
+            prompt_version, run = row
+        q = ("SELECT l.review_id, {sel} FROM labels l {join} "
+             "WHERE l.vendor = ? AND l.model = ? AND l.prompt_version = ? AND l.run = ?")
+        sel, join = ("n.label", "JOIN label_names n ON n.code = l.code") if decode else ("l.code", "")
+        df = pd.read_sql_query(q.format(sel=sel, join=join), self.conn, params=(vendor, model, prompt_version, run))
+        s = df.set_index("review_id").iloc[:, 0]
+        s.name = f"{vendor}_{model}_labels"
+        return s
+
+    def aligned(self, labelers: Optional[List[tuple]] = None, with_gold: bool = True) -> pd.DataFrame:
+        """Reviews labeled by every requested labeler, one column each, joined on review_id.
+
+        `labelers` is a list of (vendor, model) pairs (latest prompt/run each);
+        by default every non-gold labeler in the store. With `with_gold` the
+        `gold_label` column comes first and only gold rows are kept.
+        """
+        if labelers is None:
+            labelers = [tuple(r) for r in self.conn.execute(
+                "SELECT DISTINCT vendor, model FROM labels WHERE vendor != ? ORDER BY vendor, model", (GOLD_VENDOR,)
+            )]
+        cols = [self.labels(v, m) for v, m in labelers]
+        if with_gold:
+            cols.insert(0, self.labels(GOLD_VENDOR, GOLD_MODEL).rename(GOLD_COL))
+        out = pd.concat(cols, axis=1, join="inner")
+        text = pd.read_sql_query("SELECT review_id, date, content FROM reviews", self.conn, index_col="review_id")
+        return text.join(out, how="inner")
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--store", type=Path, default=STORE_PATH)
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    i = sub.add_parser("ingest", help="Store labels from labels_<vendor>_<model> files")
+    i.add_argument("paths", type=Path, nargs="+")
+    i.add_argument("--prompt-version", default=None,
+                   help="Default: each file's vendor's version of the default prompt")
+    i.add_argument("--run", default="default")
+
+    g = sub.add_parser("ingest-gold", help="Store the gold labels")
+    g.add_argument("--gold", type=Path, default=GOLD_PATH)
+
+    sub.add_parser("list", help="Labelers, prompt versions and runs in the store")
+
+    e = sub.add_parser("export", help="Write gold + every model, joined on review_id")
+    e.add_argument("--out", type=Path, required=True)
+    e.add_argument("--no-gold", action="store_true")
+    args = p.parse_args()
+
+    store = LabelStore(args.store)
+    try:
+        if args.cmd == "ingest":
+            for path in args.paths:
+                store.ingest_file(path, args.prompt_version, args.run)
+        elif args.cmd == "ingest-gold":
+            print(f"Stored {store.ingest_gold(args.gold)} gold labels")
+        elif args.cmd == "list":
+            print(store.runs().to_string(index=False))
+        else:
+            df = store.aligned(with_gold=not args.no_gold)
+            path = write_table(df.reset_index(), args.out)
+            print(f"Wrote {len(df)} aligned rows x {df.shape[1] - 2} label columns to {path}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Offline cost and wall-clock estimate for a labeling run (no API calls).
+
+For every model the dataset's reviews are rendered exactly as the vendor
+client will send them (prompts.render) and counted with the vendor's
+offline tokenizer (token_counts.py); input tokens plus EST_OUTPUT_TOKENS per
+row are priced with MODEL_PRICES.
+
+Wall-clock time comes from measured telemetry: after each model finishes,
+main_label_reviews adds that run's request count, summed latency (which
+includes client-side retries and backoff), errors and retries to
+`outputs/telemetry.json`. A model is then expected to take
+
+    rows * max(mean latency / concurrency, 60 / rpm)
+
+where rpm is the vendor's limit in VENDOR_QUOTAS and concurrency the number
+of requests in flight at once (1 for a plain run, the number of shard
+processes for a sharded one), capped at the vendor's `concurrency` quota.
+Retries are counted per model, so two models of one vendor do not share
+them. Models without telemetry use DEFAULT_LATENCY_S and are marked as such.
+
+Usage (from `src/`):
+    python main_label_reviews.py --dry-run
+    python main_label_reviews.py --dry-run --data ../data/processed/reviews_llm_15000.csv --concurrency 4
+"""
+import json
+import os
+from pathlib import Path
+from typing import List, Optional
+
+import pandas as pd
+
+from config import MODEL_PRICES, OUTPUT_DIR, VENDOR_QUOTAS
+from labeling.scheduler import EST_OUTPUT_TOKENS
+from monitoring import snapshot
+from prompts import DEFAULT_VARIANT
+from token_counts import count_many
+
+TELEMETRY_PATH = OUTPUT_DIR / "telemetry.json"
+DEFAULT_LATENCY_S = 1.0   # per call, until the model has been measured
+
+
+def load_telemetry(path: Path = TELEMETRY_PATH) -> dict:
+    if not Path(path).exists():
+        return {}
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def record_telemetry(vendor: str, model: str, path: Path = TELEMETRY_PATH):
+    """Add this process's measured requests for vendor/model to the telemetry file.
+
+    Concurrent shard processes can race on the file; the last writer wins,
+    which only loses some samples.
+    """
+    snap = snapshot(vendor, model)
+    if not snap["requests"]:
+        return
+    path = Path(path)
+    data = load_telemetry(path)
+    prev = data.get(f"{vendor}/{model}", {})
+    data[f"{vendor}/{model}"] = {
+        "requests": prev.get("requests", 0) + snap["requests"],
+        "latency_sum": prev.get("latency_sum", 0.0) + snap["latency_sum"],
+        "errors": prev.get("errors", 0) + snap["errors"],
+        "retries": prev.get("retries", 0) + snap["retries"],
+        # quantiles of the latest run only; they don't add up
+        "latency_p50": snap["latency_p50"],
+        "latency_p95": snap["latency_p95"],
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(data, fh, indent=2)
+    os.replace(tmp, path)
+
+
+def estimate_model(reviews: List[str], vendor: str, model: str, variant: str = DEFAULT_VARIANT,
+                   concurrency: int = 1, telemetry: Optional[dict] = None) -> dict:
+    counts = count_many(vendor, model, reviews, variant)
+    tokens_in = sum(c.tokens for c in counts)
+    tokens_out = EST_OUTPUT_TOKENS * len(reviews)
+    price = MODEL_PRICES.get(model)
+    cost = (tokens_in * price["price_in"] + tokens_out * price["price_out"]) / 1e6 if price else None
+
+    measured = (telemetry or {}).get(f"{vendor}/{model}")
+    if measured and measured["requests"]:
+        latency = measured["latency_sum"] / measured["requests"]
+    else:
+        latency = DEFAULT_LATENCY_S
+    quota = VENDOR_QUOTAS.get(vendor, {})
+    rpm = quota.get("rpm", 0)
+    concurrency = max(min(concurrency, quota.get("concurrency", concurrency)), 1)
+    per_row = max(latency / concurrency, 60.0 / rpm if rpm else 0.0)
+    return {
+        "vendor": vendor,
+        "model": model,
+        "rows": len(reviews),
+        "tokens_in": tokens_in,
+        "tokens_out": tokens_out,
+        "exact_tokens": all(c.exact for c in counts),
+        "cost_usd": cost,
+        "latency_s": latency,
+        "measured": bool(measured),
+        "concurrency": concurrency,
+        "rpm_bound": rpm > 0 and 60.0 / rpm >= latency / concurrency,
+        "wall_clock_min": len(reviews) * per_row / 60,
+    }
+
+
+def estimate_run(reviews: List[str], models: List[dict], variant: str = DEFAULT_VARIANT,
+                 concurrency: int = 1, telemetry_path: Path = TELEMETRY_PATH) -> pd.DataFrame:
+    telemetry = load_telemetry(telemetry_path)
+    return pd.DataFrame([
+        estimate_model(reviews, m["vendor"], m["name"], variant, concurrency, telemetry) for m in models
+    ])
+
+
+def print_estimate(table: pd.DataFrame, concurrency: int):
+    with pd.option_context("display.width", 200, "display.max_columns", 20):
+        print(table.round({"cost_usd": 4, "latency_s": 2, "wall_clock_min": 1}).to_string(index=False))
+    cost = table["cost_usd"].dropna().sum()
+    minutes = table["wall_clock_min"].sum()   # main_label_reviews runs the models one after another
+    print(f"\nTotal: {table['tokens_in'].sum():,} input + {table['tokens_out'].sum():,} output tokens, "
+          f"~${cost:.2f}, ~{minutes:.0f} min ({minutes / 60:.1f} h) at concurrency {concurrency} "
+          f"(models run in sequence)")
+    if (table["concurrency"] < concurrency).any():
+        capped = table.loc[table["concurrency"] < concurrency, "vendor"].unique()
+        print("Concurrency capped by VENDOR_QUOTAS for: " + ", ".join(capped))
+    if table["cost_usd"].isna().any():
+        print("No MODEL_PRICES entry for: " + ", ".join(table.loc[table["cost_usd"].isna(), "model"]))
+    if not table["exact_tokens"].all():
+        print("Token counts without an offline tokenizer are ~4 chars/token estimates (exact_tokens=False).")
+    if not table["measured"].all():
+        print(f"No telemetry yet for some models; assumed {DEFAULT_LATENCY_S:.1f}s per call (measured=False).")
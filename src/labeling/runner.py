@@ -3,6 +3,10 @@ from typing import Dict
 
 import pandas as pd
 
+from monitoring import add_rows, progress_summary, row_done, track_request
+from storage import to_label_category
+from tracing import span
+
 
 def label_dataframe_with_model(
     df: pd.DataFrame,
@@ -25,16 +29,22 @@ def label_dataframe_with_model(
 
     n = len(df)
     print(f"Labeling {n} rows with {vendor}/{model_name}...")
+    add_rows(vendor, model_name, n)
+
+    # pull the text column out once instead of building a row Series per call
+    with span("runner.prepare", rows=n):
+        reviews = df[text_col].astype(str).tolist()
 
     # stop after this many consecutive failures
     MAX_CONSECUTIVE_FAILURES = 3
     consecutive_failures = 0
 
     for i in range(n):
-        review = str(df.iloc[i][text_col])
+        review = reviews[i]
 
         try:
-            raw = call_fn(model_name, review, client=client)
+            with track_request(vendor, model_name), span("runner.call", vendor=vendor, model=model_name):
+                raw = call_fn(model_name, review, client=client)
             # Directly use the raw text, stripping any accidental whitespace
             label_text = str(raw).strip() if raw else ""
             
@@ -51,16 +61,22 @@ def label_dataframe_with_model(
             raw = ""
             label_text = ""
 
-        df.at[i, raw_col] = raw
-        df.at[i, labels_col] = label_text
+        with span("runner.record"):
+            df.at[i, raw_col] = raw
+            df.at[i, labels_col] = label_text
+            row_done(vendor, model_name)
 
         if (i + 1) % save_every == 0:
-            print(f"[{vendor}/{model_name}] Processed {i+1}/{n} rows...")
+            print(progress_summary(vendor, model_name))
             time.sleep(0.2)
 
-    # remove raw response columns before returning so CSVs don't contain raw text
-    raw_columns = [c for c in df.columns if c.endswith("_raw")]
-    if raw_columns:
-        df = df.drop(columns=raw_columns, errors="ignore")
+    with span("runner.finalize", rows=n):
+        # remove raw response columns before returning so CSVs don't contain raw text
+        raw_columns = [c for c in df.columns if c.endswith("_raw")]
+        if raw_columns:
+            df = df.drop(columns=raw_columns, errors="ignore")
+
+        # store labels as a categorical over LABEL_ORDER (dictionary-encoded in Parquet)
+        df[labels_col] = to_label_category(df[labels_col])
 
     return df
\ No newline at end of file
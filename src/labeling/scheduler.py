@@ -0,0 +1,429 @@
+"""Budget- and deadline-aware scheduler for (dataset, model) labeling jobs.
+
+Jobs are split into chunks and handed to per-vendor worker threads, so all
+vendors are labeling at the same time, each within its own rate limit
+(VENDOR_QUOTAS in config.py, overridable per jobs file). Within a vendor the
+highest-priority job (lowest number) goes first. Each chunk is labeled with
+`label_dataframe_with_model` and saved as a Parquet part file; progress and
+estimated spend go to a state file after every chunk, so an interrupted or
+paused run resumes where it stopped.
+
+Spend is estimated from MODEL_PRICES with ~4 characters per input token
+(the clients return only the label, not the vendor's reported usage, so
+the state file and the final report give estimated spend). Before a chunk
+starts, budget still needed by higher-priority jobs on other vendors is held
+back. A chunk is not started if it would overrun the budget or is not
+expected to finish before the deadline; its job is marked paused and is
+re-checked whenever a chunk finishes or fails, since that settles spend and
+can release budget held for other jobs. Workers stop once nothing fits, no
+chunk is in flight anywhere and no other vendor's worker still has a job
+waiting to claim its next chunk.
+
+Jobs file (JSON):
+    {
+      "budget_usd": 25.0,
+      "deadline": "2026-10-20T08:00:00",
+      "vendor_quotas": {"google": {"rpm": 120, "concurrency": 4}},
+      "jobs": [
+        {"dataset": "data/processed/reviews_llm_15000.csv",
+         "vendor": "google", "model": "gemini-2.0-flash", "priority": 0},
+        {"dataset": "data/processed/reviews_manual_1000.csv",
+         "vendor": "openai", "model": "gpt-4.1-mini", "priority": 1}
+      ]
+    }
+
+Usage (from `src/`):
+    python -m labeling.scheduler --jobs jobs.json
+    python -m labeling.scheduler --from-config --budget 10   # DATA_PATH x MODELS
+    python -m labeling.scheduler --jobs jobs.json --trace ../outputs/trace   # see tracing.py
+"""
+import argparse
+import json
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+import pandas as pd
+
+from config import BASE_DIR, DATA_PATH, MODEL_PRICES, MODELS, OUTPUT_DIR, STORAGE_FORMAT, TEXT_COL, VENDOR_QUOTAS
+from labeling.runner import label_dataframe_with_model
+from monitoring import start_http_server
+from prompts import build_prompt
+from storage import read_table, resolve_table, write_table
+import tracing
+from tracing import span
+
+STATE_DIR = OUTPUT_DIR / "scheduler"
+
+# rough output size of a single label, in tokens
+EST_OUTPUT_TOKENS = 8
+CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class Job:
+    dataset: str
+    vendor: str
+    model: str
+    priority: int = 0
+    chunk_size: int = 100
+    out_dir: str = str(OUTPUT_DIR)
+    # persisted progress
+    status: str = "pending"  # pending | running | done | failed | paused_budget | paused_deadline
+    done_chunks: List[int] = field(default_factory=list)
+    n_chunks: int = 0
+    spend_usd: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def job_id(self) -> str:
+        return f"{Path(self.dataset).stem}__{self.vendor}_{self.model}"
+
+
+class RateLimiter:
+    """Token bucket shared by all workers of one vendor."""
+
+    def __init__(self, rpm: float):
+        self.interval = 60.0 / rpm if rpm else 0.0
+        self.next_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            at = max(self.next_at, now)
+            self.next_at = at + self.interval
+        if at > now:
+            time.sleep(at - now)
+
+
+def estimate_row_cost(model: str, review: str) -> float:
+    price = MODEL_PRICES.get(model)
+    if price is None:
+        return 0.0
+    tokens_in = len(build_prompt(review)) / CHARS_PER_TOKEN
+    return (tokens_in * price["price_in"] + EST_OUTPUT_TOKENS * price["price_out"]) / 1e6
+
+
+class Scheduler:
+    def __init__(self, jobs: List[Job], budget_usd: Optional[float] = None,
+                 deadline: Optional[datetime] = None, vendor_quotas: Optional[dict] = None,
+                 state_dir: Path = STATE_DIR):
+        self.jobs = sorted(jobs, key=lambda j: j.priority)
+        self.budget = budget_usd
+        self.deadline = deadline
+        self.quotas = {**VENDOR_QUOTAS, **(vendor_quotas or {})}
+        self.state_dir = state_dir
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)   # notified when spend or reservations change
+        self.stop = threading.Event()
+        self.limiters = {v: RateLimiter(q.get("rpm", 0)) for v, q in self.quotas.items()}
+        self.clients = {}
+        self.claimed = set()          # (job_id, chunk) currently being labeled
+        self.workers = Counter()      # vendor -> worker threads still running
+        self.chunk_costs = {}         # job_id -> list of estimated cost per chunk
+        self.frames = {}              # dataset path -> DataFrame
+        self.sec_per_row = {}         # vendor -> measured seconds per row
+
+    # ---------- persistence ----------
+    @property
+    def state_path(self) -> Path:
+        return self.state_dir / "state.json"
+
+    def chunk_path(self, job: Job, chunk: int) -> Path:
+        return self.state_dir / job.job_id / f"chunk-{chunk:05d}.parquet"
+
+    def save_state(self):
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        state = {
+            "budget_usd": self.budget,
+            "deadline": self.deadline.isoformat() if self.deadline else None,
+            "spent_usd": round(self.spent(), 6),
+            "spend_basis": "estimate (chars/4 tokens x MODEL_PRICES)",
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+            "jobs": [asdict(j) for j in self.jobs],
+        }
+        tmp = self.state_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(state, fh, indent=2)
+        tmp.replace(self.state_path)
+
+    def restore_progress(self):
+        """Carry progress over from a previous run of the same jobs."""
+        if not self.state_path.exists():
+            return
+        with open(self.state_path, encoding="utf-8") as fh:
+            old = {Job(**j).job_id: j for j in json.load(fh)["jobs"]}
+        for job in self.jobs:
+            prev = old.get(job.job_id)
+            if prev is None:
+                continue
+            job.done_chunks = prev["done_chunks"]
+            job.spend_usd = prev["spend_usd"]
+            job.status = "done" if prev["status"] == "done" else "pending"
+
+    # ---------- planning ----------
+    def load_dataset(self, job: Job) -> pd.DataFrame:
+        key = str(resolve_table(BASE_DIR / job.dataset))
+        if key not in self.frames:
+            self.frames[key] = read_table(key).reset_index(drop=True)
+        return self.frames[key]
+
+    def plan(self):
+        for job in self.jobs:
+            df = self.load_dataset(job)
+            job.n_chunks = (len(df) + job.chunk_size - 1) // job.chunk_size
+            reviews = df[TEXT_COL].astype(str).tolist()
+            self.chunk_costs[job.job_id] = [
+                sum(estimate_row_cost(job.model, r) for r in reviews[c * job.chunk_size:(c + 1) * job.chunk_size])
+                for c in range(job.n_chunks)
+            ]
+
+    def spent(self) -> float:
+        return sum(j.spend_usd for j in self.jobs)
+
+    def remaining_cost(self, job: Job) -> float:
+        """Estimated cost of the chunks of `job` that are neither done nor in flight."""
+        costs = self.chunk_costs.get(job.job_id, [])
+        return sum(
+            c for i, c in enumerate(costs)
+            if i not in job.done_chunks and (job.job_id, i) not in self.claimed
+        )
+
+    def inflight_cost(self) -> float:
+        return sum(self.chunk_costs[job_id][c] for job_id, c in self.claimed)
+
+    def _can_afford(self, job: Job, cost: float) -> bool:
+        if self.budget is None:
+            return True
+        # hold back what higher-priority jobs on other vendors still need
+        reserved = sum(
+            self.remaining_cost(j) for j in self.jobs
+            if j.priority < job.priority and j.vendor != job.vendor and j.status in ("pending", "running")
+        )
+        return self.spent() + self.inflight_cost() + reserved + cost <= self.budget
+
+    def _fits_deadline(self, job: Job) -> bool:
+        if self.deadline is None:
+            return True
+        est = self.sec_per_row.get(job.vendor, 1.0) * job.chunk_size
+        return time.time() + est <= self.deadline.timestamp()
+
+    def claim(self, vendor: str):
+        """Next (job, chunk) for `vendor`, in priority order, or None (caller holds self.lock).
+
+        Paused jobs are checked again: a job that did not fit earlier may fit
+        now that other chunks have settled or other jobs stopped reserving.
+        """
+        for job in self.jobs:
+            if job.vendor != vendor or job.status not in ("pending", "running", "paused_budget", "paused_deadline"):
+                continue
+            for c in range(job.n_chunks):
+                if c in job.done_chunks or (job.job_id, c) in self.claimed:
+                    continue
+                cost = self.chunk_costs[job.job_id][c]
+                if not self._can_afford(job, cost):
+                    job.status = "paused_budget"
+                    break
+                if not self._fits_deadline(job):
+                    job.status = "paused_deadline"
+                    break
+                job.status = "running"
+                self.claimed.add((job.job_id, c))
+                return job, c
+        return None
+
+    def unclaimed(self) -> List[Job]:
+        """Pending or running jobs with chunks a live worker of their vendor has yet to claim."""
+        return [
+            j for j in self.jobs
+            if j.status in ("pending", "running") and self.workers[j.vendor] > 0
+            and any(c not in j.done_chunks and (j.job_id, c) not in self.claimed for c in range(j.n_chunks))
+        ]
+
+    def next_chunk(self, vendor: str):
+        """Claim a chunk for `vendor`, waiting while other work may still free budget.
+
+        Returns None once nothing for the vendor fits, no chunk is in flight
+        anywhere and no job elsewhere is still waiting to be claimed (spend,
+        reservations and timing can no longer change).
+        """
+        with self.changed:
+            while not self.stop.is_set():
+                before = [j.status for j in self.jobs]
+                claimed = self.claim(vendor)
+                if claimed is not None:
+                    return claimed
+                if before != [j.status for j in self.jobs]:
+                    self.changed.notify_all()   # a job paused: it no longer holds budget back
+                if not self.claimed and not self.unclaimed():
+                    return None
+                self.changed.wait(timeout=5.0)
+            return None
+
+    # ---------- execution ----------
+    def client_for(self, vendor: str):
+        with self.lock:
+            if vendor not in self.clients:
+                from clients.registry import get_client_and_fn
+                self.clients[vendor] = get_client_and_fn(vendor)
+            return self.clients[vendor]
+
+    def run_chunk(self, job: Job, chunk: int):
+        client, call_fn = self.client_for(job.vendor)
+        if client is None:
+            raise RuntimeError(f"Client for {job.vendor} not initialized")
+        limiter = self.limiters.setdefault(job.vendor, RateLimiter(0))
+
+        def limited_call(model_name, review, client=None):
+            with span("scheduler.rate_limit"):
+                limiter.wait()
+            return call_fn(model_name, review, client=client)
+
+        df = self.load_dataset(job)
+        part = df.iloc[chunk * job.chunk_size:(chunk + 1) * job.chunk_size].reset_index(drop=True)
+        t0 = time.time()
+        with span("scheduler.chunk", job=job.job_id, chunk=chunk):
+            labeled = label_dataframe_with_model(
+                df=part,
+                text_col=TEXT_COL,
+                vendor=job.vendor,
+                model_name=job.model,
+                call_fn=limited_call,
+                client=client,
+                save_every=job.chunk_size,
+            )
+        write_table(labeled, self.chunk_path(job, chunk))
+        return (time.time() - t0) / max(len(part), 1)
+
+    def finish(self, job: Job):
+        parts = [read_table(self.chunk_path(job, c)) for c in range(job.n_chunks)]
+        out = BASE_DIR / job.out_dir / f"labels_{job.vendor}_{job.model}.{STORAGE_FORMAT}"
+        write_table(pd.concat(parts, ignore_index=True), out)
+        print(f"[scheduler] {job.job_id} done -> {out}")
+
+    def worker(self, vendor: str):
+        try:
+            self._work(vendor)
+        finally:
+            with self.changed:
+                self.workers[vendor] -= 1
+                self.changed.notify_all()   # its vendor's jobs no longer wait on it
+
+    def _work(self, vendor: str):
+        while not self.stop.is_set():
+            claimed = self.next_chunk(vendor)
+            if claimed is None:
+                return
+            job, chunk = claimed
+            try:
+                sec = self.run_chunk(job, chunk)
+            except Exception as e:
+                with self.lock:
+                    job.status = "failed"
+                    job.error = str(e)
+                    self.claimed.discard((job.job_id, chunk))
+                    self.save_state()
+                    self.changed.notify_all()   # its reservation is released
+                print(f"[scheduler] {job.job_id} failed on chunk {chunk}: {e}")
+                continue
+
+            with self.lock:
+                self.claimed.discard((job.job_id, chunk))
+                job.done_chunks.append(chunk)
+                job.spend_usd += self.chunk_costs[job.job_id][chunk]
+                prev = self.sec_per_row.get(vendor)
+                self.sec_per_row[vendor] = sec if prev is None else 0.7 * prev + 0.3 * sec
+                complete = len(job.done_chunks) == job.n_chunks
+                if complete:
+                    job.status = "done"
+                self.save_state()
+                self.changed.notify_all()   # spend settled: paused jobs may fit now
+                print(f"[scheduler] {job.job_id}: {len(job.done_chunks)}/{job.n_chunks} chunks, "
+                      f"spent ~${self.spent():.4f}")
+            if complete:
+                self.finish(job)
+
+    def run(self):
+        self.plan()
+        self.restore_progress()
+        self.save_state()
+
+        vendors = sorted({j.vendor for j in self.jobs if j.status != "done"})
+        # count every vendor's workers before any starts, so none exits while another is starting
+        for vendor in vendors:
+            self.workers[vendor] = self.quotas.get(vendor, {}).get("concurrency", 1)
+        threads = []
+        for vendor in vendors:
+            for i in range(self.workers[vendor]):
+                t = threading.Thread(target=self.worker, args=(vendor,), name=f"{vendor}-{i}", daemon=True)
+                t.start()
+                threads.append(t)
+        try:
+            while any(t.is_alive() for t in threads):
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            print("\n[scheduler] Pausing: finishing in-flight chunks, rerun to resume.")
+            self.stop.set()
+            with self.changed:
+                self.changed.notify_all()
+            for t in threads:
+                t.join()
+        self.save_state()
+
+        for job in self.jobs:
+            print(f"  {job.job_id:60s} {job.status:16s} {len(job.done_chunks)}/{job.n_chunks} "
+                  f"~${job.spend_usd:.4f}")
+        print(f"Total estimated spend: ${self.spent():.4f}"
+              + (f" of ${self.budget:.2f}" if self.budget is not None else "")
+              + " (chars/4 token estimate priced with MODEL_PRICES, not vendor-reported usage)")
+
+
+def load_jobs_file(path: Path):
+    with open(path, encoding="utf-8") as fh:
+        spec = json.load(fh)
+    jobs = [Job(**j) for j in spec["jobs"]]
+    deadline = datetime.fromisoformat(spec["deadline"]) if spec.get("deadline") else None
+    return jobs, spec.get("budget_usd"), deadline, spec.get("vendor_quotas")
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    src = p.add_mutually_exclusive_group(required=True)
+    src.add_argument("--jobs", type=Path, help="Jobs file (JSON)")
+    src.add_argument("--from-config", action="store_true", help="One job per model in MODELS over DATA_PATH")
+    p.add_argument("--budget", type=float, default=None, help="Spend budget in USD (overrides the jobs file)")
+    p.add_argument("--deadline", default=None, help="ISO datetime (overrides the jobs file)")
+    p.add_argument("--state-dir", type=Path, default=STATE_DIR)
+    p.add_argument("--metrics-port", type=int, default=0,
+                   help="Serve Prometheus metrics on this local port (0 = off)")
+    tracing.add_arguments(p)
+    args = p.parse_args()
+
+    if args.metrics_port:
+        start_http_server(args.metrics_port)
+    tracing.enable_from_args(args)
+
+    if args.jobs:
+        jobs, budget, deadline, quotas = load_jobs_file(args.jobs)
+    else:
+        dataset = str(DATA_PATH.relative_to(BASE_DIR))
+        jobs = [Job(dataset=dataset, vendor=m["vendor"], model=m["name"], priority=i) for i, m in enumerate(MODELS)]
+        budget, deadline, quotas = None, None, None
+    if args.budget is not None:
+        budget = args.budget
+    if args.deadline:
+        deadline = datetime.fromisoformat(args.deadline)
+
+    Scheduler(jobs, budget, deadline, quotas, args.state_dir).run()
+    tracing.print_report()
+
+
+if __name__ == "__main__":
+    main()
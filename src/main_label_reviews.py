@@ -1,3 +1,48 @@
+"""Label the configured dataset with every model in MODELS (or the `--models` subset).
+
+Shard mode splits the dataset by a stable hash of each review's text
+(`storage.shard_of`), so independent processes -- on this machine or on
+other nodes sharing the filesystem, each with its own `--env-file`
+credentials -- can label one shard each:
+
+    python main_label_reviews.py --shards 4 --shard 0 --env-file ../keys/node0.env
+    python main_label_reviews.py --shards 4 --shard 1 --env-file ../keys/node1.env
+    ...
+    python main_label_reviews.py --shards 4 --merge --relaunch
+
+Shard outputs go to `<out-dir>/shards/` and carry the original row number.
+`--merge` checks every shard file against the rows that hash to it, relaunches
+only the missing or incomplete shards (as local processes, `--workers` at a
+time) when `--relaunch` is given, and writes the usual
+`labels_<vendor>_<model>` file in the original row order. Relaunched shards
+are run with `--models` set to the one model whose shards are missing, so
+complete shards of other models are not labeled (and paid for) again, and
+with the parent's output flags (PASSTHROUGH_FLAGS: `--store`, `--run`,
+`--export-csv`, ...); each serves metrics on its own port after
+`--metrics-port`. With `--store`, the merged labels are stored as well.
+
+`--dry-run` makes no API calls: it counts the rendered prompts' tokens
+offline and prints the expected tokens, cost and wall-clock time per model
+(see labeling/estimate.py), using the latency measured by earlier runs:
+
+    python main_label_reviews.py --dry-run --concurrency 4
+
+`--trace DIR` records where the time goes: spans around row handling,
+prompt rendering, each vendor request, retry backoff and table writes, plus
+with `--profile` a sampled flamegraph profile (see tracing.py). Relaunched
+shards trace into the same directory:
+
+    python main_label_reviews.py --trace ../outputs/trace --profile
+    python tracing.py report ../outputs/trace
+"""
+import argparse
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+
 import pandas as pd
 
 from config import (
@@ -5,74 +50,55 @@ from config import (
     OUTPUT_DIR,
     TEXT_COL,
     MODELS,
+    STORAGE_FORMAT,
 )
-from clients.openai_client import init_openai_client, call_openai
-from clients.anthropic_client import init_anthropic_client, call_anthropic
-from clients.google_client import init_google_client, call_google
+from prompts import DEFAULT_VARIANT, PROMPT_VARIANTS, prompt_version
+from storage import read_table, resolve_table, shard_of, write_table
+from clients.registry import get_client_and_fn, skip_without_client
 from labeling.runner import label_dataframe_with_model
-from clients.deepseek_client import init_deepseek_client, call_deepseek
-from clients.grok_client import init_grok_client, call_grok
-
-def get_client_and_fn(vendor: str):
-    if vendor == "openai":
-        client = init_openai_client()
-        return client, call_openai
-    elif vendor == "anthropic":
-        client = init_anthropic_client()
-        return client, call_anthropic
-    elif vendor == "google":
-        client = init_google_client()
-        return client, call_google
-    elif vendor == "fireworks":  # deepseek
-        client = init_deepseek_client()
-        return client, call_deepseek
-    elif vendor == "xai":  # grok
-        client = init_grok_client()
-        return client, call_grok
-    else:
-        raise ValueError(f"Unknown vendor: {vendor}")
+from monitoring import start_http_server
+import tracing
+from tracing import span
 
+ROW_COL = "_row"   # original row number, kept in shard files for the merge
 
-def main():
-    # Load data
-    if not DATA_PATH.exists():
-        raise FileNotFoundError(f"Dataset not found at {DATA_PATH}")
+# flags a relaunched shard inherits from the --merge --relaunch process
+PASSTHROUGH_FLAGS = ["--data", "--out-dir", "--format", "--export-csv", "--store", "--run",
+                     "--stream", "--prompt-variant", "--env-file"]
 
-    df = pd.read_csv(DATA_PATH)
-    if TEXT_COL not in df.columns:
-        raise KeyError(
-            f"Text column '{TEXT_COL}' not found. Available: {df.columns.tolist()}"
-        )
 
-    df = df.reset_index(drop=True)
-    print(f"Loaded dataset with {len(df)} rows from {DATA_PATH}")
+def shard_path(out_dir: Path, vendor: str, model_name: str, shard: int, n_shards: int, fmt: str) -> Path:
+    return out_dir / "shards" / f"labels_{vendor}_{model_name}.shard-{shard:03d}-of-{n_shards:03d}.{fmt}"
 
-    for cfg in MODELS:
-        vendor = cfg["vendor"]
-        model_name = cfg["name"]
 
-        print("\n" + "=" * 80)
-        print(f"Running model: vendor={vendor}, model={model_name}")
-        print("=" * 80)
+def assign_shards(df: pd.DataFrame, n_shards: int) -> pd.Series:
+    return pd.Series([shard_of(t, n_shards) for t in df[TEXT_COL]], index=df.index)
 
-        out_path = OUTPUT_DIR / f"labels_{vendor}_{model_name}.csv"
-        if out_path.exists():
-            try:
-                out_path.unlink()
-                print(f"Removed existing output at {out_path}, creating new file.")
-            except Exception as e:
-                print(f"Could not remove existing output {out_path}: {e}")
-                print("Skipping this model to avoid overwriting existing file.")
-                continue
 
-        client, call_fn = get_client_and_fn(vendor)
+def label_model(df: pd.DataFrame, vendor: str, model_name: str, out_path: Path, args) -> bool:
+    """Label df with one model and write out_path; False if the model was skipped."""
+    if out_path.exists():
+        try:
+            out_path.unlink()
+            print(f"Removed existing output at {out_path}, creating new file.")
+        except Exception as e:
+            print(f"Could not remove existing output {out_path}: {e}")
+            print("Skipping this model to avoid overwriting existing file.")
+            return False
 
-        if client is None and vendor in {"openai", "anthropic", "google"}:
-            print(f"Client for {vendor} not initialized, skipping this model.")
-            continue
+    client, call_fn = get_client_and_fn(vendor)
+
+    if client is None and skip_without_client(vendor):
+        print(f"Client for {vendor} not initialized, skipping this model.")
+        return False
+    if args.stream:
+        call_fn = partial(call_fn, stream=True)
+    if args.prompt_variant != DEFAULT_VARIANT:
+        call_fn = partial(call_fn, variant=args.prompt_variant)
 
+    with span("label_model", vendor=vendor, model=model_name):
         labeled_df = label_dataframe_with_model(
-            df=df,
+            df=df.reset_index(drop=True),
             text_col=TEXT_COL,
             vendor=vendor,
             model_name=model_name,
@@ -80,11 +106,206 @@ def main():
             client=client,
             save_every=100,
         )
+    from labeling.estimate import record_telemetry
+
+    record_telemetry(vendor, model_name)
+
+    # write to a temp name first so a crashed shard never looks complete to --merge
+    tmp_path = out_path.with_name(out_path.stem + ".tmp" + out_path.suffix)
+    write_table(labeled_df, tmp_path)
+    os.replace(tmp_path, out_path)
+    print(f"Saved labeled data for {vendor}/{model_name} to {out_path}")
+    if args.export_csv and args.format != "csv":
+        csv_path = write_table(labeled_df, out_path.with_suffix(".csv"))
+        print(f"Exported CSV copy to {csv_path}")
+    if args.store:
+        store_labels(labeled_df, vendor, model_name, args)
+    return True
+
+
+def store_labels(labeled_df: pd.DataFrame, vendor: str, model_name: str, args):
+    from label_store import LabelStore
+
+    store = LabelStore(args.store)
+    try:
+        n = store.add_labels(labeled_df, f"{vendor}_{model_name}_labels", vendor, model_name,
+                             prompt_version=prompt_version(args.prompt_variant, vendor), run=args.run)
+    finally:
+        store.close()
+    print(f"Stored {n} labels for {vendor}/{model_name} (run {args.run}) in {args.store}")
+
+
+def missing_shards(shards: pd.Series, vendor: str, model_name: str, args):
+    """Shards whose file is absent or does not hold exactly the rows that hash to it."""
+    missing = []
+    for i in range(args.shards):
+        path = shard_path(args.out_dir, vendor, model_name, i, args.shards, args.format)
+        expected = set(shards.index[shards == i])
+        if not path.exists() or set(read_table(path, columns=[ROW_COL])[ROW_COL]) != expected:
+            missing.append(i)
+    return missing
+
+
+def model_key(cfg: dict) -> str:
+    return f"{cfg['vendor']}:{cfg['name']}"
+
+
+def passthrough_argv(args) -> list:
+    """The PASSTHROUGH_FLAGS that are set in `args`, as command-line arguments."""
+    argv = []
+    for flag in PASSTHROUGH_FLAGS:
+        value = getattr(args, flag[2:].replace("-", "_"))
+        if value is True:
+            argv.append(flag)
+        elif value is not None and value is not False:
+            argv += [flag, str(value)]
+    return argv
+
+
+def relaunch(shard_list, vendor: str, model_name: str, args):
+    """Label the given shards with one model as local worker processes, `--workers` at a time."""
+    def run(i):
+        cmd = [sys.executable, str(Path(__file__).resolve()), *passthrough_argv(args),
+               "--shards", str(args.shards), "--shard", str(i),
+               "--models", f"{vendor}:{model_name}"]
+        if args.metrics_port:
+            cmd += ["--metrics-port", str(args.metrics_port + 1 + i)]   # one port per shard process
+        print(f"Launching shard {i}/{args.shards}: {' '.join(cmd)}")
+        return i, subprocess.run(cmd).returncode
+
+    with ThreadPoolExecutor(max_workers=args.workers) as ex:
+        for i, code in ex.map(run, shard_list):
+            if code != 0:
+                print(f"Shard {i} exited with code {code}")
+
+
+def merge(df: pd.DataFrame, models, args):
+    shards = assign_shards(df, args.shards)
+    for cfg in models:
+        vendor, model_name = cfg["vendor"], cfg["name"]
+        missing = missing_shards(shards, vendor, model_name, args)
+        if missing and args.relaunch:
+            relaunch(missing, vendor, model_name, args)
+            missing = missing_shards(shards, vendor, model_name, args)
+        if missing:
+            print(f"[{vendor}/{model_name}] missing or incomplete shards: {missing}; not merging.")
+            continue
+
+        parts = [read_table(shard_path(args.out_dir, vendor, model_name, i, args.shards, args.format))
+                 for i in range(args.shards)]
+        merged = pd.concat(parts, ignore_index=True).sort_values(ROW_COL, kind="stable")
+        merged = merged.drop(columns=[ROW_COL]).reset_index(drop=True)
+        out_path = args.out_dir / f"labels_{vendor}_{model_name}.{args.format}"
+        write_table(merged, out_path)
+        print(f"Merged {args.shards} shards ({len(merged)} rows) for {vendor}/{model_name} into {out_path}")
+        if args.export_csv and args.format != "csv":
+            print(f"Exported CSV copy to {write_table(merged, out_path.with_suffix('.csv'))}")
+        if args.store:
+            store_labels(merged, vendor, model_name, args)
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--data", type=Path, default=DATA_PATH,
+                   help="Dataset to label (default: DATA_PATH; e.g. a refresh file from data/processed/queue/)")
+    p.add_argument("--out-dir", type=Path, default=OUTPUT_DIR,
+                   help="Where to write labels_<vendor>_<model> files")
+    p.add_argument("--format", choices=["parquet", "arrow", "csv"], default=STORAGE_FORMAT,
+                   help="Output format for labels_<vendor>_<model> files")
+    p.add_argument("--export-csv", action="store_true",
+                   help="Also write a CSV copy of each label file")
+    p.add_argument("--metrics-port", type=int, default=0,
+                   help="Serve Prometheus metrics on this local port (0 = off)")
+    p.add_argument("--store", type=Path, default=None,
+                   help="Also add the labels to this label store (see label_store.py)")
+    p.add_argument("--run", default="default", help="Run name recorded with --store")
+    p.add_argument("--stream", action="store_true",
+                   help="Stream completions and stop reading once the label is decoded")
+    p.add_argument("--prompt-variant", choices=sorted(PROMPT_VARIANTS), default=DEFAULT_VARIANT,
+                   help="Instruction variant from prompts.py (see benchmark/prompt_ab.py)")
+    p.add_argument("--dry-run", action="store_true",
+                   help="Print estimated tokens, cost and wall-clock time per model; no API calls")
+    p.add_argument("--concurrency", type=int, default=1,
+                   help="With --dry-run: requests in flight at once (e.g. shard processes)")
+    p.add_argument("--shards", type=int, default=1, help="Split the dataset into this many shards")
+    p.add_argument("--shard", type=int, default=None, help="Label only this shard (0-based)")
+    p.add_argument("--merge", action="store_true", help="Merge shard outputs into labels_<vendor>_<model>")
+    p.add_argument("--relaunch", action="store_true", help="With --merge: label missing shards first")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                   help="Shard processes run at once by --relaunch")
+    p.add_argument("--models", nargs="+", default=None, metavar="VENDOR:MODEL",
+                   help="Only these entries of MODELS (default: all)")
+    p.add_argument("--env-file", type=Path, default=None,
+                   help="Load API keys from this file (overrides .env), e.g. per-node credentials")
+    tracing.add_arguments(p)
+    args = p.parse_args()
+
+    if args.shard is not None and not 0 <= args.shard < args.shards:
+        p.error(f"--shard must be in [0, {args.shards})")
+    if args.shard is not None and args.merge:
+        p.error("--shard and --merge are mutually exclusive")
+    models = MODELS
+    if args.models:
+        unknown = set(args.models) - {model_key(cfg) for cfg in MODELS}
+        if unknown:
+            p.error(f"--models not in MODELS: {', '.join(sorted(unknown))}")
+        models = [cfg for cfg in MODELS if model_key(cfg) in args.models]
+
+    if args.env_file:
+        from dotenv import load_dotenv
+
+        load_dotenv(args.env_file, override=True)
+
+    if args.metrics_port:
+        start_http_server(args.metrics_port)
+    tracing.enable_from_args(args)
+
+    # Load data (a Parquet copy next to DATA_PATH is preferred when present)
+    data_path = resolve_table(args.data)
+    if not data_path.exists():
+        raise FileNotFoundError(f"Dataset not found at {args.data}")
+
+    df = read_table(data_path)
+    if TEXT_COL not in df.columns:
+        raise KeyError(
+            f"Text column '{TEXT_COL}' not found. Available: {df.columns.tolist()}"
+        )
+
+    df = df.reset_index(drop=True)
+    print(f"Loaded dataset with {len(df)} rows from {data_path}")
+
+    if args.merge:
+        merge(df, models, args)
+        return
+
+    if args.shard is not None:
+        df = df.assign(**{ROW_COL: df.index})
+        df = df[assign_shards(df, args.shards) == args.shard]
+        print(f"Shard {args.shard}/{args.shards}: {len(df)} rows")
+
+    if args.dry_run:
+        from labeling.estimate import estimate_run, print_estimate
+
+        reviews = df[TEXT_COL].astype(str).tolist()
+        print_estimate(estimate_run(reviews, models, args.prompt_variant, args.concurrency), args.concurrency)
+        return
+
+    for cfg in models:
+        vendor = cfg["vendor"]
+        model_name = cfg["name"]
+
+        print("\n" + "=" * 80)
+        print(f"Running model: vendor={vendor}, model={model_name}")
+        print("=" * 80)
 
-        labeled_df.to_csv(out_path, index=False)
-        print(f"Saved labeled data for {vendor}/{model_name} to {out_path}")
+        if args.shard is None:
+            out_path = args.out_dir / f"labels_{vendor}_{model_name}.{args.format}"
+        else:
+            out_path = shard_path(args.out_dir, vendor, model_name, args.shard, args.shards, args.format)
+        label_model(df, vendor, model_name, out_path, args)
 
     print("\nAll models finished (or skipped if not configured).")
+    tracing.print_report()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,279 @@
+"""In-process metrics for labeling runs, with a Prometheus-format endpoint.
+
+The runner and the vendor clients update a module-level registry:
+
+- labeler_requests_total{vendor,model,status}   counter (status = ok | error)
+- labeler_request_seconds{vendor,model}         latency histogram
+- labeler_inflight_requests{vendor,model}       gauge
+- labeler_retries_total{vendor,model,reason}    counter (client-side retries)
+- labeler_rows_done / labeler_rows_total        gauges per vendor/model
+
+`start_http_server(port)` serves them on http://127.0.0.1:<port>/metrics
+from a daemon thread, and `progress_summary()` renders the one-line
+terminal summary (rate, ETA, error rate, latency quantiles) that the runner
+prints while it works. Everything is stdlib; updating a metric is a dict
+lookup and an add under a lock.
+
+Usage (from `src/`):
+    python main_label_reviews.py --metrics-port 9108
+    curl -s localhost:9108/metrics
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0)
+
+
+def _label_str(labelnames: Sequence[str], values: Tuple[str, ...]) -> str:
+    if not labelnames:
+        return ""
+    inner = ",".join(f'{k}="{str(v)}"' for k, v in zip(labelnames, values))
+    return "{" + inner + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(k, "")) for k in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def total(self, **labels) -> float:
+        """Sum over every label set matching the given (partial) labels."""
+        want = [(i, str(labels[k])) for i, k in enumerate(self.labelnames) if k in labels]
+        with self._lock:
+            return sum(v for key, v in self._values.items() if all(key[i] == w for i, w in want))
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_label_str(self.labelnames, k)} {v:g}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [count per bucket (+Inf last)], sum
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            counts[i] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """Estimate a quantile by linear interpolation inside its bucket (like histogram_quantile)."""
+        counts = self._counts.get(self._key(labels))
+        if not counts or sum(counts) == 0:
+            return None
+        rank = q * sum(counts)
+        cum = 0
+        for i, c in enumerate(counts):
+            if cum + c >= rank and c > 0:
+                lo = self.buckets[i - 1] if i > 0 else 0.0
+                if i == len(self.buckets):
+                    return lo   # +Inf bucket: best we can say is "above the last bound"
+                return lo + (self.buckets[i] - lo) * (rank - cum) / c
+            cum += c
+        return self.buckets[-1]
+
+    def count(self, **labels) -> int:
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def sum(self, **labels) -> float:
+        return self._sums.get(self._key(labels), 0.0)
+
+    def _samples(self):
+        lines = []
+        with self._lock:
+            items = [(k, list(c), self._sums[k]) for k, c in self._counts.items()]
+        for key, counts, total in items:
+            base = _label_str(self.labelnames, key)[1:-1]
+            sep = "," if base else ""
+            cum = 0
+            for bound, c in zip(list(self.buckets) + ["+Inf"], counts):
+                cum += c
+                le = bound if bound == "+Inf" else f"{bound:g}"
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{le}"}} {cum}')
+            lines.append(f"{self.name}_sum{_label_str(self.labelnames, key)} {total:g}")
+            lines.append(f"{self.name}_count{_label_str(self.labelnames, key)} {cum}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, help, labelnames, **kw):
+        with self._lock:
+            m = self._metrics.get(name)
+            if m is None:
+                m = self._metrics[name] = cls(name, help, labelnames, **kw)
+            elif not isinstance(m, cls):
+                raise ValueError(f"Metric {name} already registered as {m.kind}")
+            return m
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for m in metrics for line in m.render()) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.counter("labeler_requests_total", "LLM calls by outcome", ("vendor", "model", "status"))
+LATENCY = REGISTRY.histogram("labeler_request_seconds", "LLM call latency", ("vendor", "model"))
+INFLIGHT = REGISTRY.gauge("labeler_inflight_requests", "LLM calls currently running", ("vendor", "model"))
+RETRIES = REGISTRY.counter("labeler_retries_total", "Client-side retries", ("vendor", "model", "reason"))
+ROWS_DONE = REGISTRY.gauge("labeler_rows_done", "Rows labeled so far in the current run", ("vendor", "model"))
+ROWS_TOTAL = REGISTRY.gauge("labeler_rows_total", "Rows in the current run", ("vendor", "model"))
+
+
+@contextmanager
+def track_request(vendor: str, model: str):
+    """Time one LLM call and count it as ok/error; the exception is re-raised."""
+    INFLIGHT.inc(vendor=vendor, model=model)
+    t0 = time.perf_counter()
+    status = "error"
+    try:
+        yield
+        status = "ok"
+    finally:
+        LATENCY.observe(time.perf_counter() - t0, vendor=vendor, model=model)
+        REQUESTS.inc(vendor=vendor, model=model, status=status)
+        INFLIGHT.dec(vendor=vendor, model=model)
+
+
+_started: Dict[Tuple[str, str], float] = {}
+
+
+def add_rows(vendor: str, model: str, n: int):
+    """Announce `n` more rows to label; the first call starts the rate/ETA clock."""
+    _started.setdefault((vendor, model), time.time())
+    ROWS_TOTAL.inc(n, vendor=vendor, model=model)
+
+
+def row_done(vendor: str, model: str):
+    ROWS_DONE.inc(vendor=vendor, model=model)
+
+
+def record_retry(vendor: str, model: str, reason: str):
+    RETRIES.inc(vendor=vendor, model=model, reason=reason)
+
+
+def progress_summary(vendor: str, model: str) -> str:
+    """One line: rows done/total, rows/s, ETA, error rate and p50/p95 latency."""
+    done = ROWS_DONE.get(vendor=vendor, model=model)
+    total = ROWS_TOTAL.get(vendor=vendor, model=model)
+    elapsed = max(time.time() - _started.get((vendor, model), time.time()), 1e-9)
+    rate = done / elapsed
+    eta = (total - done) / rate if rate > 0 else float("nan")
+    ok = REQUESTS.get(vendor=vendor, model=model, status="ok")
+    err = REQUESTS.get(vendor=vendor, model=model, status="error")
+    err_rate = err / (ok + err) if ok + err else 0.0
+    p50 = LATENCY.quantile(0.5, vendor=vendor, model=model) or 0.0
+    p95 = LATENCY.quantile(0.95, vendor=vendor, model=model) or 0.0
+    retries = RETRIES.total(vendor=vendor, model=model)
+    return (
+        f"[{vendor}/{model}] {done:.0f}/{total:.0f} rows | {rate:.2f} rows/s | "
+        f"ETA {eta / 60:.1f} min | errors {err_rate:.1%} | retries {retries:.0f} | "
+        f"latency p50 {p50:.2f}s p95 {p95:.2f}s"
+    )
+
+
+def snapshot(vendor: str, model: str) -> dict:
+    """Raw totals for one vendor/model, e.g. to persist measured latency between runs."""
+    return {
+        "requests": LATENCY.count(vendor=vendor, model=model),
+        "latency_sum": LATENCY.sum(vendor=vendor, model=model),
+        "latency_p50": LATENCY.quantile(0.5, vendor=vendor, model=model),
+        "latency_p95": LATENCY.quantile(0.95, vendor=vendor, model=model),
+        "errors": REQUESTS.get(vendor=vendor, model=model, status="error"),
+        "retries": RETRIES.total(vendor=vendor, model=model),
+    }
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass   # scrapes would otherwise flood the progress output
+
+
+def start_http_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve REGISTRY at http://host:port/metrics from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
@@ -0,0 +1,74 @@
+"""Import-time check for the labeling entry point.
+
+Runs `python -X importtime -c "import main_label_reviews"` in a fresh
+interpreter, prints the slowest imports, and exits non-zero if the total
+exceeds a budget or if a vendor SDK (or dotenv) was imported eagerly. Vendor
+modules should only load through `clients.registry` when first used.
+
+Usage (from `src/`):
+    python -m perf.import_time
+    python -m perf.import_time --module labeling.scheduler --max-ms 1500
+"""
+import argparse
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent
+
+# must not be imported just by importing the entry point
+EAGER_FORBIDDEN = ("openai", "anthropic", "google.generativeai", "requests", "dotenv")
+
+LINE_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(module: str):
+    """Return [(name, self_us, cumulative_us, depth)] for `import module` in a fresh process."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_DIR, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = LINE_RE.match(line)
+        if m:
+            self_us, cum_us, indent, name = m.groups()
+            rows.append((name, int(self_us), int(cum_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--module", default="main_label_reviews")
+    p.add_argument("--max-ms", type=float, default=2000.0, help="Budget for the total import time")
+    p.add_argument("--top", type=int, default=15)
+    args = p.parse_args()
+
+    rows = measure(args.module)
+    total_ms = sum(cum for _, _, cum, depth in rows if depth == 0) / 1000.0
+    names = {name for name, _, _, _ in rows}
+
+    print(f"import {args.module}: {total_ms:.0f} ms total ({len(rows)} modules)")
+    print("\nSlowest imports (top level and their direct children):")
+    top = sorted((r for r in rows if r[3] <= 1), key=lambda r: -r[2])[: args.top]
+    for name, _, cum, _ in top:
+        print(f"  {cum / 1000.0:8.1f} ms  {name}")
+
+    eager = [m for m in EAGER_FORBIDDEN if m in names]
+    failed = False
+    if eager:
+        print(f"\nFAIL: imported eagerly: {', '.join(eager)}")
+        failed = True
+    if total_ms > args.max_ms:
+        print(f"\nFAIL: {total_ms:.0f} ms exceeds budget of {args.max_ms:.0f} ms")
+        failed = True
+    if not failed:
+        print("\nOK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
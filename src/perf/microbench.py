@@ -0,0 +1,246 @@
+"""Micro-benchmarks for the offline hot paths, with a saved baseline.
+
+Runs each function on synthetic data at several sizes, records the best
+wall time over `--repeat` runs and the peak traced memory of one extra run
+(tracemalloc is only on for that run so it doesn't skew the timing), and
+compares against a baseline JSON. A result that is slower, or uses more
+memory, than the baseline by more than `--threshold` is flagged and the
+exit code is 1.
+
+Per-row functions that are slow by nature (language detection) are capped
+at `max_n` rows unless `--full` is given.
+
+Usage (from `src/`):
+    python -m perf.microbench --save-baseline
+    python -m perf.microbench                       # compare with the baseline
+    python -m perf.microbench --only confusion_matrix compute_auc_binary --sizes 1000 1000000
+"""
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from config import LABEL_ORDER, OUTPUT_DIR
+
+BASELINE_PATH = OUTPUT_DIR / "perf" / "microbench_baseline.json"
+SIZES = (1_000, 100_000, 1_000_000)
+# differences below these are timer / allocator noise, never a regression
+MIN_DELTA_SECONDS = 0.005
+MIN_DELTA_MB = 1.0
+
+WORDS = (
+    "order driver late food cold app crash refund charged twice support rude never arrived "
+    "missing item wrong fee expensive delivery tip restaurant promo code"
+).split()
+MOJIBAKE = ("‚Äô", "‚Äú", "‚Äù", "√©", "√≥", "  \n")
+
+
+# ---------------------------
+# Synthetic data
+# ---------------------------
+def make_reviews(n: int, rng: np.random.Generator) -> List[str]:
+    lengths = rng.integers(5, 60, size=n)
+    words = rng.choice(WORDS, size=int(lengths.sum()))
+    junk = rng.choice(MOJIBAKE, size=n)
+    out, pos = [], 0
+    for i, k in enumerate(lengths):
+        out.append(" ".join(words[pos:pos + k]) + junk[i])
+        pos += k
+    return out
+
+
+def make_labels(n: int, rng: np.random.Generator, noise: float = 0.0, base=None) -> np.ndarray:
+    labels = np.array(LABEL_ORDER, dtype=object)
+    if base is None:
+        return labels[rng.integers(0, len(labels), size=n)]
+    flip = rng.random(n) < noise
+    out = base.copy()
+    out[flip] = labels[rng.integers(0, len(labels), size=int(flip.sum()))]
+    return out
+
+
+def make_label_cells(n: int, rng: np.random.Generator) -> List[object]:
+    """Raw model outputs: bare labels, JSON lists, blanks and NaNs."""
+    labels = make_labels(n, rng)
+    kind = rng.integers(0, 10, size=n)
+    cells = []
+    for lbl, k in zip(labels, kind):
+        if k < 6:
+            cells.append(lbl)
+        elif k < 8:
+            cells.append(json.dumps([lbl]))
+        elif k < 9:
+            cells.append(f"  {lbl}  ")
+        else:
+            cells.append(float("nan"))
+    return cells
+
+
+# ---------------------------
+# Benchmarks
+# ---------------------------
+@dataclass
+class Bench:
+    name: str
+    setup: Callable[[int, np.random.Generator], tuple]
+    run: Callable
+    max_n: Optional[int] = None   # skip larger sizes unless --full
+
+
+def _clean_text(reviews):
+    from data_cleaner import clean_text
+
+    for r in reviews:
+        clean_text(r)
+
+
+def _lang_detect(reviews):
+    from data_cleaner import safe_lang_detect
+
+    for r in reviews:
+        safe_lang_detect(r)
+
+
+def _parse_cells(cells):
+    from benchmark.compute_metrics import parse_model_labels_cell
+
+    for c in cells:
+        parse_model_labels_cell(c)
+
+
+def _confusion(true, pred):
+    from evaluate_predictions import confusion_matrix
+
+    confusion_matrix(true, pred, LABEL_ORDER)
+
+
+def _auc(scores, true):
+    from evaluate_predictions import compute_auc_binary
+
+    compute_auc_binary(scores, true)
+
+
+def _alpha(units):
+    from benchmark.krippendorff_alpha import krippendorff_alpha_nominal
+
+    krippendorff_alpha_nominal(units)
+
+
+def _majority(rows):
+    from benchmark.generate_gold_labels import majority_vote
+
+    for r in rows:
+        majority_vote(r)
+
+
+def _two_coders(n, rng):
+    a = make_labels(n, rng)
+    b = make_labels(n, rng, noise=0.3, base=a)
+    b[rng.random(n) < 0.02] = None   # a few missing ratings
+    return a, b
+
+
+BENCHES: Dict[str, Bench] = {b.name: b for b in [
+    Bench("clean_text", lambda n, rng: (make_reviews(n, rng),), _clean_text),
+    Bench("safe_lang_detect", lambda n, rng: (make_reviews(n, rng),), _lang_detect, max_n=10_000),
+    Bench("parse_model_labels_cell", lambda n, rng: (make_label_cells(n, rng),), _parse_cells),
+    Bench("confusion_matrix", lambda n, rng: tuple(x.tolist() for x in _two_coders(n, rng)), _confusion),
+    Bench("compute_auc_binary", lambda n, rng: (rng.random(n), rng.random(n) < 0.3), _auc),
+    Bench("krippendorff_alpha_nominal", lambda n, rng: (list(zip(*_two_coders(n, rng))),), _alpha),
+    Bench("majority_vote", lambda n, rng: ([list(r) for r in zip(*_two_coders(n, rng), make_labels(n, rng))],),
+          _majority),
+]}
+
+
+def measure(bench: Bench, n: int, repeat: int, memory: bool, seed: int = 0) -> dict:
+    bench.run(*bench.setup(100, np.random.default_rng(seed)))   # warm-up: imports, regex caches
+    args = bench.setup(n, np.random.default_rng(seed))
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        bench.run(*args)
+        best = min(best, time.perf_counter() - t0)
+    peak = None
+    if memory:
+        tracemalloc.start()
+        bench.run(*args)
+        peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    return {"bench": bench.name, "n": n, "seconds": best, "peak_mb": peak}
+
+
+def compare(results: List[dict], baseline: List[dict], threshold: float) -> List[dict]:
+    """Attach the baseline numbers and a `regression` flag to each result."""
+    base = {(r["bench"], r["n"]): r for r in baseline}
+    for r in results:
+        b = base.get((r["bench"], r["n"]))
+        r["base_seconds"] = b["seconds"] if b else None
+        r["base_peak_mb"] = b.get("peak_mb") if b else None
+        slow = (b is not None and r["seconds"] > b["seconds"] * (1 + threshold)
+                and r["seconds"] - b["seconds"] > MIN_DELTA_SECONDS)
+        fat = (b is not None and r["peak_mb"] is not None and b.get("peak_mb") is not None
+               and r["peak_mb"] > b["peak_mb"] * (1 + threshold)
+               and r["peak_mb"] - b["peak_mb"] > MIN_DELTA_MB)
+        r["regression"] = bool(slow or fat)
+    return results
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--only", nargs="+", choices=list(BENCHES), default=None)
+    p.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    p.add_argument("--repeat", type=int, default=3, help="Timed runs per size (best is kept)")
+    p.add_argument("--full", action="store_true", help="Ignore per-benchmark row caps")
+    p.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc run")
+    p.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    p.add_argument("--save-baseline", action="store_true", help="Write results as the new baseline")
+    p.add_argument("--threshold", type=float, default=0.20, help="Allowed slowdown / memory growth (0.2 = 20%%)")
+    args = p.parse_args()
+
+    results = []
+    for name in args.only or BENCHES:
+        bench = BENCHES[name]
+        for n in args.sizes:
+            if bench.max_n and n > bench.max_n and not args.full:
+                print(f"{name:28s} n={n:>9,}  skipped (cap {bench.max_n:,}; use --full)")
+                continue
+            r = measure(bench, n, args.repeat if n < 1_000_000 else 1, not args.no_memory)
+            results.append(r)
+            mem = f"{r['peak_mb']:8.1f} MB" if r["peak_mb"] is not None else ""
+            print(f"{name:28s} n={n:>9,}  {r['seconds'] * 1e3:10.2f} ms  {mem}")
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as fh:
+            json.dump({"machine": platform.platform(), "python": platform.python_version(),
+                       "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, fh, indent=2)
+        print(f"\nSaved baseline to {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline first.")
+        return
+    with open(args.baseline, encoding="utf-8") as fh:
+        baseline = json.load(fh)
+    compare(results, baseline["results"], args.threshold)
+    print(f"\nAgainst baseline from {baseline['created']} ({baseline['machine']}):")
+    for r in results:
+        if r["base_seconds"] is None:
+            continue
+        ratio = r["seconds"] / r["base_seconds"] if r["base_seconds"] else float("inf")
+        flag = "  REGRESSION" if r["regression"] else ""
+        print(f"  {r['bench']:28s} n={r['n']:>9,}  x{ratio:5.2f} time{flag}")
+    bad = [r for r in results if r["regression"]]
+    if bad:
+        raise SystemExit(f"{len(bad)} regression(s) past {args.threshold:.0%}")
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+"""Cached DAG runner for the whole workflow, raw source to benchmark report.
+
+Stages are the existing scripts, declared with their inputs and outputs:
+
+    convert   data/raw/food_delivery_apps.xlsx -> data/raw/food_delivery_apps.parquet
+    sample    raw Parquet -> reviews_manual_1000.csv, reviews_llm_15000.csv
+    gold      data/raw/reviews_manual_1000_labeled.csv -> reviews_manual_1000_gold.csv
+    label     reviews_manual_1000 -> outputs/labels_<vendor>_<model>.csv (every model in MODELS)
+    metrics   gold + outputs/labels_* -> outputs/benchmark_results_*.csv
+    evaluate  gold + one labels file -> outputs/evaluation_<vendor>_<model>.csv (one stage per model)
+
+Each stage's fingerprint covers its source files, the config values it
+reads, its command line and the content of its inputs. A stage is skipped
+when the fingerprint and its outputs match the last successful run
+(`.pipeline/state.json`); otherwise it and everything downstream reruns.
+Ready stages run in parallel (`--jobs`).
+
+Table inputs are handed to stages as Arrow IPC copies under
+`.pipeline/artifacts/`, written once per input version, so downstream
+stages memory-map them instead of re-parsing CSV.
+
+Outputs that already exist but were never produced by the pipeline (e.g.
+the checked-in label files) are adopted as up to date on the first run,
+and a stage whose outputs were never built is only run when something
+downstream needs it -- so `run` never re-labels with paid APIs just because
+the pipeline is new. Use `--force` to rerun a stage regardless.
+
+Usage (from `src/`):
+    python pipeline.py status
+    python pipeline.py run                   # every stage that is out of date
+    python pipeline.py run metrics --jobs 4  # only what `metrics` needs
+    python pipeline.py run --force label
+    python pipeline.py run --trace ../outputs/trace   # stage spans, see tracing.py
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import config
+from benchmark.compute_metrics import file_digest
+from storage import CSV_SUFFIXES, glob_tables, read_table, write_table
+import tracing
+from tracing import span
+
+SRC_DIR = Path(__file__).resolve().parent
+PIPELINE_DIR = config.BASE_DIR / ".pipeline"
+ARTIFACT_DIR = PIPELINE_DIR / "artifacts"
+STATE_PATH = PIPELINE_DIR / "state.json"
+
+ANNOTATOR_COLS = ["Label 1 (Kenneth)", "Label 2 (Ben)", "Label 3 (Sahil)"]
+
+
+# ---------------------------
+# Declarations
+# ---------------------------
+@dataclass(frozen=True)
+class Artifact:
+    """A file a stage reads or writes. `table` artifacts are passed on as Arrow."""
+    name: str
+    path: Path
+    kind: str = "table"   # table | file
+    glob: Optional[str] = None   # set for a directory of tables matched by pattern
+
+    def files(self) -> List[Path]:
+        if self.glob:
+            return glob_tables(self.path, self.glob)
+        return [self.path]
+
+
+@dataclass
+class Stage:
+    name: str
+    cmd: List[str]           # run from src/ with this interpreter; {artifact} placeholders
+    inputs: List[str]
+    outputs: List[str]
+    code: List[str]          # source files (relative to src/) that define the stage
+    config: List[str] = field(default_factory=list)   # names read from config.py
+
+
+def _rel(path: Path) -> str:
+    return os.path.relpath(path, config.BASE_DIR)
+
+
+def default_dag():
+    """Artifacts and stages for the current config."""
+    raw = config.BASE_DIR / "data" / "raw"
+    art = [
+        Artifact("xlsx", raw / "food_delivery_apps.xlsx", "file"),
+        Artifact("source", raw / "food_delivery_apps.parquet"),
+        Artifact("manual", config.DATA_DIR / "reviews_manual_1000.csv"),
+        Artifact("llm", config.DATA_DIR / "reviews_llm_15000.csv"),
+        Artifact("annotated", raw / "reviews_manual_1000_labeled.csv", "file"),
+        Artifact("gold", config.DATA_DIR / "reviews_manual_1000_gold.csv"),
+        Artifact("all_labels", config.OUTPUT_DIR, glob="labels_*"),
+        Artifact("summary", config.OUTPUT_DIR / "benchmark_results_summary.csv"),
+        Artifact("per_class", config.OUTPUT_DIR / "benchmark_results_per_class.csv"),
+    ]
+    label_names = []
+    for m in config.MODELS:
+        tag = f"{m['vendor']}_{m['name']}"
+        art.append(Artifact(f"labels_{tag}", config.OUTPUT_DIR / f"labels_{tag}.csv"))
+        art.append(Artifact(f"evaluation_{tag}", config.OUTPUT_DIR / f"evaluation_{tag}.csv"))
+        label_names.append(tag)
+
+    stages = [
+        Stage("convert", ["data_cleaner.py", "convert", "--src", "{xlsx}", "--out", "{source}"],
+              ["xlsx"], ["source"], ["data_cleaner.py", "storage.py"]),
+        Stage("sample", ["data_cleaner.py", "clean", "--src", "{source}", "--out-dir", str(config.DATA_DIR)],
+              ["source"], ["manual", "llm"], ["data_cleaner.py", "storage.py"]),
+        Stage("gold", ["benchmark/generate_gold_labels.py", "--csv", "{annotated}", "--cols", *ANNOTATOR_COLS,
+                       "--out", "{gold}"],
+              ["annotated"], ["gold"], ["benchmark/generate_gold_labels.py"]),
+        Stage("label", ["main_label_reviews.py", "--data", "{manual}", "--out-dir", str(config.OUTPUT_DIR),
+                        "--format", "csv"],
+              ["manual"], [f"labels_{t}" for t in label_names],
+              ["main_label_reviews.py", "labeling/runner.py", "prompts.py", "clients/registry.py", "storage.py"],
+              ["MODELS", "TEXT_COL", "LABEL_ORDER", "ALLOWED_LABELS"]),
+        Stage("metrics", ["-m", "benchmark.compute_metrics", "--gold", "{gold}", "--model-dir", "{all_labels}",
+                          "--out-dir", str(config.OUTPUT_DIR), "--format", "csv"],
+              ["gold", "all_labels"] + [f"labels_{t}" for t in label_names], ["summary", "per_class"],
+              ["benchmark/compute_metrics.py", "benchmark/bootstrap.py", "evaluate_predictions.py", "storage.py"],
+              ["ALLOWED_LABELS", "LABEL_ORDER"]),
+    ]
+    for tag in label_names:
+        stages.append(Stage(
+            f"evaluate_{tag}",
+            ["evaluate_predictions.py", "--gold", "{gold}", "--pred", f"{{labels_{tag}}}",
+             "--pred-col", f"{tag}_labels", "--out", f"{{evaluation_{tag}}}"],
+            ["gold", f"labels_{tag}"], [f"evaluation_{tag}"],
+            ["evaluate_predictions.py", "benchmark/krippendorff_alpha.py", "storage.py"],
+        ))
+    return {a.name: a for a in art}, {s.name: s for s in stages}
+
+
+# ---------------------------
+# Runner
+# ---------------------------
+class Pipeline:
+    def __init__(self, artifacts: Dict[str, Artifact], stages: Dict[str, Stage], state_path: Path = STATE_PATH):
+        self.artifacts = artifacts
+        self.stages = stages
+        self.state_path = state_path
+        self.state = self._load_state()
+        self.producer = {out: s.name for s in stages.values() for out in s.outputs}
+        for s in stages.values():
+            for name in s.inputs:
+                if name not in self.artifacts:
+                    raise KeyError(f"Stage {s.name} reads unknown artifact {name}")
+
+    def _load_state(self) -> dict:
+        if self.state_path.exists():
+            with open(self.state_path, encoding="utf-8") as fh:
+                return json.load(fh)
+        return {"stages": {}, "arrow": {}}
+
+    def save_state(self):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(self.state, fh, indent=2)
+        os.replace(tmp, self.state_path)
+
+    # ----- graph -----
+    def sinks(self) -> List[str]:
+        """Stages nothing else depends on: the default targets."""
+        used = {u for s in self.stages.values() for u in self.upstream(s)}
+        return [n for n in self.stages if n not in used]
+
+    def upstream(self, stage: Stage) -> List[str]:
+        return sorted({self.producer[i] for i in stage.inputs if i in self.producer} - {stage.name})
+
+    def closure(self, targets: List[str]) -> List[str]:
+        """Targets plus everything upstream, in topological order."""
+        order, seen = [], set()
+
+        def visit(name):
+            if name in seen:
+                return
+            seen.add(name)
+            for up in self.upstream(self.stages[name]):
+                visit(up)
+            order.append(name)
+
+        for t in targets:
+            visit(t)
+        return order
+
+    # ----- fingerprints -----
+    def _digests(self, names: List[str]) -> Dict[str, Optional[str]]:
+        out = {}
+        for name in names:
+            for f in self.artifacts[name].files():
+                out[_rel(f)] = file_digest(f) if f.exists() else None
+        return out
+
+    def fingerprint(self, stage: Stage) -> str:
+        h = hashlib.sha256()
+        # repo-relative, so moving the checkout doesn't invalidate every stage
+        h.update(json.dumps(stage.cmd).replace(str(config.BASE_DIR), "<base>").encode())
+        for rel in stage.code:
+            h.update(rel.encode())
+            h.update(file_digest(SRC_DIR / rel).encode())
+        for name in stage.config:
+            h.update(f"{name}={getattr(config, name)!r}".encode())
+        h.update(json.dumps(self._digests(stage.inputs), sort_keys=True).encode())
+        return h.hexdigest()
+
+    def own_status(self, stage: Stage) -> str:
+        """fresh | adopt | never | stale:<reason>, ignoring upstream stages."""
+        outs = self._digests(stage.outputs)
+        have_all = all(d is not None for d in outs.values()) and outs
+        rec = self.state["stages"].get(stage.name)
+        if rec is None:
+            return "adopt" if have_all else "never"
+        if not have_all:
+            return "stale:output missing"
+        if rec["outputs"] != outs:
+            return "stale:output changed"
+        if rec["fingerprint"] != self.fingerprint(stage):
+            return "stale:code/config/input changed"
+        return "fresh"
+
+    def plan(self, targets: List[str], force: List[str] = ()) -> Dict[str, str]:
+        """Stage -> reason it will run, for the targets and whatever they need."""
+        order = self.closure(targets)
+        status = {n: ("stale:forced" if n in force else self.own_status(self.stages[n])) for n in order}
+        run: Dict[str, str] = {}
+        changed = True
+        while changed:
+            changed = False
+            for n in order:
+                if n in run:
+                    continue
+                st = status[n]
+                ups = self.upstream(self.stages[n])
+                reason = None
+                if st.startswith("stale:"):
+                    reason = st[len("stale:"):]
+                elif any(u in run for u in ups):
+                    reason = "upstream reruns"
+                elif st == "never":
+                    # only built when a target or a rerunning stage downstream needs it
+                    downstream = [d for d in order if n in self.upstream(self.stages[d])]
+                    if n in targets or any(d in run for d in downstream):
+                        reason = "never built"
+                if reason:
+                    run[n] = reason
+                    changed = True
+        return run
+
+    # ----- arrow hand-off -----
+    def _arrow_copy(self, src: Path, dst: Path) -> Path:
+        digest = file_digest(src)
+        key = _rel(src)
+        if self.state["arrow"].get(key) != digest or not dst.exists():
+            write_table(read_table(src), dst)
+            self.state["arrow"][key] = digest
+        return dst
+
+    def resolve(self, name: str) -> Path:
+        """Path handed to a stage for an input: an Arrow copy for tables, else the file itself."""
+        a = self.artifacts[name]
+        if a.kind != "table":
+            return a.path
+        if a.glob:
+            out_dir = ARTIFACT_DIR / _rel(a.path)
+            out_dir.mkdir(parents=True, exist_ok=True)
+            keep = set()
+            for f in a.files():
+                keep.add(self._arrow_copy(f, out_dir / f"{f.stem}.arrow"))
+            for stale in out_dir.glob(f"{a.glob}.arrow"):
+                if stale not in keep:
+                    stale.unlink()
+            return out_dir
+        if not a.path.exists() or a.path.suffix.lower() not in CSV_SUFFIXES:
+            return a.path
+        return self._arrow_copy(a.path, (ARTIFACT_DIR / _rel(a.path)).with_suffix(".arrow"))
+
+    def command(self, stage: Stage) -> List[str]:
+        outputs = set(stage.outputs)
+
+        def sub(m):
+            name = m.group(1)
+            # outputs are written where declared; inputs may be swapped for Arrow copies
+            return str(self.artifacts[name].path if name in outputs else self.resolve(name))
+
+        return [sys.executable] + [re.sub(r"\{([^{}]+)\}", sub, part) for part in stage.cmd]
+
+    def record(self, stage: Stage):
+        self.state["stages"][stage.name] = {
+            "fingerprint": self.fingerprint(stage),
+            "outputs": self._digests(stage.outputs),
+            "finished": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+
+    # ----- execution -----
+    def run_stage(self, stage: Stage, cmd: List[str]) -> int:
+        t0 = time.time()
+        log = PIPELINE_DIR / "logs" / f"{stage.name}.log"
+        log.parent.mkdir(parents=True, exist_ok=True)
+        with open(log, "w", encoding="utf-8") as fh, span("pipeline.stage", stage=stage.name):
+            code = subprocess.run(cmd, cwd=SRC_DIR, stdout=fh, stderr=subprocess.STDOUT).returncode
+        print(f"[{stage.name}] {'done' if code == 0 else f'FAILED ({code})'} in {time.time() - t0:.1f}s (log: {_rel(log)})")
+        return code
+
+    def run(self, targets: List[str], force: List[str] = (), jobs: int = 2, dry_run: bool = False) -> bool:
+        order = self.closure(targets)
+        todo = self.plan(targets, force)
+        for n in order:
+            if n in todo:
+                print(f"  run   {n:40s} ({todo[n]})")
+            elif self.own_status(self.stages[n]) == "adopt":
+                print(f"  adopt {n:40s} (existing outputs)")
+            elif self.own_status(self.stages[n]) == "never":
+                print(f"  idle  {n:40s} (never built, not needed)")
+            else:
+                print(f"  skip  {n:40s} (up to date)")
+        if dry_run:
+            return True
+
+        for n in order:
+            if n not in todo and self.own_status(self.stages[n]) == "adopt":
+                self.record(self.stages[n])
+        self.save_state()
+
+        done, failed, running = set(), set(), {}
+        with ThreadPoolExecutor(max_workers=jobs) as ex:
+            while True:
+                for n in order:
+                    if n not in todo or n in done or n in failed or n in running.values():
+                        continue
+                    ups = [u for u in self.upstream(self.stages[n]) if u in todo]
+                    if any(u in failed for u in ups):
+                        print(f"[{n}] blocked by failed upstream")
+                        failed.add(n)
+                    elif all(u in done for u in ups) and len(running) < jobs:
+                        print(f"[{n}] starting")
+                        # resolve Arrow inputs on this thread so state writes stay single-threaded
+                        cmd = self.command(self.stages[n])
+                        running[ex.submit(self.run_stage, self.stages[n], cmd)] = n
+                if not running:
+                    break
+                finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    n = running.pop(fut)
+                    if fut.result() == 0:
+                        self.record(self.stages[n])
+                        self.save_state()
+                        done.add(n)
+                    else:
+                        failed.add(n)
+        if failed:
+            print(f"\nFailed or blocked: {', '.join(sorted(failed))}")
+        return not failed
+
+
+def main():
+    artifacts, stages = default_dag()
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = p.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("run", help="Run out-of-date stages")
+    r.add_argument("targets", nargs="*",
+                   help=f"Stages to bring up to date (default: the final reports). One of: {', '.join(stages)}")
+    r.add_argument("--force", nargs="+", default=[], help="Rerun these stages even if up to date")
+    r.add_argument("--jobs", type=int, default=2, help="Stages run at once")
+    r.add_argument("--dry-run", action="store_true")
+    tracing.add_arguments(r)
+    sub.add_parser("status", help="Show what `run` would do")
+    args = p.parse_args()
+
+    pipe = Pipeline(artifacts, stages)
+    if args.cmd == "status":
+        pipe.run(pipe.sinks(), dry_run=True)
+        return
+    unknown = set(args.targets) - set(stages) | set(args.force) - set(stages)
+    if unknown:
+        p.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+    targets = args.targets or pipe.sinks()
+    tracing.enable_from_args(args)   # stage subprocesses inherit it and trace into the same directory
+    ok = pipe.run(targets, args.force, args.jobs, args.dry_run)
+    tracing.print_report()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Table I/O shared by the labeling and benchmark scripts.
+
+Datasets and label outputs are stored as Parquet by default: review text is
+parsed once, label columns are dictionary-encoded over LABEL_ORDER, and reads
+are memory-mapped. CSV (and Arrow IPC / Feather) are still read and written,
+so `--format csv` or `export_csv()` give a spreadsheet-friendly copy.
+"""
+import hashlib
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+from config import LABEL_ORDER
+from tracing import span
+
+PathLike = Union[str, Path]
+
+PARQUET_SUFFIXES = {".parquet", ".pq"}
+ARROW_SUFFIXES = {".arrow", ".feather", ".ipc"}
+CSV_SUFFIXES = {".csv"}
+
+# Search order when the same table exists in several formats
+FORMAT_SUFFIXES = [".parquet", ".arrow", ".feather", ".csv"]
+
+
+def review_id(text) -> str:
+    """Stable ID for a review: first 16 hex chars of the SHA-1 of its stripped text."""
+    s = "" if text is None or (isinstance(text, float) and text != text) else str(text)
+    return hashlib.sha1(s.strip().encode("utf-8")).hexdigest()[:16]
+
+
+def review_ids(texts: Iterable) -> List[str]:
+    return [review_id(t) for t in texts]
+
+
+def shard_of(text, n_shards: int) -> int:
+    """Shard a review belongs to; depends only on its text, so every node agrees."""
+    return int(review_id(text), 16) % n_shards
+
+
+def is_label_column(col: str) -> bool:
+    return col.endswith("_labels") or col == "gold_label"
+
+
+def to_label_category(s: pd.Series) -> pd.Series:
+    """Dictionary-encode a label column over LABEL_ORDER.
+
+    Off-schema strings (raw model output that never got normalized) are kept
+    as extra categories after LABEL_ORDER rather than silently dropped.
+    """
+    if isinstance(s.dtype, pd.CategoricalDtype) and list(s.cat.categories[: len(LABEL_ORDER)]) == LABEL_ORDER:
+        return s
+    values = s.astype("string").str.strip()
+    extras = sorted(set(values.dropna().unique()) - set(LABEL_ORDER))
+    return pd.Series(
+        pd.Categorical(values, categories=LABEL_ORDER + extras),
+        index=s.index,
+        name=s.name,
+    )
+
+
+def _encode_labels(df: pd.DataFrame) -> pd.DataFrame:
+    label_cols = [c for c in df.columns if is_label_column(c)]
+    if not label_cols:
+        return df
+    df = df.copy()
+    for c in label_cols:
+        df[c] = to_label_category(df[c])
+    return df
+
+
+def read_table(path: PathLike, columns: Optional[List[str]] = None, memory_map: bool = True) -> pd.DataFrame:
+    """Read a Parquet / Arrow / CSV table into pandas, picking the reader by suffix."""
+    path = Path(path)
+    with span("storage.read", path=path.name):
+        return _read_table(path, columns, memory_map)
+
+
+def _read_table(path: Path, columns: Optional[List[str]], memory_map: bool) -> pd.DataFrame:
+    suffix = path.suffix.lower()
+    if suffix in PARQUET_SUFFIXES:
+        table = pq.read_table(path, columns=columns, memory_map=memory_map)
+        return table.to_pandas()
+    if suffix in ARROW_SUFFIXES:
+        table = feather.read_table(path, columns=columns, memory_map=memory_map)
+        return table.to_pandas()
+    if suffix in CSV_SUFFIXES:
+        # utf-8-sig: some of the processed CSVs were saved from Excel with a BOM
+        return pd.read_csv(path, usecols=columns, encoding="utf-8-sig")
+    raise ValueError(f"Unsupported table format: {path}")
+
+
+def iter_table(path: PathLike, columns: Optional[List[str]] = None, chunksize: int = 100_000) -> Iterator[pd.DataFrame]:
+    """Read a table in chunks of at most `chunksize` rows (Parquet row batches, mmapped Arrow, CSV chunks)."""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix in PARQUET_SUFFIXES:
+        for batch in pq.ParquetFile(path, memory_map=True).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    elif suffix in ARROW_SUFFIXES:
+        table = feather.read_table(path, columns=columns, memory_map=True)
+        for batch in table.to_batches(max_chunksize=chunksize):
+            yield batch.to_pandas()
+    elif suffix in CSV_SUFFIXES:
+        yield from pd.read_csv(path, usecols=columns, encoding="utf-8-sig", chunksize=chunksize)
+    else:
+        raise ValueError(f"Unsupported table format: {path}")
+
+
+def write_table(df: pd.DataFrame, path: PathLike) -> Path:
+    """Write `df` in the format implied by the suffix of `path`."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with span("storage.write", path=path.name, rows=len(df)):
+        return _write_table(df, path)
+
+
+def _write_table(df: pd.DataFrame, path: Path) -> Path:
+    suffix = path.suffix.lower()
+    if suffix in CSV_SUFFIXES:
+        df.to_csv(path, index=False)
+        return path
+
+    table = pa.Table.from_pandas(_encode_labels(df), preserve_index=False)
+    if suffix in PARQUET_SUFFIXES:
+        pq.write_table(table, path, compression="zstd")
+    elif suffix in ARROW_SUFFIXES:
+        feather.write_feather(table, path, compression="uncompressed")  # uncompressed so reads can be mmapped
+    else:
+        raise ValueError(f"Unsupported table format: {path}")
+    return path
+
+
+def with_format(path: PathLike, fmt: str) -> Path:
+    """Swap the suffix of `path` for the given format name ("parquet", "csv", ...)."""
+    return Path(path).with_suffix(f".{fmt.lstrip('.')}")
+
+
+def resolve_table(path: PathLike) -> Path:
+    """Return `path`, or a sibling with the same stem in a preferred format.
+
+    Lets callers keep pointing at e.g. `reviews_manual_1000.csv` while a
+    Parquet copy next to it is picked up automatically.
+    """
+    path = Path(path)
+    for suffix in FORMAT_SUFFIXES:
+        cand = path.with_suffix(suffix)
+        if cand.exists():
+            return cand
+    return path
+
+
+def glob_tables(directory: PathLike, pattern: str) -> List[Path]:
+    """Glob `pattern` (without suffix) in any supported format, one path per stem."""
+    by_stem = {}
+    for suffix in reversed(FORMAT_SUFFIXES):
+        for p in Path(directory).glob(f"{pattern}{suffix}"):
+            by_stem[p.stem] = p
+    return [by_stem[s] for s in sorted(by_stem)]
+
+
+def export_csv(paths: Iterable[PathLike]) -> List[Path]:
+    """Write a CSV copy next to each Parquet / Arrow table."""
+    written = []
+    for p in paths:
+        p = Path(p)
+        if p.suffix.lower() in CSV_SUFFIXES:
+            continue
+        written.append(write_table(read_table(p), p.with_suffix(".csv")))
+    return written
+
+
+def main():
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Convert tables between Parquet, Arrow and CSV.")
+    ap.add_argument("paths", nargs="+", type=Path, help="Input tables")
+    ap.add_argument("--to", choices=["parquet", "arrow", "csv"], default="parquet")
+    args = ap.parse_args()
+
+    for p in args.paths:
+        out = write_table(read_table(p), with_format(p, args.to))
+        print(f"Wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Offline input-token counts for rendered prompts (see prompts.render).
+
+Each vendor is counted with the tokenizer it bills by, run locally:
+
+    openai     tiktoken (the model's encoding, o200k_base for unknown models)
+               plus the chat framing: 3 tokens per message and 3 for the reply
+    fireworks  DeepSeek's tokenizer (Hugging Face `tokenizers`) over the chat template
+    google     Vertex AI's local Gemini tokenizer (`vertexai.preview.tokenization`)
+
+Anthropic and xAI publish no offline tokenizer for current models, and a
+missing optional package (or a model the tokenizer does not know) has the
+same effect: the count falls back to len(text) / CHARS_PER_TOKEN and is
+returned with exact=False. The tokenizers download their vocabularies on
+first use and are cached afterwards.
+
+Usage (from `src/`):
+    python token_counts.py --vendor openai --model gpt-4.1-mini --variant compact
+"""
+import argparse
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+from prompts import DEFAULT_VARIANT, PROMPT_VARIANTS, render
+
+CHARS_PER_TOKEN = 4
+CHAT_TOKENS_PER_MESSAGE = 3
+CHAT_REPLY_PRIMING = 3
+
+DEEPSEEK_TOKENIZERS = {"deepseek-chat": "deepseek-ai/DeepSeek-V3"}
+DEEPSEEK_TEMPLATE = "<｜begin▁of▁sentence｜>{system}<｜User｜>{user}<｜Assistant｜>"
+
+_warned = set()
+
+
+@dataclass(frozen=True)
+class TokenCount:
+    tokens: int
+    exact: bool
+    tokenizer: str
+
+
+def _fallback(vendor: str, reason: str):
+    if (vendor, reason) not in _warned:
+        _warned.add((vendor, reason))
+        print(f"[tokens] {vendor}: {reason}; estimating {CHARS_PER_TOKEN} chars/token")
+
+
+def _text_of(rendered: dict) -> str:
+    parts = [rendered.get("system") or rendered.get("system_instruction") or ""]
+    parts += [m["content"] for m in rendered.get("messages", [])]
+    parts += [rendered.get("contents") or "", rendered.get("input") or ""]
+    return "\n\n".join(p for p in parts if p)
+
+
+def _estimate(rendered: dict) -> TokenCount:
+    return TokenCount(round(len(_text_of(rendered)) / CHARS_PER_TOKEN), False, "estimate")
+
+
+def _tiktoken(model: str):
+    import tiktoken
+
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def _deepseek(model: str):
+    from tokenizers import Tokenizer
+
+    return Tokenizer.from_pretrained(DEEPSEEK_TOKENIZERS.get(model, DEEPSEEK_TOKENIZERS["deepseek-chat"]))
+
+
+def _gemini(model: str):
+    from vertexai.preview import tokenization
+
+    return tokenization.get_tokenizer_for_model(model)
+
+
+LOADERS = {"openai": _tiktoken, "fireworks": _deepseek, "google": _gemini}
+
+
+@lru_cache(maxsize=None)
+def load_tokenizer(vendor: str, model: str):
+    """The vendor's offline tokenizer for `model`, or None (reason printed once) if unavailable."""
+    loader = LOADERS.get(vendor)
+    if loader is None:
+        _fallback(vendor, "no offline tokenizer")
+        return None
+    try:
+        return loader(model)
+    except ImportError as e:
+        _fallback(vendor, f"{e.name} not installed")
+    except Exception as e:   # unknown model, vocabulary not cached and no network, ...
+        _fallback(vendor, f"tokenizer for {model} unavailable ({type(e).__name__})")
+    return None
+
+
+def count_rendered(vendor: str, model: str, rendered: dict) -> TokenCount:
+    """Input tokens of one rendered request."""
+    tok = load_tokenizer(vendor, model)
+    if tok is None:
+        return _estimate(rendered)
+    if vendor == "openai":
+        n = sum(CHAT_TOKENS_PER_MESSAGE + len(tok.encode(m["content"])) for m in rendered["messages"])
+        return TokenCount(n + CHAT_REPLY_PRIMING, True, f"tiktoken:{tok.name}")
+    if vendor == "fireworks":
+        system, user = (m["content"] for m in rendered["messages"])
+        text = DEEPSEEK_TEMPLATE.format(system=system, user=user)
+        return TokenCount(len(tok.encode(text, add_special_tokens=False).ids), True, "hf:deepseek")
+    result = tok.count_tokens(rendered["contents"], system_instruction=rendered["system_instruction"])
+    return TokenCount(result.total_tokens, True, f"vertexai:{model}")
+
+
+def count_prompt_tokens(vendor: str, model: str, review: str, variant: str = DEFAULT_VARIANT) -> TokenCount:
+    return count_rendered(vendor, model, render(vendor, review, variant))
+
+
+def count_many(vendor: str, model: str, reviews: Iterable[str], variant: str = DEFAULT_VARIANT) -> List[TokenCount]:
+    return [count_prompt_tokens(vendor, model, r, variant) for r in reviews]
+
+
+def main(argv: Optional[List[str]] = None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--vendor", required=True)
+    p.add_argument("--model", required=True)
+    p.add_argument("--variant", choices=sorted(PROMPT_VARIANTS), default=DEFAULT_VARIANT)
+    p.add_argument("--review", default="The driver never showed up and support was useless.")
+    args = p.parse_args(argv)
+
+    c = count_prompt_tokens(args.vendor, args.model, args.review, args.variant)
+    print(f"{args.vendor}/{args.model} [{args.variant}]: {c.tokens} input tokens "
+          f"({c.tokenizer if c.exact else 'estimate'})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""Opt-in trace spans, a sampling profiler and a per-stage time report.
+
+Code marks its stages with spans:
+
+    from tracing import span
+    with span("storage.write", path=str(path)):
+        ...
+
+Tracing is off unless enabled with `--trace DIR` (main_label_reviews,
+labeling.scheduler, pipeline) or the LABELER_TRACE_DIR environment
+variable. While it is off, `span()` is one global check that returns a
+shared no-op context manager (a few hundred ns per span, against API calls
+of hundreds of ms), so spans can stay in production code.
+
+Once enabled, each process writes to the trace directory when it exits:
+
+    trace-<pid>.json     every span as Chrome trace events (open in ui.perfetto.dev)
+    stages-<pid>.json    per-stage calls, total and self time
+    profile-<pid>.folded with --profile: sampled stacks in folded format, each
+                         prefixed by the spans active in that thread, for
+                         flamegraph.pl or speedscope.app
+
+Child processes (shard relaunches, pipeline stages) inherit the environment
+variables, so they trace into the same directory. `report` merges the
+stages files of all of them into one breakdown. Self time is a span's time
+minus its child spans, so the rows add up to the traced wall time.
+
+Usage (from `src/`):
+    python main_label_reviews.py --trace ../outputs/trace --profile
+    python tracing.py report ../outputs/trace
+"""
+import argparse
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+from functools import wraps
+from pathlib import Path
+from typing import Dict, List, Optional
+
+TRACE_ENV = "LABELER_TRACE_DIR"
+PROFILE_ENV = "LABELER_PROFILE_INTERVAL"
+MAX_EVENTS = 1_000_000   # raw events kept for the Chrome trace; stage totals are always exact
+
+_NOOP = nullcontext()
+_enabled = False
+_trace_dir: Optional[Path] = None
+_sampler = None
+_t0 = time.perf_counter_ns()
+_lock = threading.Lock()
+_events: List[tuple] = []
+_stages: Dict[str, List[float]] = {}   # name -> [calls, total_ns, self_ns, max_ns]
+_stacks: Dict[int, list] = {}          # thread id -> open spans (read by the sampler)
+
+
+class _Span:
+    __slots__ = ("name", "attrs", "start", "child")
+
+    def __init__(self, name: str, attrs: dict):
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        _stacks.setdefault(threading.get_ident(), []).append(self)
+        self.child = 0
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        dur = time.perf_counter_ns() - self.start
+        tid = threading.get_ident()
+        stack = _stacks[tid]
+        stack.pop()
+        if stack:
+            stack[-1].child += dur
+        with _lock:
+            s = _stages.get(self.name)
+            if s is None:
+                s = _stages[self.name] = [0, 0, 0, 0]
+            s[0] += 1
+            s[1] += dur
+            s[2] += dur - self.child
+            s[3] = max(s[3], dur)
+            if len(_events) < MAX_EVENTS:
+                _events.append((self.name, self.start - _t0, dur, tid, self.attrs))
+        return False
+
+
+def span(name: str, **attrs):
+    """Context manager timing one stage; a shared no-op while tracing is off."""
+    if not _enabled:
+        return _NOOP
+    return _Span(name, attrs)
+
+
+def traced(name: Optional[str] = None):
+    """Decorator form of span(); the name defaults to the function's qualified name."""
+    def deco(fn):
+        label = name or fn.__qualname__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Span(label, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+class Sampler(threading.Thread):
+    """Samples every other thread's Python stack each `interval` seconds."""
+
+    def __init__(self, interval: float):
+        super().__init__(name="trace-sampler", daemon=True)
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self.halt = threading.Event()
+
+    def run(self):
+        while not self.halt.wait(self.interval):
+            for tid, frame in sys._current_frames().items():
+                if tid == self.ident:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                spans = [f"[{s.name}]" for s in list(_stacks.get(tid, ()))]
+                self.counts[";".join(spans + frames[::-1])] += 1
+
+    def write(self, path: Path):
+        self.halt.set()
+        self.join(timeout=1.0)
+        with open(path, "w", encoding="utf-8") as fh:
+            for stack, n in self.counts.most_common():
+                fh.write(f"{stack} {n}\n")
+
+
+def enable(trace_dir, profile_interval: Optional[float] = None):
+    """Start tracing (and sampling) in this process and in child processes started after this."""
+    global _enabled, _trace_dir, _sampler
+    _trace_dir = Path(trace_dir)
+    _trace_dir.mkdir(parents=True, exist_ok=True)
+    os.environ[TRACE_ENV] = str(_trace_dir.resolve())
+    if profile_interval:
+        os.environ[PROFILE_ENV] = str(profile_interval)
+        if _sampler is None:
+            _sampler = Sampler(profile_interval)
+            _sampler.start()
+    if not _enabled:
+        _enabled = True
+        atexit.register(flush)
+
+
+def flush():
+    """Write this process's trace, stage totals and profile to the trace directory."""
+    if not _enabled or _trace_dir is None:
+        return
+    pid = os.getpid()
+    with _lock:
+        events = list(_events)
+        stages = {k: list(v) for k, v in _stages.items()}
+    trace = [
+        {"name": name, "ph": "X", "ts": start / 1e3, "dur": dur / 1e3, "pid": pid, "tid": tid,
+         "args": {k: str(v) for k, v in attrs.items()}}
+        for name, start, dur, tid, attrs in events
+    ]
+    with open(_trace_dir / f"trace-{pid}.json", "w", encoding="utf-8") as fh:
+        json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, fh)
+    with open(_trace_dir / f"stages-{pid}.json", "w", encoding="utf-8") as fh:
+        json.dump({"argv": sys.argv, "wall_ns": time.perf_counter_ns() - _t0, "stages": stages}, fh)
+    if _sampler is not None:
+        _sampler.write(_trace_dir / f"profile-{pid}.folded")
+
+
+def load_stages(trace_dir) -> Dict[str, List[float]]:
+    """Stage totals summed over every process that traced into `trace_dir`."""
+    merged: Dict[str, List[float]] = {}
+    for path in sorted(Path(trace_dir).glob("stages-*.json")):
+        with open(path, encoding="utf-8") as fh:
+            for name, (calls, total, self_ns, max_ns) in json.load(fh)["stages"].items():
+                m = merged.setdefault(name, [0, 0, 0, 0])
+                m[0] += calls
+                m[1] += total
+                m[2] += self_ns
+                m[3] = max(m[3], max_ns)
+    return merged
+
+
+def format_report(stages: Dict[str, List[float]]) -> str:
+    traced_ns = sum(s[2] for s in stages.values()) or 1
+    lines = [f"{'stage':32s} {'calls':>9s} {'total s':>10s} {'self s':>10s} {'self %':>7s} "
+             f"{'mean ms':>9s} {'max ms':>9s}"]
+    for name, (calls, total, self_ns, max_ns) in sorted(stages.items(), key=lambda kv: -kv[1][2]):
+        lines.append(f"{name:32s} {calls:9.0f} {total / 1e9:10.3f} {self_ns / 1e9:10.3f} "
+                     f"{self_ns / traced_ns:7.1%} {total / calls / 1e6:9.3f} {max_ns / 1e6:9.3f}")
+    return "\n".join(lines)
+
+
+def add_arguments(p: argparse.ArgumentParser):
+    """The --trace / --profile flags shared by the entry points."""
+    p.add_argument("--trace", type=Path, default=None,
+                   help="Record stage spans into this directory (see tracing.py)")
+    p.add_argument("--profile", type=float, nargs="?", const=0.005, default=None, metavar="INTERVAL",
+                   help="With --trace: also sample stacks every INTERVAL seconds (default 0.005)")
+
+
+def enable_from_args(args):
+    if args.trace:
+        enable(args.trace, args.profile)
+
+
+def print_report():
+    """Print this process's per-stage breakdown (no-op while tracing is off)."""
+    if not _enabled:
+        return
+    with _lock:
+        stages = {k: list(v) for k, v in _stages.items()}
+    if stages:
+        print("\nTrace: per-stage time in this process (all processes: python tracing.py report "
+              f"{_trace_dir})\n" + format_report(stages))
+
+
+# children started with LABELER_TRACE_DIR set trace into the same directory
+if os.environ.get(TRACE_ENV):
+    enable(os.environ[TRACE_ENV], float(os.environ[PROFILE_ENV]) if os.environ.get(PROFILE_ENV) else None)
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = p.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("report", help="Per-stage time breakdown of a trace directory")
+    r.add_argument("trace_dir", type=Path)
+    args = p.parse_args()
+
+    stages = load_stages(args.trace_dir)
+    if not stages:
+        raise SystemExit(f"No stages-*.json in {args.trace_dir}")
+    print(format_report(stages))
+
+
+if __name__ == "__main__":
+    main()
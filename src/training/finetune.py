@@ -0,0 +1,243 @@
+"""Fine-tune a RoBERTa classifier on the LLM-labeled training set (CPU friendly).
+
+Texts are tokenized ONCE into a memory-mapped cache (flat token array plus
+row offsets) keyed by the data file, tokenizer and max length, so retraining
+after a relabel only re-tokenizes when the text actually changed. Batches
+are drawn from length buckets and padded dynamically to the longest row in
+the batch, gradients are accumulated to reach the effective batch size, and
+torch runs on all CPU threads. After training, the model is scored on the
+gold holdout with the same metrics as evaluate_predictions.py and its
+per-class probabilities are saved for AUC.
+
+Requires `torch` and `transformers`.
+
+Usage (from `src/`):
+    python -m training.finetune
+    python -m training.finetune --model distilroberta-base --epochs 2 --threads 8
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import time
+from pathlib import Path
+from typing import Iterator, List
+
+import numpy as np
+
+from benchmark.compute_metrics import GOLD_COL, GOLD_PATH, clean_label, find_pred_col, normalize_label_column
+from config import BASE_DIR, LABEL_ORDER, OUTPUT_DIR, TEXT_COL
+from evaluate_predictions import evaluate_many
+from storage import read_table, resolve_table, write_table
+
+TRAIN_PATH = OUTPUT_DIR / "final_trainingset_gemini-2.0-flash.csv"
+CACHE_DIR = BASE_DIR / "cache" / "tokenized"
+MODEL_DIR = BASE_DIR / "models"
+
+LABEL2ID = {lbl: i for i, lbl in enumerate(LABEL_ORDER)}
+
+
+# ---------------------------
+# Tokenized cache
+# ---------------------------
+def _cache_key(texts: List[str], tokenizer_name: str, max_len: int) -> str:
+    h = hashlib.sha256(f"{tokenizer_name}|{max_len}|".encode("utf-8"))
+    for t in texts:
+        h.update(t.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()[:20]
+
+
+def tokenize_cached(texts: List[str], tokenizer, tokenizer_name: str, max_len: int, cache_dir: Path = CACHE_DIR):
+    """Return memory-mapped (token_ids, offsets); tokenizes only on a cache miss."""
+    d = cache_dir / _cache_key(texts, tokenizer_name, max_len)
+    if not (d / "meta.json").exists():
+        d.mkdir(parents=True, exist_ok=True)
+        ids = []
+        for start in range(0, len(texts), 1000):
+            enc = tokenizer(texts[start:start + 1000], truncation=True, max_length=max_len)
+            ids.extend(enc["input_ids"])
+        lengths = np.fromiter((len(x) for x in ids), dtype=np.int64, count=len(ids))
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        flat = np.fromiter((t for x in ids for t in x), dtype=np.int32, count=int(offsets[-1]))
+        np.save(d / "token_ids.npy", flat)
+        np.save(d / "offsets.npy", offsets)
+        with open(d / "meta.json", "w", encoding="utf-8") as fh:
+            json.dump({"tokenizer": tokenizer_name, "max_len": max_len, "n_rows": len(texts)}, fh)
+        print(f"Tokenized {len(texts)} rows into {d}")
+    else:
+        print(f"Using tokenized cache {d}")
+    return np.load(d / "token_ids.npy", mmap_mode="r"), np.load(d / "offsets.npy", mmap_mode="r")
+
+
+# ---------------------------
+# Batching
+# ---------------------------
+def length_bucketed_batches(lengths: np.ndarray, batch_size: int, rng: np.random.Generator,
+                            bucket_mult: int = 50) -> Iterator[np.ndarray]:
+    """Shuffle, sort within windows of batch_size * bucket_mult by length, then shuffle batches.
+
+    Rows in a batch have similar lengths, so dynamic padding wastes little
+    compute, while the order across batches stays random.
+    """
+    idx = rng.permutation(len(lengths))
+    window = batch_size * bucket_mult
+    batches = []
+    for start in range(0, len(idx), window):
+        chunk = idx[start:start + window]
+        chunk = chunk[np.argsort(lengths[chunk], kind="stable")]
+        batches.extend(chunk[i:i + batch_size] for i in range(0, len(chunk), batch_size))
+    for b in rng.permutation(len(batches)):
+        yield batches[b]
+
+
+def collate(token_ids, offsets, rows: np.ndarray, pad_id: int):
+    """Pad the selected rows to the longest one; returns (input_ids, attention_mask) tensors."""
+    import torch
+
+    lens = offsets[rows + 1] - offsets[rows]
+    width = int(lens.max())
+    input_ids = np.full((len(rows), width), pad_id, dtype=np.int64)
+    mask = np.zeros((len(rows), width), dtype=np.int64)
+    for j, (r, n) in enumerate(zip(rows, lens)):
+        input_ids[j, :n] = token_ids[offsets[r]:offsets[r] + n]
+        mask[j, :n] = 1
+    return torch.from_numpy(input_ids), torch.from_numpy(mask)
+
+
+# ---------------------------
+# Train / eval
+# ---------------------------
+def predict_proba(model, token_ids, offsets, pad_id: int, batch_size: int = 64) -> np.ndarray:
+    import torch
+
+    n = len(offsets) - 1
+    lengths = np.diff(offsets)
+    order = np.argsort(lengths, kind="stable")   # length-sorted = minimal padding
+    probs = np.zeros((n, len(LABEL_ORDER)), dtype=np.float32)
+    model.eval()
+    with torch.inference_mode():
+        for start in range(0, n, batch_size):
+            rows = order[start:start + batch_size]
+            input_ids, mask = collate(token_ids, offsets, rows, pad_id)
+            logits = model(input_ids=input_ids, attention_mask=mask).logits
+            probs[rows] = torch.softmax(logits, dim=-1).numpy()
+    return probs
+
+
+def train(args):
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer, get_linear_schedule_with_warmup
+
+    torch.set_num_threads(args.threads)
+    torch.manual_seed(args.seed)
+    rng = np.random.default_rng(args.seed)
+
+    train_df = read_table(resolve_table(args.train))
+    labels = normalize_label_column(train_df[find_pred_col(train_df)])
+    keep = np.array([lbl in LABEL2ID for lbl in labels])
+    texts = train_df[TEXT_COL].astype(str)[keep].tolist()
+    y = np.array([LABEL2ID[lbl] for lbl in labels[keep]], dtype=np.int64)
+    print(f"Training rows: {len(texts)} ({(~keep).sum()} dropped with off-schema labels)")
+
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    token_ids, offsets = tokenize_cached(texts, tokenizer, args.model, args.max_len)
+    lengths = np.diff(offsets)
+
+    model = AutoModelForSequenceClassification.from_pretrained(
+        args.model,
+        num_labels=len(LABEL_ORDER),
+        id2label=dict(enumerate(LABEL_ORDER)),
+        label2id=LABEL2ID,
+    )
+    optimizer = torch.optim.AdamW(model.parameters(), lr=args.lr, weight_decay=0.01)
+    steps_per_epoch = math.ceil(len(texts) / (args.batch_size * args.grad_accum))
+    total_steps = steps_per_epoch * args.epochs
+    scheduler = get_linear_schedule_with_warmup(optimizer, int(0.06 * total_steps), total_steps)
+    y_t = torch.from_numpy(y)
+    pad_id = tokenizer.pad_token_id
+
+    step = 0
+    for epoch in range(args.epochs):
+        model.train()
+        t0 = time.time()
+        running = 0.0
+        optimizer.zero_grad()
+        for i, rows in enumerate(length_bucketed_batches(lengths, args.batch_size, rng)):
+            input_ids, mask = collate(token_ids, offsets, rows, pad_id)
+            out = model(input_ids=input_ids, attention_mask=mask, labels=y_t[rows])
+            (out.loss / args.grad_accum).backward()
+            running += out.loss.item()
+            if (i + 1) % args.grad_accum == 0:
+                torch.nn.utils.clip_grad_norm_(model.parameters(), 1.0)
+                optimizer.step()
+                scheduler.step()
+                optimizer.zero_grad()
+                step += 1
+                if step % args.log_every == 0:
+                    print(f"epoch {epoch + 1} step {step}/{total_steps} "
+                          f"loss {running / (args.grad_accum * args.log_every):.4f} "
+                          f"({time.time() - t0:.0f}s)")
+                    running = 0.0
+        if (i + 1) % args.grad_accum != 0:
+            # flush the last partial accumulation
+            optimizer.step()
+            scheduler.step()
+            optimizer.zero_grad()
+        print(f"epoch {epoch + 1} done in {time.time() - t0:.0f}s")
+
+    out_dir = args.out or MODEL_DIR / f"{Path(args.model).name}-{time.strftime('%Y%m%d%H%M%S')}"
+    model.save_pretrained(out_dir)
+    tokenizer.save_pretrained(out_dir)
+    print(f"Saved model to {out_dir}")
+    return model, tokenizer, out_dir
+
+
+def evaluate_on_gold(model, tokenizer, args, out_dir: Path):
+    gold_df = read_table(resolve_table(args.gold))
+    texts = gold_df[TEXT_COL].astype(str).tolist()
+    token_ids, offsets = tokenize_cached(texts, tokenizer, args.model, args.max_len)
+    probs = predict_proba(model, token_ids, offsets, tokenizer.pad_token_id)
+    pred = [LABEL_ORDER[i] for i in probs.argmax(axis=1)]
+    gold = gold_df[GOLD_COL].apply(clean_label).tolist()
+
+    # evaluate_many orders labels alphabetically; reorder the probability columns to match
+    labels = sorted(set(gold) | set(pred))
+    prob_cols = np.column_stack([
+        probs[:, LABEL2ID[lbl]] if lbl in LABEL2ID else np.zeros(len(pred)) for lbl in labels
+    ])
+    r = evaluate_many(gold, {"finetuned": pred}, {"finetuned": prob_cols})["finetuned"]
+    macro = float(np.mean([r["f1"].get(lbl, 0.0) for lbl in LABEL_ORDER]))
+    print(f"\nGold holdout → Macro F1: {macro:.4f} | MCC: {r['mcc']:.4f} | AUC (OvR): {r['auc']:.4f}")
+
+    preds_df = gold_df[[c for c in ("date", TEXT_COL) if c in gold_df.columns]].copy()
+    preds_df["finetuned_labels"] = pred
+    for j, lbl in enumerate(LABEL_ORDER):
+        preds_df[f"finetuned_prob_{lbl}"] = probs[:, j]
+    path = write_table(preds_df, Path(out_dir) / "gold_predictions.parquet")
+    print(f"Wrote gold predictions to {path}")
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--train", type=Path, default=TRAIN_PATH)
+    p.add_argument("--gold", type=Path, default=GOLD_PATH)
+    p.add_argument("--model", default="roberta-base")
+    p.add_argument("--max-len", type=int, default=128)
+    p.add_argument("--batch-size", type=int, default=16)
+    p.add_argument("--grad-accum", type=int, default=2, help="Micro-batches per optimizer step")
+    p.add_argument("--epochs", type=int, default=3)
+    p.add_argument("--lr", type=float, default=2e-5)
+    p.add_argument("--threads", type=int, default=os.cpu_count() or 1)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--log-every", type=int, default=50)
+    p.add_argument("--out", type=Path, default=None, help="Where to save the fine-tuned model")
+    args = p.parse_args()
+
+    model, tokenizer, out_dir = train(args)
+    evaluate_on_gold(model, tokenizer, args, out_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from data_cleaner import ReservoirSampler, SeenUsers, clean_chunk  # noqa: E402
+
+TEXT = "The driver never showed up and my food arrived two hours late and cold"
+
+
+def reviews(users):
+    return pd.DataFrame({"content": [f"{TEXT} (order {i})" for i in range(len(users))], "userName": users})
+
+
+def test_user_dedupe_spans_chunk_boundaries():
+    users = ["ann", "bob", "ann", "cat", "bob", "dan", None, "cat", None, "eve"]
+    full = reviews(users)
+    seen = SeenUsers()
+    chunked = pd.concat([clean_chunk(full.iloc[lo:lo + 3], seen) for lo in range(0, len(full), 3)])
+
+    expected = clean_chunk(full, SeenUsers())   # one chunk: same as deduplicating the whole table
+    assert chunked["content"].tolist() == expected["content"].tolist()
+    assert chunked["userName"].fillna("<missing>").tolist() == ["ann", "bob", "cat", "dan", "<missing>", "eve"]
+    assert len(seen) == 6
+
+
+def test_seen_users_masks_only_new_names():
+    seen = SeenUsers()
+    assert seen.add_new(pd.Series(["a", "b"])).tolist() == [True, True]
+    assert seen.add_new(pd.Series(["b", "c", "a"])).tolist() == [False, True, False]
+    assert seen.hashes.dtype == np.uint64 and len(seen) == 3
+
+
+@pytest.mark.parametrize("n", [3, 5])
+def test_reservoir_keeps_everything_when_the_stream_is_short(n):
+    sampler = ReservoirSampler(5)
+    sampler.update(pd.DataFrame({"i": range(n)}))
+    assert sorted(sampler.to_frame()["i"]) == list(range(n))
+
+
+def test_reservoir_sample_is_uniform_across_chunks():
+    n, k, runs = 20, 5, 1000
+    counts = np.zeros(n)
+    for seed in range(runs):
+        sampler = ReservoirSampler(k, seed=seed)
+        for lo in range(0, n, 3):   # chunks straddle the point where the reservoir fills
+            sampler.update(pd.DataFrame({"i": range(lo, min(lo + 3, n))}))
+        got = sampler.to_frame()["i"]
+        assert len(got) == k and got.is_unique
+        counts[got] += 1
+    np.testing.assert_allclose(counts / runs, k / n, atol=0.06)
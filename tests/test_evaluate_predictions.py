@@ -0,0 +1,53 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from evaluate_predictions import MetricsAccumulator, evaluate_many, evaluate_one  # noqa: E402
+
+TRUE = ["A", "A", "B", "B", "C", "C", "A", "B"]
+PREDS = {
+    "a": ["A", "A", "B", "C", "C", "C", "A", "B"],
+    "b": ["A", "D", "E", "B", "F", "C", "G", "B"],   # labels the other column never uses
+    "c": ["B", "B", "B", "B", "B", "B", "B", "B"],
+}
+
+
+@pytest.mark.parametrize("col", sorted(PREDS))
+def test_evaluate_many_matches_evaluate_one(col):
+    many = evaluate_many(TRUE, PREDS)[col]
+    one = evaluate_one(TRUE, PREDS[col])
+    assert many["labels"] == one["labels"]
+    assert many["f1_macro"] == pytest.approx(one["f1_macro"])
+    assert many["mcc"] == pytest.approx(one["mcc"])
+    assert many["f1"] == pytest.approx(one["f1"])
+    np.testing.assert_array_equal(many["confusion"], one["confusion"])
+
+
+def test_adding_a_column_does_not_change_another():
+    alone = evaluate_many(TRUE, {"a": PREDS["a"]})["a"]["f1_macro"]
+    assert evaluate_many(TRUE, PREDS)["a"]["f1_macro"] == pytest.approx(alone)
+
+
+@pytest.mark.parametrize("col", sorted(PREDS))
+def test_accumulator_matches_evaluate_one(col):
+    acc = MetricsAccumulator()
+    for lo in range(0, len(TRUE), 3):   # chunked, so labels first appear in different chunks
+        acc.update(TRUE[lo:lo + 3], PREDS[col][lo:lo + 3])
+    got = acc.finalize()
+    want = evaluate_one(TRUE, PREDS[col])
+    assert got["labels"] == want["labels"]
+    assert got["f1_macro"] == pytest.approx(want["f1_macro"])
+    assert got["mcc"] == pytest.approx(want["mcc"])
+    np.testing.assert_array_equal(got["confusion"], want["confusion"])
+
+
+def test_accumulator_ignores_score_only_labels():
+    scores = np.full((len(TRUE), 4), 0.25)
+    acc = MetricsAccumulator().update(TRUE, PREDS["a"], scores, ["A", "B", "C", "Z"])
+    got = acc.finalize()
+    assert "Z" not in got["labels"]
+    assert got["f1_macro"] == pytest.approx(evaluate_one(TRUE, PREDS["a"])["f1_macro"])
@@ -0,0 +1,69 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from benchmark.compute_metrics import GOLD_COL, evaluate_store  # noqa: E402
+from config import TEXT_COL  # noqa: E402
+from label_store import LabelStore  # noqa: E402
+from storage import review_id, write_table  # noqa: E402
+
+TEXTS = ["late again", "wrong burger", "app crashed", "fees too high", "nobody answered"]
+GOLD = ["Delivery Issue", "Order Accuracy", "App Bugs / Payment Issue", "Price / Cost Complaint",
+        "Customer Support Experience"]
+COL = "openai_gpt-4.1-mini_labels"
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = LabelStore(tmp_path / "labels.sqlite")
+    yield s
+    s.close()
+
+
+def test_ingest_file_stores_one_label_per_review(store, tmp_path):
+    path = write_table(pd.DataFrame({TEXT_COL: TEXTS, COL: GOLD}), tmp_path / "labels_openai_gpt-4.1-mini.parquet")
+    assert store.ingest_file(path, run="r1") == "openai/gpt-4.1-mini"
+    got = store.labels("openai", "gpt-4.1-mini")
+    assert got.to_dict() == {review_id(t): lbl for t, lbl in zip(TEXTS, GOLD)}
+    runs = store.runs()
+    assert runs[["vendor", "model", "run", "n_labels"]].values.tolist() == [["openai", "gpt-4.1-mini", "r1", 5]]
+
+
+def test_duplicate_texts_keep_the_last_label(store, capsys):
+    df = pd.DataFrame({TEXT_COL: TEXTS + ["late again", "  late again  "],
+                       COL: GOLD + ["Others", "Price / Cost Complaint"]})
+    assert store.add_labels(df, COL, "openai", "gpt-4.1-mini") == len(TEXTS)
+    assert "2 of 7 rows repeat another row's text; 1 review IDs have conflicting labels" in capsys.readouterr().out
+    assert store.labels("openai", "gpt-4.1-mini")[review_id("late again")] == "Price / Cost Complaint"
+
+
+def test_aligned_joins_reordered_and_partial_files_on_review_id(store):
+    gold = pd.DataFrame({TEXT_COL: TEXTS, GOLD_COL: GOLD})
+    store.add_labels(gold, GOLD_COL, "gold", "manual", prompt_version="-", run="-")
+    shuffled = pd.DataFrame({TEXT_COL: TEXTS[::-1], COL: GOLD[::-1]})
+    store.add_labels(shuffled, COL, "openai", "gpt-4.1-mini")
+    partial = pd.DataFrame({TEXT_COL: TEXTS[1:], "google_gemini-2.0-flash_labels": ["Others"] * 4})
+    store.add_labels(partial, "google_gemini-2.0-flash_labels", "google", "gemini-2.0-flash")
+
+    out = store.aligned()
+    assert list(out.columns) == ["date", "content", GOLD_COL, "google_gemini-2.0-flash_labels", COL]
+    assert len(out) == 4   # only reviews every labeler has
+    assert (out[GOLD_COL] == out[COL]).all()
+    assert out.loc[review_id("wrong burger"), "content"] == "wrong burger"
+
+
+def test_compute_metrics_scores_reordered_labels_through_the_store(tmp_path):
+    gold_path = write_table(pd.DataFrame({TEXT_COL: TEXTS, GOLD_COL: GOLD}), tmp_path / "gold.csv")
+    store = LabelStore(tmp_path / "labels.sqlite")
+    store.add_labels(pd.DataFrame({TEXT_COL: TEXTS[::-1], COL: GOLD[::-1]}), COL, "openai", "gpt-4.1-mini")
+    store.close()
+
+    y_true, entries = evaluate_store(tmp_path / "labels.sqlite", gold_path)
+    assert sorted(y_true) == sorted(GOLD)
+    assert [e["summary"]["model"] for e in entries] == ["openai_gpt-4.1-mini"]
+    assert entries[0]["point"]["mcc"] == pytest.approx(1.0)   # positional zip of the reversed file gives < 1
+    assert entries[0]["summary"]["weighted_f1"] == pytest.approx(1.0)
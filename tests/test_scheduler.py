@@ -0,0 +1,74 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from config import TEXT_COL  # noqa: E402
+from labeling import scheduler  # noqa: E402
+from labeling.scheduler import Job, Scheduler  # noqa: E402
+
+QUOTAS = {"google": {"rpm": 0, "concurrency": 1}, "anthropic": {"rpm": 0, "concurrency": 1}}
+
+
+def write_dataset(path: Path, n: int) -> str:
+    pd.DataFrame({TEXT_COL: [f"review {path.stem} {i}" for i in range(n)]}).to_csv(path, index=False)
+    return str(path)
+
+
+def failing_call(model_name, review, client=None):
+    time.sleep(0.05)   # keep the chunk in flight while the other vendor's worker checks
+    raise RuntimeError("quota exceeded")
+
+
+def ok_call(model_name, review, client=None):
+    return "Delivery Issue"
+
+
+def run(sched: Scheduler, timeout: float = 30.0):
+    t = threading.Thread(target=sched.run, daemon=True)
+    t.start()
+    t.join(timeout)
+    assert not t.is_alive(), "scheduler did not finish"
+
+
+def test_paused_job_resumes_after_higher_priority_job_fails(tmp_path, monkeypatch):
+    # every row costs $1: google holds back $10, so anthropic ($5) does not fit in $6 until google fails
+    monkeypatch.setattr(scheduler, "estimate_row_cost", lambda model, review: 1.0)
+    jobs = [
+        Job(dataset=write_dataset(tmp_path / "g.csv", 10), vendor="google", model="gemini-2.0-flash",
+            priority=0, chunk_size=5, out_dir=str(tmp_path)),
+        Job(dataset=write_dataset(tmp_path / "a.csv", 5), vendor="anthropic", model="claude-haiku-4-5",
+            priority=1, chunk_size=1, out_dir=str(tmp_path)),
+    ]
+    sched = Scheduler(jobs, budget_usd=6.0, vendor_quotas=QUOTAS, state_dir=tmp_path / "state")
+    sched.clients = {"google": (object(), failing_call), "anthropic": (object(), ok_call)}
+    run(sched)
+
+    google, anthropic = sched.jobs
+    assert google.status == "failed"
+    assert anthropic.status == "done"
+    assert sorted(anthropic.done_chunks) == list(range(5))
+    assert sched.spent() == 5.0
+    assert (tmp_path / "labels_anthropic_claude-haiku-4-5.parquet").exists()
+
+
+def test_workers_stop_when_budget_never_frees(tmp_path, monkeypatch):
+    monkeypatch.setattr(scheduler, "estimate_row_cost", lambda model, review: 1.0)
+    jobs = [
+        Job(dataset=write_dataset(tmp_path / "g.csv", 4), vendor="google", model="gemini-2.0-flash",
+            priority=0, chunk_size=2, out_dir=str(tmp_path)),
+        Job(dataset=write_dataset(tmp_path / "a.csv", 4), vendor="anthropic", model="claude-haiku-4-5",
+            priority=1, chunk_size=2, out_dir=str(tmp_path)),
+    ]
+    sched = Scheduler(jobs, budget_usd=5.0, vendor_quotas=QUOTAS, state_dir=tmp_path / "state")
+    sched.clients = {"google": (object(), ok_call), "anthropic": (object(), ok_call)}
+    run(sched)
+
+    google, anthropic = sched.jobs
+    assert google.status == "done"
+    assert anthropic.status == "paused_budget"
+    assert anthropic.done_chunks == []